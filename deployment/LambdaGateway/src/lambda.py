@@ -19,10 +19,7 @@ import time
 sys.path.append('./site-packages')
 
 import numpy as np
-import boto3
-import botocore
 
-from botocore.exceptions import ClientError
 from convert_utils import ObservationToStateConverter
 
 #################################
@@ -30,9 +27,18 @@ from convert_utils import ObservationToStateConverter
 #################################
 
 converter = ObservationToStateConverter(style='one_versus_all', border_option="max")
-   
-config = botocore.config.Config(read_timeout=200)
-runtime = boto3.client('runtime.sagemaker', config=config)
+
+# boto3 is imported on the first move request, the other requests do not need it
+runtime = None
+
+def get_runtime():
+    global runtime
+    if runtime is None:
+        import boto3
+        import botocore
+        config = botocore.config.Config(read_timeout=200)
+        runtime = boto3.client('runtime.sagemaker', config=config)
+    return runtime
 
 def proxyHandler(event, context):
     print("Request received")
@@ -118,7 +124,7 @@ def remoteInferenceRLib(previous_state, current_state, data):
             "all_health": health_dict, "json": data}
 
     payload = json.dumps(data)
-    response = runtime.invoke_endpoint(EndpointName=os.environ['BATTLESNAKE_ENPOINT'],
+    response = get_runtime().invoke_endpoint(EndpointName=os.environ['BATTLESNAKE_ENPOINT'],
                                        ContentType='application/json',
                                        Body=payload)
     direction_index = json.loads(response['Body'].read().decode())
@@ -11,4 +11,23 @@
 # express or implied. See the License for the specific language governing 
 # permissions and limitations under the License.
 
-from .snake_gym import BattlesnakeGym
\ No newline at end of file
+import importlib
+
+# The gyms are imported on first access (PEP 562) so that importing the package, or light
+# modules such as battlesnake_gym.snake, does not import gym and multiprocessing
+_LAZY_ATTRIBUTES = {"BattlesnakeGym": ".snake_gym",
+                    "VectorBattlesnakeGym": ".vector_gym",
+                    "SubprocBattlesnakeGym": ".subproc_gym"}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
@@ -0,0 +1,122 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import json
+
+import numpy as np
+
+class MoveRequestEncoder:
+    '''
+    Encodes the state of a BattlesnakeGym into the json bytes of the move requests of the
+    Battlesnake API: {"game": {}, "turn": int, "board": {}, "you": {}}.
+    The fragments that do not change during a game (coordinates of every cell, game, ids and
+    names of the snakes) are encoded once. The coordinates follow get_json: y is the row and
+    x the column of the cell. Only the snakes that are alive are in board["snakes"].
+
+    Parameters:
+    ----------
+    map_size: (int, int)
+
+    number_of_snakes: int
+
+    game_id: str, optional, default="battlesnake-gym"
+
+    ruleset: str, optional, default="standard"
+
+    timeout: int, optional, default=500
+        Timeout of the move requests in milliseconds
+    '''
+    def __init__(self, map_size, number_of_snakes, game_id="battlesnake-gym",
+                 ruleset="standard", timeout=500):
+        self.map_size = tuple(map_size)
+        self.number_of_snakes = number_of_snakes
+
+        height, width = self.map_size
+        self.coordinates = [('{"x":%d,"y":%d}' % (cell % width, cell // width)).encode("ascii")
+                            for cell in range(height * width)]
+        game = {"id": game_id, "ruleset": {"name": ruleset, "version": "v1.0.0"},
+                "timeout": timeout}
+        self.game_prefix = ('{"game":' + json.dumps(game, separators=(",", ":")) +
+                            ',"turn":').encode("utf-8")
+        self.board_prefix = (',"board":{"height":%d,"width":%d,"food":[' %
+                             (height, width)).encode("ascii")
+        self.snake_prefixes = [('{"id":"%d","name":"Snake %d","latency":"0","shout":"",'
+                                '"health":' % (i, i)).encode("ascii")
+                               for i in range(number_of_snakes)]
+
+    def encode_snakes(self, snakes):
+        '''
+        Encode the snakes that are alive
+
+        Parameters:
+        ----------
+        snakes: Snakes
+
+        Returns:
+        --------
+        encoded_snakes: {int: bytes}
+            The json object of each snake that is alive
+        '''
+        width = self.map_size[1]
+        coordinates = self.coordinates
+        encoded_snakes = {}
+        for i in np.flatnonzero(snakes.alive).tolist():
+            body = snakes.get_body_coordinates(i)[::-1]
+            cells = (body[:, 0] * width + body[:, 1]).tolist()
+            encoded_body = b",".join([coordinates[cell] for cell in cells])
+            encoded_snakes[i] = b"".join([
+                self.snake_prefixes[i], b"%d" % snakes.health[i],
+                b',"length":%d,"head":' % len(cells), coordinates[cells[0]],
+                b',"body":[', encoded_body, b"]}"])
+        return encoded_snakes
+
+    def encode_board(self, food, encoded_snakes):
+        '''
+        Encode the board shared by the move requests of all the snakes
+        '''
+        food_cells = np.flatnonzero(food.locations_map == 1).tolist()
+        return b"".join([self.board_prefix,
+                         b",".join([self.coordinates[cell] for cell in food_cells]),
+                         b'],"hazards":[],"snakes":[',
+                         b",".join(encoded_snakes.values()), b"]}"])
+
+    def encode(self, turn, snakes, food, snake_ids=None):
+        '''
+        Encode the move requests of the snakes
+
+        Parameters:
+        ----------
+        turn: int
+
+        snakes: Snakes
+
+        food: Food
+
+        snake_ids: [int], optional, default=None
+            Snakes that receive a move request. Defaults to all the snakes that are alive.
+            Dead snakes do not receive a move request and are skipped
+
+        Returns:
+        --------
+        requests: {int: bytes}
+            The json of the move request of each snake
+        '''
+        encoded_snakes = self.encode_snakes(snakes)
+        prefix = b"".join([self.game_prefix, b"%d" % turn,
+                           self.encode_board(food, encoded_snakes), b',"you":'])
+        if snake_ids is None:
+            snake_ids = encoded_snakes.keys()
+        for i in snake_ids:
+            if not 0 <= i < snakes.number_of_snakes:
+                raise ValueError("Unknown snake id {}".format(i))
+        return {i: prefix + encoded_snakes[i] + b"}" for i in snake_ids if i in encoded_snakes}
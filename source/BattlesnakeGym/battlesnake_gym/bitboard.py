@@ -0,0 +1,429 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+from collections import deque
+
+import numpy as np
+
+from .snake import Snake
+from .collisions import (DID_NOT_COLLIDE, HIT_WALL, EATEN_SAME_TILE, EATEN_ADJACENT_TILE,
+                         HIT_SELF, HIT_OTHER, OTHER_SNAKE_HIT_BODY, ATE_ANOTHER_SNAKE)
+
+NO_DIRECTION = -1
+
+# Translations of Snake.UP, Snake.DOWN, Snake.LEFT and Snake.RIGHT, same as Snakes.DIRECTIONS
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+OPPOSITE_DIRECTIONS = (Snake.DOWN, Snake.UP, Snake.RIGHT, Snake.LEFT)
+
+def count_bits(bits):
+    '''
+    Returns the number of cells in a bitboard
+    '''
+    return bin(bits).count("1")
+
+class BitboardBoard:
+    '''
+    Game state of Battlesnake stored as bitboards. Cell (y, x) of the map is bit
+    y * map_size[1] + x of a Python int, so any map up to 19x19 (361 cells) fits in one int.
+    The food, the body of each snake and the occupied cells are bitboards, so that moves,
+    wall checks and neighbourhood or flood fill queries are shifts and masks.
+
+    The board follows the same rules as BattlesnakeGym.step (see collisions.resolve_collisions)
+    but does not spawn food. It is cheap to copy and is intended as a forward model for
+    search based heuristics.
+
+    The turns are played on the bitboards: the heads are moved by shifting their bit (a head
+    shifted out of the map is 0), the collisions compare the head bits and mask them with the
+    bodies and the food is eaten by masking it with the heads. The body of each snake is also
+    kept as a deque of cell indexes from the tail to the head so that the tails can be removed.
+    As in Snakes, the head that just moved is only added to the bitboards by place_heads,
+    once the collisions of the turn are resolved. step is the "bitboard" engine of
+    BattlesnakeGym.
+
+    Parameters:
+    ----------
+    map_size: (int, int)
+    number_of_snakes: int
+    '''
+    def __init__(self, map_size, number_of_snakes):
+        self.map_size = tuple(map_size)
+        self.number_of_snakes = number_of_snakes
+        height, width = self.map_size
+        self.full_mask = (1 << (height * width)) - 1
+
+        first_column = 0
+        for y in range(height):
+            first_column |= 1 << (y * width)
+        last_column = first_column << (width - 1)
+        self.not_first_column = self.full_mask & ~first_column
+        self.not_last_column = self.full_mask & ~last_column
+
+        n = number_of_snakes
+        self.bodies = [deque() for _ in range(n)]
+        self.body_bits = [0] * n
+        self.head_bits = [0] * n
+        self.previous_head_bits = [0] * n
+        self.head_on_board = [True] * n
+        self.health = [Snake.FULL_HEALTH] * n
+        self.facing = [NO_DIRECTION] * n
+        self.stacking = [0] * n
+        self.ate_food = [False] * n
+        self.alive = [False] * n
+        self.food = 0
+
+    @classmethod
+    def from_game(cls, snakes, food):
+        '''
+        Class method to create a board from the state of Snakes and Food
+
+        Parameters:
+        ----------
+        snakes: Snakes
+        food: Food
+        '''
+        board = cls(snakes.map_size, snakes.number_of_snakes)
+        width = board.map_size[1]
+        for i in range(snakes.number_of_snakes):
+            board.health[i] = int(snakes.health[i])
+            board.facing[i] = int(snakes.facing[i])
+            board.stacking[i] = int(snakes.stacking[i])
+            board.ate_food[i] = bool(snakes.ate_food[i])
+            if not snakes.alive[i]:
+                continue
+            cells = [y * width + x for y, x in snakes.get_body_coordinates(i).tolist()]
+            board.bodies[i] = deque(cells)
+            for cell in cells:
+                board.body_bits[i] |= 1 << cell
+            board.head_bits[i] = board.cell_bit(snakes.heads[i])
+            board.previous_head_bits[i] = board.cell_bit(snakes.previous_heads[i])
+            board.alive[i] = True
+        for y, x in zip(*food.get_food_map().nonzero()):
+            board.food |= 1 << (int(y) * width + int(x))
+        return board
+
+    def copy(self):
+        '''
+        Returns an independent copy of the board
+        '''
+        board = BitboardBoard.__new__(BitboardBoard)
+        board.__dict__.update(self.__dict__)
+        board.bodies = [deque(body) for body in self.bodies]
+        for name in ("body_bits", "head_bits", "previous_head_bits", "head_on_board", "health",
+                     "facing", "stacking", "ate_food", "alive"):
+            setattr(board, name, list(getattr(self, name)))
+        return board
+
+    def cell_bit(self, coordinate):
+        '''
+        Returns the bitboard of a single coordinate (y, x)
+        '''
+        return 1 << int(coordinate[0] * self.map_size[1] + coordinate[1])
+
+    def bits_to_coordinates(self, bits):
+        '''
+        Returns the coordinates (y, x) of the cells of a bitboard
+        '''
+        width = self.map_size[1]
+        coordinates = []
+        while bits:
+            low_bit = bits & -bits
+            cell = low_bit.bit_length() - 1
+            coordinates.append((cell // width, cell % width))
+            bits ^= low_bit
+        return coordinates
+
+    def is_inside_map(self, coordinate):
+        return 0 <= coordinate[0] < self.map_size[0] and 0 <= coordinate[1] < self.map_size[1]
+
+    def get_head(self, snake_id):
+        '''
+        Returns the coordinate (y, x) of the head of the snake, None if the head left the map
+        '''
+        head_bit = self.head_bits[snake_id]
+        if head_bit == 0:
+            return None
+        return divmod(head_bit.bit_length() - 1, self.map_size[1])
+
+    def get_length(self, snake_id):
+        '''
+        Size of the snake, including the head that was not placed yet
+        '''
+        if not self.alive[snake_id]:
+            return 0
+        return len(self.bodies[snake_id]) + (0 if self.head_on_board[snake_id] else 1)
+
+    def get_occupied(self):
+        '''
+        Returns the bitboard of the cells occupied by the snakes
+        '''
+        occupied = 0
+        for bits in self.body_bits:
+            occupied |= bits
+        return occupied
+
+    def shift(self, bits, direction):
+        '''
+        Move all the cells of a bitboard by one cell in direction. Cells that leave the map
+        are dropped
+        '''
+        width = self.map_size[1]
+        if direction == Snake.UP:
+            return bits >> width
+        elif direction == Snake.DOWN:
+            return (bits << width) & self.full_mask
+        elif direction == Snake.LEFT:
+            return (bits >> 1) & self.not_last_column
+        else:
+            return (bits << 1) & self.not_first_column
+
+    def neighbours(self, bits):
+        '''
+        Returns the bitboard of the cells adjacent to the cells of bits (excluding bits)
+        '''
+        width = self.map_size[1]
+        adjacent = (bits >> width) | ((bits << width) & self.full_mask) | \
+                   ((bits >> 1) & self.not_last_column) | ((bits << 1) & self.not_first_column)
+        return adjacent & ~bits
+
+    def flood_fill(self, start, blocked=None, max_steps=None):
+        '''
+        Returns the cells reachable from start without going through blocked cells
+
+        Parameters:
+        ----------
+        start: int
+            Bitboard of the starting cells
+        blocked: int, optional
+            Bitboard of the cells that cannot be entered. Defaults to the occupied cells
+        max_steps: int, optional
+            Maximum number of moves from start
+
+        Returns:
+        --------
+        reachable: int
+            Bitboard of the reachable cells, including start
+        '''
+        if blocked is None:
+            blocked = self.get_occupied()
+        free = self.full_mask & ~blocked
+        reachable = start
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            expanded = reachable | (self.neighbours(reachable) & free)
+            if expanded == reachable:
+                break
+            reachable = expanded
+            steps += 1
+        return reachable
+
+    def get_safe_moves(self, snake_id):
+        '''
+        Returns the directions that do not move the head of the snake into a wall,
+        a body or backward
+        '''
+        if not self.alive[snake_id]:
+            return []
+        free = self.full_mask & ~self.get_occupied()
+        head_bit = self.head_bits[snake_id]
+        moves = []
+        for direction in range(len(DIRECTIONS)):
+            if self.facing[snake_id] != NO_DIRECTION and \
+               OPPOSITE_DIRECTIONS[self.facing[snake_id]] == direction:
+                continue
+            if self.shift(head_bit, direction) & free:
+                moves.append(direction)
+        return moves
+
+    def kill_snake(self, snake_id):
+        self.bodies[snake_id] = deque()
+        self.body_bits[snake_id] = 0
+        self.alive[snake_id] = False
+        self.head_on_board[snake_id] = True
+
+    def move_snakes(self, actions):
+        '''
+        Reduce the health of the snakes and move them, see Snakes.move_snakes
+
+        Returns:
+        --------
+        starved: [bool]
+        forbidden: [bool]
+        '''
+        n = self.number_of_snakes
+        actions = np.ravel(actions).tolist()
+        starved = [False] * n
+        forbidden = [False] * n
+        for i in range(n):
+            if not self.alive[i]:
+                continue
+            self.health[i] -= 1
+            if self.health[i] == 0:
+                starved[i] = True
+                self.kill_snake(i)
+                continue
+            action = actions[i]
+            if OPPOSITE_DIRECTIONS[action] == self.facing[i]:
+                forbidden[i] = True
+                self.kill_snake(i)
+                continue
+
+            # The head bit is 0 if the snake moved out of the map
+            body = self.bodies[i]
+            head_bit = 1 << body[-1]
+            self.previous_head_bits[i] = head_bit
+            self.head_bits[i] = self.shift(head_bit, action)
+
+            # If the snake is within the first 3 turns of being alive or ate food, do no remove the end
+            if self.stacking[i] > 0:
+                self.stacking[i] -= 1
+            elif self.ate_food[i]:
+                self.ate_food[i] = False
+            else:
+                tail = body.popleft()
+                # Stacked segments are at the end of the body
+                if len(body) == 0 or body[0] != tail:
+                    self.body_bits[i] &= ~(1 << tail)
+            self.head_on_board[i] = False
+            self.facing[i] = action
+        return starved, forbidden
+
+    def resolve_collisions(self):
+        '''
+        Resolve the collisions of the snakes that moved, with the same rules as
+        collisions.resolve_collisions
+
+        Returns:
+        --------
+        outcomes: [int]
+            Outcome code of each snake, see collisions.py
+        '''
+        n = self.number_of_snakes
+        alive = self.alive
+        heads = self.head_bits
+        previous_heads = self.previous_head_bits
+        lengths = [self.get_length(i) for i in range(n)]
+        inside = [head != 0 for head in heads]
+        alive_ids = [i for i in range(n) if alive[i]]
+
+        # Owner of the cell each head moved into
+        owner = [None] * n
+        occupied = self.get_occupied()
+        for i in alive_ids:
+            if heads[i] & occupied:
+                for j in alive_ids:
+                    if self.body_bits[j] & heads[i]:
+                        owner[i] = j
+                        break
+
+        outcomes = [DID_NOT_COLLIDE] * n
+        ate = [set() for _ in range(n)]
+        for i in alive_ids:
+            eaten_same_tile = False
+            eaten_adjacent_tile = False
+            for j in alive_ids:
+                if i == j:
+                    continue
+                same_tile = inside[i] and heads[i] == heads[j]
+                swapped = heads[i] == previous_heads[j] and previous_heads[i] == heads[j]
+                if not (same_tile or swapped):
+                    continue
+                if lengths[j] >= lengths[i]:
+                    if same_tile:
+                        eaten_same_tile = True
+                    else:
+                        eaten_adjacent_tile = True
+                else:
+                    ate[i].add(j)
+
+            if not inside[i]:
+                outcomes[i] = HIT_WALL
+            elif eaten_same_tile:
+                outcomes[i] = EATEN_SAME_TILE
+            elif eaten_adjacent_tile:
+                outcomes[i] = EATEN_ADJACENT_TILE
+            elif owner[i] == i:
+                outcomes[i] = HIT_SELF
+            elif owner[i] is not None and inside[owner[i]] and owner[i] not in ate[i]:
+                outcomes[i] = HIT_OTHER
+
+        # Snakes whose body was hit by the head of another snake.
+        # Snakes are resolved in order, so the snakes killed before this snake do not count.
+        killed = [HIT_WALL <= outcome <= HIT_OTHER for outcome in outcomes]
+        for i in alive_ids:
+            if killed[i]:
+                continue
+            if len(ate[i]) > 0:
+                outcomes[i] = ATE_ANOTHER_SNAKE
+            for j in alive_ids:
+                if j != i and owner[j] == i and not (killed[j] and j < i):
+                    outcomes[i] = OTHER_SNAKE_HIT_BODY
+                    break
+        return outcomes
+
+    def place_heads(self):
+        '''
+        Add the heads of the snakes that moved and are still alive to the bitboards
+        '''
+        for i in range(self.number_of_snakes):
+            if self.alive[i] and not self.head_on_board[i]:
+                head_bit = self.head_bits[i]
+                self.bodies[i].append(head_bit.bit_length() - 1)
+                self.body_bits[i] |= head_bit
+                self.head_on_board[i] = True
+
+    def eat_food(self):
+        '''
+        Snakes with their head on food eat it
+
+        Returns:
+        --------
+        ate_food: [bool]
+        '''
+        ate_food = [False] * self.number_of_snakes
+        for i in range(self.number_of_snakes):
+            if not self.alive[i]:
+                continue
+            head_bit = self.head_bits[i]
+            if self.food & head_bit:
+                ate_food[i] = True
+                self.ate_food[i] = True
+                self.health[i] = Snake.FULL_HEALTH
+                self.food &= ~head_bit
+        return ate_food
+
+    def step(self, actions):
+        '''
+        Play one turn: move the snakes, resolve the collisions and eat the food.
+        Food is not spawned.
+
+        Parameters:
+        ----------
+        actions: [int] or np.array(number_of_snakes)
+            Action of each snake
+
+        Returns:
+        --------
+        starved: [bool]
+        forbidden: [bool]
+        outcomes: [int]
+            Outcome code of the collisions of each snake, see collisions.py
+        ate_food: [bool]
+        '''
+        starved, forbidden = self.move_snakes(actions)
+        outcomes = self.resolve_collisions()
+        for i, outcome in enumerate(outcomes):
+            if HIT_WALL <= outcome <= HIT_OTHER:
+                self.kill_snake(i)
+        self.place_heads()
+        ate_food = self.eat_food()
+        return starved, forbidden, outcomes, ate_food
@@ -0,0 +1,228 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+from collections.abc import Mapping
+from enum import IntEnum
+
+import numpy as np
+
+class Outcome(IntEnum):
+    '''
+    Outcome of a snake in a turn. The codes up to ATE_ANOTHER_SNAKE are the outcomes of the
+    collision phase. STARVED and FORBIDDEN_MOVE kill the snake before it moves and DEAD is
+    the outcome of the snakes that died in a previous turn.
+    '''
+    DID_NOT_COLLIDE = 0
+    HIT_WALL = 1
+    EATEN_SAME_TILE = 2
+    EATEN_ADJACENT_TILE = 3
+    HIT_SELF = 4
+    HIT_OTHER = 5
+    OTHER_SNAKE_HIT_BODY = 6
+    ATE_ANOTHER_SNAKE = 7
+    STARVED = 8
+    FORBIDDEN_MOVE = 9
+    DEAD = 10
+
+# Outcome codes as plain ints for the kernels and the arrays of codes
+DID_NOT_COLLIDE = int(Outcome.DID_NOT_COLLIDE)
+HIT_WALL = int(Outcome.HIT_WALL)
+EATEN_SAME_TILE = int(Outcome.EATEN_SAME_TILE)
+EATEN_ADJACENT_TILE = int(Outcome.EATEN_ADJACENT_TILE)
+HIT_SELF = int(Outcome.HIT_SELF)
+HIT_OTHER = int(Outcome.HIT_OTHER)
+OTHER_SNAKE_HIT_BODY = int(Outcome.OTHER_SNAKE_HIT_BODY)
+ATE_ANOTHER_SNAKE = int(Outcome.ATE_ANOTHER_SNAKE)
+STARVED = int(Outcome.STARVED)
+FORBIDDEN_MOVE = int(Outcome.FORBIDDEN_MOVE)
+DEAD = int(Outcome.DEAD)
+
+COLLISION_OUTCOMES = ("Did not collide",
+                      "Snake hit wall",
+                      "Snake was eaten - same tile",
+                      "Snake was eaten - adjacent tile",
+                      "Snake hit body - hit itself",
+                      "Snake hit body - hit other",
+                      "Other snake hit body",
+                      "Ate another snake")
+
+# Labels of info["snake_info"], indexed by Outcome
+OUTCOME_LABELS = COLLISION_OUTCOMES + ("Starved", "Forbidden move", "Dead")
+
+class SnakeInfo(Mapping):
+    '''
+    Read-only dictionary {snake_id: label} of info["snake_info"]. The outcomes are stored as
+    codes and converted to the labels of OUTCOME_LABELS when they are accessed.
+
+    Parameters:
+    ----------
+    codes: np.array(number_of_snakes)
+        Outcome of each snake, see Outcome
+    '''
+    def __init__(self, codes):
+        self.codes = codes
+
+    def __getitem__(self, snake_id):
+        if not isinstance(snake_id, (int, np.integer)) or not 0 <= snake_id < len(self.codes):
+            raise KeyError(snake_id)
+        return OUTCOME_LABELS[self.codes[snake_id]]
+
+    def __iter__(self):
+        return iter(range(len(self.codes)))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def get_outcome(self, snake_id):
+        '''
+        Returns the Outcome of the snake
+        '''
+        return Outcome(self.codes[snake_id])
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+EMPTY = -1
+
+def is_deadly(outcomes):
+    '''
+    Returns booleans indicating which outcome codes kill the snake
+    '''
+    return np.logical_and(outcomes >= HIT_WALL, outcomes <= HIT_OTHER)
+
+def resolve_collisions(heads, previous_heads, lengths, alive, grid_owner):
+    '''
+    Function to resolve the collisions of all the snakes at once. Checks the following:
+    1) If the snake's head hit a wall (i.e., if the head is outside of the map)
+    2) Check if the snake collided with another snake's head (entering the same tile and adjacent)
+    3) Check if the snake ran into another snake's body (itself and other snakes)
+    4) Check if the snake's body hit another snake's head
+    The first check that applies gives the outcome of the snake.
+
+    The collisions of several games are resolved at once if the arrays have a leading game
+    axis, e.g. heads of shape (number_of_games, number_of_snakes, 2) and grid_owner of shape
+    (number_of_games, map_size[0], map_size[1]).
+
+    Parameters:
+    ----------
+    heads: np.array(number_of_snakes, 2)
+        Positions of the heads after the snakes moved
+
+    previous_heads: np.array(number_of_snakes, 2)
+        Positions of the heads before the snakes moved
+
+    lengths: np.array(number_of_snakes)
+        Size of the snakes after they moved
+
+    alive: np.array(number_of_snakes) of bools
+        Snakes that are alive after moving
+
+    grid_owner: np.array(map_size[0], map_size[1])
+        Id of the snake occupying each cell of the map, EMPTY otherwise.
+        The grid must contain the bodies of the snakes but not the heads that just moved.
+
+    Returns:
+    --------
+    outcomes: np.array(number_of_snakes)
+        Outcome code of each snake, options = [HIT_WALL, EATEN_SAME_TILE, EATEN_ADJACENT_TILE,
+                                               HIT_SELF, HIT_OTHER, OTHER_SNAKE_HIT_BODY,
+                                               ATE_ANOTHER_SNAKE, DID_NOT_COLLIDE].
+        The outcome of snakes that are not alive is DID_NOT_COLLIDE.
+    '''
+    # The arrays of the snakes are indexed from their last axes, the games of a batch are
+    # looked up in the grid and in the pairs of snakes through offsets of flat indexes
+    number_of_snakes = alive.shape[-1]
+    number_of_games = alive.size // number_of_snakes
+    height, width = grid_owner.shape[-2:]
+    snake_ids = np.arange(number_of_snakes)
+    games = np.arange(number_of_games).reshape(alive.shape[:-1] + (1,))
+
+    # 1) Snakes with their head outside of the map hit a wall
+    rows, columns = heads[..., 0], heads[..., 1]
+    inside = np.logical_and(np.logical_and(rows >= 0, rows < height),
+                            np.logical_and(columns >= 0, columns < width))
+    hit_wall = np.logical_and(alive, np.logical_not(inside))
+
+    # Heads and previous heads as flat indexes of the cells. Heads outside of the map
+    # get distinct negative values, these snakes hit a wall whatever else happened
+    head_cells = np.where(inside, rows * width + columns, -1 - snake_ids)
+    previous_cells = previous_heads[..., 0] * width + previous_heads[..., 1]
+
+    # pairs[i, j] is True if snake i and snake j are different snakes that are alive
+    pairs = np.logical_and(alive[..., :, None], alive[..., None, :])
+    pairs[..., snake_ids, snake_ids] = False
+    # other_is_bigger[i, j] is True if snake j is at least as big as snake i
+    other_is_bigger = lengths[..., None, :] >= lengths[..., :, None]
+
+    # 2.1) Heads that entered the same tile
+    #
+    #  | |< S1
+    #   ^
+    #   S2
+    same_tile = np.equal(head_cells[..., :, None], head_cells[..., None, :])
+    np.logical_and(same_tile, pairs, out=same_tile)
+    eaten_same_tile = np.logical_or.reduce(np.logical_and(same_tile, other_is_bigger), axis=-1)
+
+    # 2.2) Heads that swapped positions
+    #
+    #    S1     S1
+    #   |  |> <|  |
+    #
+    swapped = np.logical_and(head_cells[..., :, None] == previous_cells[..., None, :],
+                             previous_cells[..., :, None] == head_cells[..., None, :])
+    np.logical_and(swapped, pairs, out=swapped)
+    eaten_adjacent_tile = np.logical_or.reduce(np.logical_and(swapped, other_is_bigger), axis=-1)
+
+    # ate[i, j] is True if snake i ate snake j
+    ate = np.logical_or(same_tile, swapped)
+    np.logical_and(ate, np.logical_not(other_is_bigger), out=ate)
+
+    # 3) Owner of the cell each head moved into
+    owner = grid_owner.ravel()[games * (height * width) + np.maximum(head_cells, 0)]
+    owner[np.logical_not(inside)] = EMPTY
+    has_owner = owner != EMPTY
+
+    # 3.1) Snakes that ran into their own body
+    hit_self = owner == snake_ids
+
+    # 3.2) Snakes that ran into the body of another snake. Snakes that hit a wall
+    # and snakes that were eaten by this snake are not on the map anymore
+    hit_other = np.logical_and(has_owner, np.logical_not(hit_self))
+    owner_index = np.maximum(owner, 0)
+    owner_rows = games * number_of_snakes + owner_index
+    np.logical_and(hit_other, inside.ravel()[owner_rows], out=hit_other)
+    ate_owner = ate.reshape(-1, number_of_snakes)[games * number_of_snakes + snake_ids, owner_index]
+    np.logical_and(hit_other, np.logical_not(ate_owner), out=hit_other)
+
+    # The outcomes are written from the lowest to the highest priority, the first check
+    # that applies is written last
+    outcomes = np.zeros(alive.shape, dtype=np.int64)
+    outcomes[hit_other] = HIT_OTHER
+    outcomes[hit_self] = HIT_SELF
+    outcomes[eaten_adjacent_tile] = EATEN_ADJACENT_TILE
+    outcomes[eaten_same_tile] = EATEN_SAME_TILE
+    outcomes[hit_wall] = HIT_WALL
+    outcomes[np.logical_not(alive)] = DID_NOT_COLLIDE
+    killed = outcomes != DID_NOT_COLLIDE
+
+    # 4) Snakes whose body was hit by the head of another snake.
+    # Snakes are resolved in order, so the snakes killed before this snake do not count.
+    hitters = np.logical_and(owner[..., None, :] == snake_ids[:, None], pairs)
+    killed_before = np.logical_and(killed[..., None, :], snake_ids < snake_ids[:, None])
+    np.logical_and(hitters, np.logical_not(killed_before), out=hitters)
+    other_snake_hit_body = np.logical_or.reduce(hitters, axis=-1)
+
+    surviving = np.logical_and(alive, np.logical_not(killed))
+    outcomes[np.logical_and(surviving, np.logical_or.reduce(ate, axis=-1))] = ATE_ANOTHER_SNAKE
+    outcomes[np.logical_and(surviving, other_snake_hit_body)] = OTHER_SNAKE_HIT_BODY
+    return outcomes
@@ -12,10 +12,8 @@
 # permissions and limitations under the License.
 
 import math
-import random
 
 import numpy as np
-from .utils import get_random_coordinates, generate_coordinate_list_from_binary_map
 
 class Food:
     '''
@@ -24,18 +22,31 @@ class Food:
     map_size: (int, int)
     food_spawn_location: [(int, int)] optional
         Parameter to force food to spawn in certain positions. Used for testing
-        Food will spawn in the coordinates provided in the list until the list is exhausted.
-        After the list is exhausted, food will be randomly spawned
+        Food will spawn in the coordinates provided in the list every turn until the list is
+        exhausted. After the list is exhausted, food will be randomly spawned
+    np_random: np.random.Generator or np.random.RandomState, optional
+        Random generator used to spawn food. Defaults to np.random
     '''
     FOOD_SPAWN_CHANCE = 0.15
-    def __init__(self, map_size, food_spawn_locations=[]):
+    def __init__(self, map_size, food_spawn_locations=[], np_random=None):
         self.map_size = map_size
+        self.np_random = np.random if np_random is None else np_random
         self.locations_map = np.zeros(shape=(map_size[0], map_size[1]))
+        # Cells where food was added or removed since the last observation
+        self.changed = np.zeros(shape=(map_size[0], map_size[1]), dtype=bool)
 
         self.food_spawn_locations = food_spawn_locations
 
+    def reset(self, food_spawn_locations=[]):
+        '''
+        Remove all the food as if the class was created again, reusing the arrays
+        '''
+        self.locations_map.fill(0)
+        self.changed.fill(False)
+        self.food_spawn_locations = food_spawn_locations
+
     @classmethod
-    def make_from_list(cls, map_size, food_list):
+    def make_from_list(cls, map_size, food_list, np_random=None):
         '''
         Class function to build the Food class.
         Parameters
@@ -43,39 +54,58 @@ class Food:
         map_size: (int, int)
         food_list: [(int, int)]
             Coordinates of the food locations
+        np_random: np.random.Generator or np.random.RandomState, optional
         '''
-        cls = Food(map_size)
+        cls = Food(map_size, np_random=np_random)
         for food in food_list:
             i, j = food
             cls.locations_map[i, j] = 1
+            cls.changed[i, j] = True
         return cls
 
-    def spawn_food(self, snake_map):
+    def spawn_food(self, free_cells):
         '''
         Helper function to generate another food.
         
         Parameters:
         ----------
-        snake_map, np.array(map_size[0], map_size[1], 1)
-            The map of the location of each snake, generated by Snakes.get_snake_binary_map
+        free_cells, FreeCellIndex
+            The cells that are not occupied by a snake, maintained by Snakes.free_cells
+
+        Returns:
+        --------
+        locations: [(int, int)]
+            Coordinates of the spawned food
         '''
         if len(self.food_spawn_locations) > 0:
             locations = [self.food_spawn_locations[0]]
             self.food_spawn_locations = self.food_spawn_locations[1:]
+        elif free_cells.count > 0:
+            locations = free_cells.sample(1, self.np_random)
         else:
-            snake_locations = generate_coordinate_list_from_binary_map(snake_map)
-            locations = get_random_coordinates(self.map_size, 1, excluding=snake_locations)
+            locations = []
         for location in locations:
             self.locations_map[location[0], location[1]] = 1
+            self.changed[location[0], location[1]] = True
+        return locations
         
-    def end_of_turn(self, snake_locations):
+    def end_of_turn(self, free_cells):
         '''
         Function to be called at the end of each step. 
         Adapted from 
         https://github.com/BattlesnakeOfficial/rules/blob/44b6b946661d42401f5a33b74303cd9071d0db18/standard.go#L392
+
+        Returns:
+        --------
+        locations: [(int, int)]
+            Coordinates of the spawned food
         '''
-        if random.random() < self.FOOD_SPAWN_CHANCE:
-            self.spawn_food(snake_locations)
+        # The forced spawn locations are spawned every turn, the random generator is only
+        # drawn for the chance spawns once they are exhausted
+        if len(self.food_spawn_locations) > 0 or \
+           self.np_random.random() < self.FOOD_SPAWN_CHANCE:
+            return self.spawn_food(free_cells)
+        return []
                     
     def get_food_map(self):
         '''
@@ -106,3 +136,4 @@ class Food:
         Function to remove a food present at coord
         '''
         self.locations_map[coord[0], coord[1]] = 0
+        self.changed[coord[0], coord[1]] = True
@@ -0,0 +1,213 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import struct
+from bisect import bisect_right
+
+import numpy as np
+
+# Byte format of the game logs (little endian):
+#     header: MAGIC, then HEADER_FORMAT: version, map_size[0], map_size[1], number_of_snakes,
+#             keyframe_interval, seed (-1 if unknown)
+#     chunks: a keyframe every keyframe_interval turns: the size of the snapshot (uint32) and
+#             the snapshot (see snapshot.py), followed by the actions of the next turns,
+#             number_of_snakes uint8 per turn
+#     index: (turn, offset of the chunk) of each keyframe, int64
+#     footer: FOOTER_FORMAT: number_of_keyframes, number_of_turns, offset of the index, MAGIC
+# The snapshots include the state of the random generator, so replaying the actions from a
+# keyframe spawns the same food as the original game.
+MAGIC = b"BSGL"
+GAME_LOG_VERSION = 1
+HEADER_FORMAT = "<HHHHIq"
+FOOTER_FORMAT = "<qqq4s"
+KEYFRAME_INTERVAL = 64
+
+class GameLogWriter:
+    '''
+    Writes one game of a BattlesnakeGym to a compact game log. Call record(actions) after each
+    env.step(actions) and close() at the end of the game. The log is read with GameLog.
+
+    Parameters:
+    ----------
+    path: str
+
+    env: BattlesnakeGym
+        The current state of env is the first position of the log
+
+    seed: int, optional, default=None
+        Seed of the game, only stored for reference
+
+    keyframe_interval: int, optional, default=KEYFRAME_INTERVAL
+        Number of turns between two snapshots of the game
+    '''
+    def __init__(self, path, env, seed=None, keyframe_interval=KEYFRAME_INTERVAL):
+        assert keyframe_interval > 0, "keyframe_interval must be positive"
+        self.path = path
+        self.env = env
+        self.keyframe_interval = keyframe_interval
+        self.number_of_turns = 0
+        self.index = []
+
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.file.write(struct.pack(HEADER_FORMAT, GAME_LOG_VERSION, env.map_size[0],
+                                    env.map_size[1], env.number_of_snakes, keyframe_interval,
+                                    -1 if seed is None else seed))
+        self._write_keyframe()
+
+    def _write_keyframe(self):
+        snapshot = self.env.get_state_snapshot()
+        self.index.append((self.number_of_turns, self.file.tell()))
+        self.file.write(struct.pack("<I", len(snapshot)))
+        self.file.write(snapshot)
+
+    def record(self, actions):
+        '''
+        Append the actions of the last turn
+
+        Parameters:
+        ----------
+        actions: [int] or np.array(number_of_snakes)
+            Actions given to env.step
+        '''
+        actions = np.asarray(actions, dtype=np.uint8).ravel()
+        assert len(actions) == self.env.number_of_snakes, "One action per snake is required"
+        self.file.write(actions.tobytes())
+        self.number_of_turns += 1
+        if self.number_of_turns % self.keyframe_interval == 0:
+            self._write_keyframe()
+
+    def close(self):
+        '''
+        Write the index and close the file
+        '''
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype="<i8").tobytes())
+        self.file.write(struct.pack(FOOTER_FORMAT, len(self.index), self.number_of_turns,
+                                    index_offset, MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class GameLog:
+    '''
+    Reads a game log written by GameLogWriter. Any position of the game is rebuilt by restoring
+    the previous keyframe and replaying at most keyframe_interval - 1 turns.
+
+    Parameters:
+    ----------
+    path: str
+    '''
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        footer_size = struct.calcsize(FOOTER_FORMAT)
+        if self.data[:len(MAGIC)] != MAGIC or self.data[-len(MAGIC):] != MAGIC:
+            raise ValueError("{} is not a complete game log".format(path))
+
+        version, height, width, number_of_snakes, keyframe_interval, seed = \
+            struct.unpack_from(HEADER_FORMAT, self.data, len(MAGIC))
+        if version != GAME_LOG_VERSION:
+            raise ValueError("Unsupported game log version {}".format(version))
+        self.map_size = (height, width)
+        self.number_of_snakes = number_of_snakes
+        self.keyframe_interval = keyframe_interval
+        self.seed = None if seed == -1 else seed
+
+        number_of_keyframes, self.number_of_turns, index_offset, _ = \
+            struct.unpack_from(FOOTER_FORMAT, self.data, len(self.data) - footer_size)
+        index = np.frombuffer(self.data, dtype="<i8", count=2 * number_of_keyframes,
+                              offset=index_offset).reshape(number_of_keyframes, 2)
+        self.keyframe_turns = index[:, 0].tolist()
+        self.keyframe_offsets = index[:, 1].tolist()
+
+        # Gather the actions of the chunks
+        self.actions = np.zeros((self.number_of_turns, number_of_snakes), dtype=np.int64)
+        chunk_ends = self.keyframe_offsets[1:] + [index_offset]
+        for turn, offset, end in zip(self.keyframe_turns, self.keyframe_offsets, chunk_ends):
+            actions_offset = offset + 4 + self._get_snapshot_size(offset)
+            chunk = np.frombuffer(self.data, dtype=np.uint8, count=end - actions_offset,
+                                  offset=actions_offset)
+            chunk_turns = len(chunk) // number_of_snakes
+            self.actions[turn:turn + chunk_turns] = chunk.reshape(chunk_turns, number_of_snakes)
+
+    def __len__(self):
+        '''
+        Number of positions in the log: the initial position and one per recorded turn
+        '''
+        return self.number_of_turns + 1
+
+    def _get_snapshot_size(self, offset):
+        return struct.unpack_from("<I", self.data, offset)[0]
+
+    def get_keyframe(self, turn):
+        '''
+        Get the last keyframe at or before turn
+
+        Returns:
+        --------
+        keyframe_turn: int
+            Number of turns of the log played before the keyframe
+
+        snapshot: bytes
+            See BattlesnakeGym.get_state_snapshot
+        '''
+        k = bisect_right(self.keyframe_turns, turn) - 1
+        offset = self.keyframe_offsets[k]
+        size = self._get_snapshot_size(offset)
+        return self.keyframe_turns[k], self.data[offset + 4:offset + 4 + size]
+
+    def restore(self, env, turn):
+        '''
+        Set env to the position of the game after turn recorded turns
+
+        Parameters:
+        ----------
+        env: BattlesnakeGym
+            Gym with the map size and number of snakes of the log, see make_env
+
+        turn: int
+            0 is the initial position, len(log) - 1 the last one
+        '''
+        assert 0 <= turn <= self.number_of_turns, "Turn {} is not in the game log".format(turn)
+        keyframe_turn, snapshot = self.get_keyframe(turn)
+        env.restore_state_snapshot(snapshot)
+        for t in range(keyframe_turn, turn):
+            env.step(self.actions[t])
+        return env
+
+    def make_env(self, turn=0, **kwargs):
+        '''
+        Create a BattlesnakeGym at the position of turn. kwargs are passed to BattlesnakeGym
+        '''
+        from .snake_gym import BattlesnakeGym
+        env = BattlesnakeGym(map_size=self.map_size, number_of_snakes=self.number_of_snakes,
+                             **kwargs)
+        return self.restore(env, turn)
+
+    def replay(self, env, start=0):
+        '''
+        Iterate over the positions of the game from start. env is restored at start and
+        stepped with the recorded actions, it is yielded at each position.
+        '''
+        self.restore(env, start)
+        yield env
+        for t in range(start, self.number_of_turns):
+            env.step(self.actions[t])
+            yield env
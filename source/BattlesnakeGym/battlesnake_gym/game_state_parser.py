@@ -13,7 +13,7 @@
 
 from .snake import Snakes
 from .food import Food
-import pandas as pd
+from .snapshot import encode_snapshot, decode_snapshot_header
 import string
 import numpy as np
 
@@ -34,16 +34,72 @@ class Game_state_parser:
         self.map_size = (self.board_dict["height"], self.board_dict["width"]) 
         self.number_of_snakes = len(self.board_dict["snakes"])
                 
-    def parse(self):     
+    def parse(self, np_random=None):
+        '''
+        Returns the snakes, food and turn count of the game state.
+        np_random is the random generator used by the snakes and food
+        '''
         # Get food locations
         food_locations = []
         for food_location in self.board_dict["food"]:
             x, y = food_location["x"], food_location["y"]
             food_locations.append((y, x))
                     
-        food = Food.make_from_list(self.map_size, food_locations)
-        snakes = Snakes.make_from_dict(self.map_size, self.board_dict["snakes"])
+        food = Food.make_from_list(self.map_size, food_locations, np_random)
+        snakes = Snakes.make_from_dict(self.map_size, self.board_dict["snakes"], np_random)
 
         turn_count = self.game_dict["turn"]
 
         return snakes, food, turn_count
+
+    def to_snapshot(self):
+        '''
+        Returns the game state as a snapshot without random generator state, see
+        BattlesnakeGym.get_state_snapshot. The colours of the snakes are drawn by the gym
+        when the snapshot is used to reset it.
+        '''
+        # The parsed objects do not draw from the random generator of the gym
+        snakes, food, turn_count = self.parse(np.random.RandomState(0))
+        snake_max_len = {i: 0 for i in range(self.number_of_snakes)}
+        return encode_snapshot(self.map_size, turn_count, snakes, food, snake_max_len, None)
+
+def encode_game_states(game_states, map_size=None, number_of_snakes=None):
+    '''
+    Parse game states once into compact snapshots used to reset BattlesnakeGym,
+    see BattlesnakeGym.set_game_states
+
+    Parameters:
+    ----------
+    game_states: iterable of dict or bytes
+        Game states in the form of the battlesnake engine (e.g. logged move requests).
+        Snapshots (bytes) are kept as they are
+
+    map_size: (int, int), optional, default=None
+        Map size of all the game states. Defaults to the map size of the first game state
+
+    number_of_snakes: int, optional, default=None
+        Number of snakes of all the game states. Defaults to the number of snakes of the
+        first game state
+
+    Returns:
+    --------
+    snapshots: [bytes]
+    '''
+    snapshots = []
+    for game_state in game_states:
+        if isinstance(game_state, bytes):
+            header = decode_snapshot_header(game_state)
+            state_map_size, state_number_of_snakes = header["map_size"], header["number_of_snakes"]
+            snapshot = game_state
+        else:
+            gsp = Game_state_parser(game_state)
+            state_map_size, state_number_of_snakes = gsp.map_size, gsp.number_of_snakes
+            snapshot = gsp.to_snapshot()
+        if map_size is None:
+            map_size = state_map_size
+        if number_of_snakes is None:
+            number_of_snakes = state_number_of_snakes
+        assert tuple(state_map_size) == tuple(map_size), "Map size of game state {} is incorrect".format(len(snapshots))
+        assert state_number_of_snakes == number_of_snakes, "Number of snakes of game state {} is incorrect".format(len(snapshots))
+        snapshots.append(snapshot)
+    return snapshots
@@ -0,0 +1,273 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+'''
+Compiled kernel of the hot part of BattlesnakeGym.step: health decay, movement, collision
+resolution and food consumption. The kernel works on the arrays of Snakes and Food and
+follows exactly the same steps as Snakes.move_snakes, collisions.resolve_collisions,
+Snakes.kill_snake and Snakes.place_heads, so that games are identical with and without the
+kernel.
+
+The kernel is compiled with Numba when it is installed (KERNEL_BACKEND == "numba").
+Otherwise BattlesnakeGym uses the numpy implementation (KERNEL_BACKEND == "numpy").
+'''
+
+import numpy as np
+
+from .collisions import (DID_NOT_COLLIDE, HIT_WALL, EATEN_SAME_TILE, EATEN_ADJACENT_TILE,
+                         HIT_SELF, HIT_OTHER, OTHER_SNAKE_HIT_BODY, ATE_ANOTHER_SNAKE, EMPTY)
+from .snake import Snake, Snakes
+
+try:
+    import numba
+    KERNEL_BACKEND = "numba"
+except ImportError:
+    numba = None
+    KERNEL_BACKEND = "numpy"
+
+# Class attributes cannot be read in compiled functions
+FULL_HEALTH = Snake.FULL_HEALTH
+
+def jit(function):
+    '''
+    Compile function with Numba if it is installed. Without Numba the function is
+    returned unchanged and runs as Python (used to test the kernel)
+    '''
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+@jit
+def _remove_segments(segments, number_of_segments, grid_owner, grid_count, changed):
+    '''
+    Same as Snakes._remove_from_grid for the coordinates in segments[:number_of_segments]
+    '''
+    for k in range(number_of_segments):
+        grid_count[segments[k, 0], segments[k, 1]] -= 1
+    for k in range(number_of_segments):
+        y, x = segments[k, 0], segments[k, 1]
+        if grid_count[y, x] == 0:
+            grid_owner[y, x] = EMPTY
+        changed[y, x] = True
+
+@jit
+def _kill_snake(snake_id, body, head_position, length, alive, head_on_grid, grid_owner,
+                grid_count, changed, segments):
+    '''
+    Same as Snakes.kill_snake
+    '''
+    capacity = body.shape[1]
+    end_position = head_position[snake_id] + 1
+    if not head_on_grid[snake_id]:
+        end_position -= 1
+    number_of_segments = 0
+    for p in range(head_position[snake_id] - length[snake_id] + 1, end_position):
+        segments[number_of_segments, 0] = body[snake_id, p % capacity, 0]
+        segments[number_of_segments, 1] = body[snake_id, p % capacity, 1]
+        number_of_segments += 1
+    _remove_segments(segments, number_of_segments, grid_owner, grid_count, changed)
+    alive[snake_id] = False
+    length[snake_id] = 0
+    head_on_grid[snake_id] = True
+
+@jit
+def _resolve_collisions(heads, previous_heads, length, alive, grid_owner, outcomes, owner, ate):
+    '''
+    Same as collisions.resolve_collisions. owner and ate are buffers
+    '''
+    n = heads.shape[0]
+    height, width = grid_owner.shape
+    for i in range(n):
+        outcomes[i] = DID_NOT_COLLIDE
+        owner[i] = EMPTY
+        inside = 0 <= heads[i, 0] < height and 0 <= heads[i, 1] < width
+        if alive[i] and inside:
+            owner[i] = grid_owner[heads[i, 0], heads[i, 1]]
+
+    for i in range(n):
+        if not alive[i]:
+            continue
+        eaten_same_tile = False
+        eaten_adjacent_tile = False
+        for j in range(n):
+            ate[i, j] = False
+            if i == j or not alive[j]:
+                continue
+            same_tile = heads[i, 0] == heads[j, 0] and heads[i, 1] == heads[j, 1]
+            swapped = heads[i, 0] == previous_heads[j, 0] and heads[i, 1] == previous_heads[j, 1] and \
+                previous_heads[i, 0] == heads[j, 0] and previous_heads[i, 1] == heads[j, 1]
+            if not (same_tile or swapped):
+                continue
+            if length[j] >= length[i]:
+                if same_tile:
+                    eaten_same_tile = True
+                else:
+                    eaten_adjacent_tile = True
+            else:
+                ate[i, j] = True
+
+        inside = 0 <= heads[i, 0] < height and 0 <= heads[i, 1] < width
+        if not inside:
+            outcomes[i] = HIT_WALL
+        elif eaten_same_tile:
+            outcomes[i] = EATEN_SAME_TILE
+        elif eaten_adjacent_tile:
+            outcomes[i] = EATEN_ADJACENT_TILE
+        elif owner[i] == i:
+            outcomes[i] = HIT_SELF
+        elif owner[i] != EMPTY:
+            other = owner[i]
+            other_inside = 0 <= heads[other, 0] < height and 0 <= heads[other, 1] < width
+            if other_inside and not ate[i, other]:
+                outcomes[i] = HIT_OTHER
+
+    # Snakes whose body was hit by the head of another snake.
+    # Snakes are resolved in order, so the snakes killed before this snake do not count.
+    for i in range(n):
+        if not alive[i] or HIT_WALL <= outcomes[i] <= HIT_OTHER:
+            continue
+        for j in range(n):
+            if ate[i, j]:
+                outcomes[i] = ATE_ANOTHER_SNAKE
+        for j in range(n):
+            if j == i or not alive[j] or owner[j] != i:
+                continue
+            if HIT_WALL <= outcomes[j] <= HIT_OTHER and j < i:
+                continue
+            outcomes[i] = OTHER_SNAKE_HIT_BODY
+            break
+
+@jit
+def _step_kernel(actions, directions, opposite_directions, body, head_position, length, health,
+                 alive, facing, stacking, ate_food, head_on_grid, heads, previous_heads,
+                 grid_owner, grid_position, grid_count, changed, renumbered, food_map,
+                 food_changed, starved, forbidden, moved, outcomes, eaten, segments, owner, ate):
+    '''
+    Move the snakes, resolve the collisions, place the heads and eat the food
+    '''
+    n = actions.shape[0]
+    capacity = body.shape[1]
+
+    # Reduce health by one
+    for i in range(n):
+        if alive[i]:
+            health[i] -= 1
+        starved[i] = alive[i] and health[i] == 0
+        moving = alive[i] and not starved[i]
+        forbidden[i] = moving and opposite_directions[actions[i]] == facing[i]
+        moved[i] = moving and not forbidden[i]
+
+    # Move the heads. If the snake is within the first 3 turns of being alive or ate food,
+    # do no remove the end
+    number_of_segments = 0
+    for i in range(n):
+        if not moved[i]:
+            continue
+        ring_index = head_position[i] % capacity
+        previous_heads[i, 0] = body[i, ring_index, 0]
+        previous_heads[i, 1] = body[i, ring_index, 1]
+        heads[i, 0] = previous_heads[i, 0] + directions[actions[i], 0]
+        heads[i, 1] = previous_heads[i, 1] + directions[actions[i], 1]
+        changed[previous_heads[i, 0], previous_heads[i, 1]] = True
+
+        if stacking[i] > 0:
+            stacking[i] -= 1
+            length[i] += 1
+        elif ate_food[i]:
+            ate_food[i] = False
+            length[i] += 1
+        else:
+            tail_index = (head_position[i] - length[i] + 1) % capacity
+            segments[number_of_segments, 0] = body[i, tail_index, 0]
+            segments[number_of_segments, 1] = body[i, tail_index, 1]
+            number_of_segments += 1
+            renumbered[i] = True
+
+    # Remove the ends of the snakes from the grid
+    _remove_segments(segments, number_of_segments, grid_owner, grid_count, changed)
+
+    for i in range(n):
+        if not moved[i]:
+            continue
+        head_position[i] += 1
+        ring_index = head_position[i] % capacity
+        body[i, ring_index, 0] = heads[i, 0]
+        body[i, ring_index, 1] = heads[i, 1]
+        head_on_grid[i] = False
+        facing[i] = actions[i]
+
+    for i in range(n):
+        if starved[i] or forbidden[i]:
+            _kill_snake(i, body, head_position, length, alive, head_on_grid, grid_owner,
+                        grid_count, changed, segments)
+
+    # Resolve the collisions and kill the snakes
+    _resolve_collisions(heads, previous_heads, length, alive, grid_owner, outcomes, owner, ate)
+    for i in range(n):
+        if HIT_WALL <= outcomes[i] <= HIT_OTHER:
+            _kill_snake(i, body, head_position, length, alive, head_on_grid, grid_owner,
+                        grid_count, changed, segments)
+
+    # Place the heads
+    for i in range(n):
+        if alive[i] and not head_on_grid[i]:
+            grid_owner[heads[i, 0], heads[i, 1]] = i
+            grid_position[heads[i, 0], heads[i, 1]] = head_position[i]
+            changed[heads[i, 0], heads[i, 1]] = True
+            grid_count[heads[i, 0], heads[i, 1]] += 1
+            head_on_grid[i] = True
+
+    # Eat the food
+    for i in range(n):
+        eaten[i] = False
+        if alive[i] and food_map[heads[i, 0], heads[i, 1]] == 1:
+            eaten[i] = True
+            ate_food[i] = True
+            health[i] = FULL_HEALTH
+            food_map[heads[i, 0], heads[i, 1]] = 0
+            food_changed[heads[i, 0], heads[i, 1]] = True
+
+def step_snakes(snakes, food, actions):
+    '''
+    Move the snakes, resolve the collisions and eat the food with the kernel.
+    Same as the move, collision and food phases of BattlesnakeGym.step, without spawning food.
+    The kernel works in the buffers of snakes, so the returned arrays are overwritten by the
+    next call (same as Snakes.move_snakes).
+
+    Parameters:
+    ----------
+    snakes: Snakes
+    food: Food
+    actions: np.array(number_of_snakes)
+
+    Returns:
+    --------
+    starved: np.array(number_of_snakes) of bools
+    forbidden: np.array(number_of_snakes) of bools
+    moved: np.array(number_of_snakes) of bools
+        Snakes that moved this turn (alive before the collisions)
+    outcomes: np.array(number_of_snakes)
+        Outcome codes of the collisions, see collisions.py
+    ate_food: np.array(number_of_snakes) of bools
+    '''
+    snakes._actions[:] = np.ravel(actions)
+    starved, forbidden, moved = snakes._starved, snakes._forbidden, snakes._moving
+    outcomes, ate_food = snakes._outcomes, snakes._eaten
+    _step_kernel(
+        snakes._actions, Snakes.DIRECTIONS, Snakes.OPPOSITE_DIRECTIONS, snakes.body,
+        snakes.head_position, snakes.length, snakes.health, snakes.alive, snakes.facing,
+        snakes.stacking, snakes.ate_food, snakes.head_on_grid, snakes.heads,
+        snakes.previous_heads, snakes.grid_owner, snakes.grid_position, snakes.grid_count,
+        snakes.changed, snakes.renumbered, food.locations_map, food.changed, starved,
+        forbidden, moved, outcomes, ate_food, snakes._segments, snakes._owner, snakes._ate)
+    return starved, forbidden, moved, outcomes, ate_food
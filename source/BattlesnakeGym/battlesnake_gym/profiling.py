@@ -0,0 +1,111 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import os
+import time
+from bisect import bisect_right
+
+# Setting this environment variable to 1 enables the profiling of every BattlesnakeGym
+PROFILE_ENV_VARIABLE = "BATTLESNAKE_GYM_PROFILE"
+
+def is_profiling_enabled():
+    '''
+    Returns True if profiling is enabled through the PROFILE_ENV_VARIABLE environment variable
+    '''
+    return os.environ.get(PROFILE_ENV_VARIABLE, "0").lower() not in ("", "0", "false", "no")
+
+class PhaseProfiler:
+    '''
+    Collects the cumulative timings and histograms of timings of the phases of the gym.
+    A call (e.g., "step") is timed with start(), lap(phase) at the end of each phase
+    and stop(call).
+
+    Parameters:
+    ----------
+    callback: function(call, timings), optional
+        Called at the end of each call with the name of the call and a dictionary
+        of the time (in seconds) spent in each phase of the call and "total"
+    '''
+    # Upper edges of the bins of the histograms, from 1 microsecond to ~1 second
+    HISTOGRAM_EDGES = [1e-6 * 2 ** k for k in range(21)]
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        '''
+        Clear all the timings
+        '''
+        self.counts = {}
+        self.totals = {}
+        self.maximums = {}
+        self.histograms = {}
+        self._current = {}
+        self._start = None
+        self._last = None
+
+    def start(self):
+        self._start = self._last = time.perf_counter()
+        self._current = {}
+
+    def lap(self, phase):
+        '''
+        Record the time spent since the previous lap (or start) in phase
+        '''
+        now = time.perf_counter()
+        self._record(phase, now - self._last)
+        self._current[phase] = self._current.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def stop(self, call):
+        '''
+        Record the total time of the call and send the timings to the callback
+        '''
+        elapsed = time.perf_counter() - self._start
+        self._record(call, elapsed)
+        if self.callback is not None:
+            timings = dict(self._current)
+            timings["total"] = elapsed
+            self.callback(call, timings)
+
+    def _record(self, name, elapsed):
+        if name not in self.counts:
+            self.counts[name] = 0
+            self.totals[name] = 0.0
+            self.maximums[name] = 0.0
+            self.histograms[name] = [0] * (len(self.HISTOGRAM_EDGES) + 1)
+        self.counts[name] += 1
+        self.totals[name] += elapsed
+        self.maximums[name] = max(self.maximums[name], elapsed)
+        self.histograms[name][bisect_right(self.HISTOGRAM_EDGES, elapsed)] += 1
+
+    def get_stats(self):
+        '''
+        Returns the timings of each phase and call
+
+        Returns:
+        --------
+        stats: {str: {}}
+            For each phase or call: "count", "total", "mean" and "max" in seconds and
+            "histogram", the number of timings below each of HISTOGRAM_EDGES (the last
+            bin counts the timings above the last edge)
+        '''
+        stats = {}
+        for name, count in self.counts.items():
+            stats[name] = {"count": count,
+                           "total": self.totals[name],
+                           "mean": self.totals[name] / count,
+                           "max": self.maximums[name],
+                           "histogram": list(self.histograms[name])}
+        return stats
@@ -0,0 +1,181 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import json
+import os
+
+import numpy as np
+
+from .renderer import get_renderer
+
+# File format of the recordings:
+#     header: one line of json with the keys "version", "map_size", "number_of_snakes",
+#             "snake_colours" and "state_shape"
+#     states: the uint8 state of each turn (see BattlesnakeGym.get_render_state), all the
+#             states have the same size so turn t is at header_size + t * state_size
+RECORDING_VERSION = 1
+
+class EpisodeRecorder:
+    '''
+    Streams the states of the turns of one game of a BattlesnakeGym to a file. A state takes
+    map_size[0] * map_size[1] * (number_of_snakes + 1) bytes instead of the few MB of an
+    rgb_array. The file is read with EpisodeRecording, which renders the frames on demand.
+    The colours of the snakes change when the gym is reset so a recorder must be created
+    for each game.
+
+    Parameters:
+    ----------
+    path: str
+        Path of the recording, overwritten if it exists
+
+    env: BattlesnakeGym
+    '''
+    def __init__(self, path, env):
+        self.path = path
+        self.env = env
+        self.number_of_turns = 0
+
+        state = env.get_render_state()
+        header = {"version": RECORDING_VERSION,
+                  "map_size": [int(size) for size in env.map_size],
+                  "number_of_snakes": int(env.number_of_snakes),
+                  "snake_colours": np.asarray(env.snakes.get_snake_colours()).tolist(),
+                  "state_shape": list(state.shape)}
+        self.file = open(path, "wb")
+        self.file.write((json.dumps(header) + "\n").encode("utf-8"))
+
+    def record(self):
+        '''
+        Append the current state of the gym to the recording
+        '''
+        self.file.write(self.env.get_render_state().tobytes())
+        self.number_of_turns += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class EpisodeRecording:
+    '''
+    Reads a recording written by EpisodeRecorder. The states are memory mapped and the frames
+    are rendered when they are accessed, so len(recording) and recording[t] can replace
+    a list of rgb_arrays.
+
+    Parameters:
+    ----------
+    path: str
+
+    delete: Bool, optional, default=False
+        Delete the file of the recording when the recording is closed or garbage collected.
+        Used for temporary recordings
+    '''
+    def __init__(self, path, delete=False):
+        self.path = path
+        self.delete = delete
+        with open(path, "rb") as f:
+            header_line = f.readline()
+        header = json.loads(header_line.decode("utf-8"))
+        if header["version"] != RECORDING_VERSION:
+            raise ValueError("Unsupported recording version {}".format(header["version"]))
+
+        self.map_size = tuple(header["map_size"])
+        self.number_of_snakes = header["number_of_snakes"]
+        self.snake_colours = np.array(header["snake_colours"], dtype=np.uint8)
+        state_shape = tuple(header["state_shape"])
+        self.renderer = get_renderer(self.map_size)
+
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            data_size = f.tell() - len(header_line)
+        number_of_turns = data_size // int(np.prod(state_shape))
+        if number_of_turns > 0:
+            self.states = np.memmap(path, dtype=np.uint8, mode="r", offset=len(header_line),
+                                    shape=(number_of_turns,) + state_shape)
+        else:
+            self.states = np.zeros((0,) + state_shape, dtype=np.uint8)
+
+    def close(self):
+        '''
+        Release the memory map of the states, and delete the file if delete is True.
+        The recording is empty once closed.
+        '''
+        self.states = np.zeros((0,) + self.states.shape[1:], dtype=np.uint8)
+        if self.delete:
+            self.delete = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "delete", False):
+            self.close()
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, index):
+        '''
+        Returns the rgb_array of turn index, see BattlesnakeGym.render
+        '''
+        return self.renderer.render(self.states[index], self.snake_colours)
+
+    def get_state(self, index):
+        '''
+        Returns the state of turn index, see BattlesnakeGym.get_render_state
+        '''
+        return np.array(self.states[index])
+
+    def iter_rgb_arrays(self, batch_size=16):
+        '''
+        Iterate over the rgb_arrays of all the turns. Only batch_size frames are rendered at once.
+        '''
+        for start in range(0, len(self), batch_size):
+            boards = self.renderer.render_batch(self.states[start:start + batch_size],
+                                                self.snake_colours)
+            for board in boards:
+                yield board
+
+    def write_gif(self, path, fps=5, batch_size=16):
+        '''
+        Write the recording as a gif with imageio. The frames are streamed to the file,
+        only batch_size frames are held in memory.
+        '''
+        import imageio
+        self._write_frames(imageio.get_writer(path, mode="I", duration=1.0 / fps), batch_size)
+
+    def write_video(self, path, fps=5, batch_size=16):
+        '''
+        Write the recording as a video (e.g., mp4) with imageio and its ffmpeg plugin
+        '''
+        import imageio
+        self._write_frames(imageio.get_writer(path, fps=fps), batch_size)
+
+    def _write_frames(self, writer, batch_size):
+        try:
+            for board in self.iter_rgb_arrays(batch_size):
+                writer.append_data(board)
+        finally:
+            writer.close()
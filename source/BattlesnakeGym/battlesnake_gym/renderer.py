@@ -0,0 +1,182 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import numpy as np
+
+FOOD_INDEX = 0
+
+# Indexes of the sprites, followed by the bodies and then the heads of the snakes
+EMPTY_SPRITE = 0
+FOOD_SPRITE = 1
+BODY_SPRITES = 2
+
+class BoardRenderer:
+    '''
+    Renders the states generated by BattlesnakeGym._get_state into rgb arrays.
+    The background of the board (white with a grey box for each cell) is computed once and
+    the cells that are not empty are copied from precomputed sprites: food and the body and
+    head of each snake. Use get_renderer to share the renderers of a map size.
+
+    Parameters:
+    ----------
+    map_size: (int, int)
+    '''
+    BOUNDARY = 20
+    BOX_SIZE = 40
+    SPACE_BETWEEN_BOXES = 10
+    FOOD_MARGIN = 8
+    HEAD_MARGIN = 10
+
+    BACKGROUND_COLOUR = [255, 255, 255]
+    BOX_COLOUR = [178, 178, 178]
+    FOOD_COLOUR = [255, 0, 0]
+    HEAD_COLOUR = [255, 255, 255]
+
+    def __init__(self, map_size):
+        self.map_size = tuple(map_size)
+        cell_size = self.BOX_SIZE + self.SPACE_BETWEEN_BOXES
+        self.board_size = (self.map_size[0] * cell_size + 2 * self.BOUNDARY,
+                           self.map_size[1] * cell_size + 2 * self.BOUNDARY)
+
+        self.background = np.empty(self.board_size + (3,), dtype=np.uint8)
+        self.background[:] = self.BACKGROUND_COLOUR
+        self._get_boxes(self.background[np.newaxis])[:] = self.BOX_COLOUR
+
+        self._sprites_key = None
+        self._sprites = None
+
+    def _get_boxes(self, boards):
+        '''
+        Helper function to get a writable view of shape
+        (batch, map_size[0], BOX_SIZE, map_size[1], BOX_SIZE, 3) of the boxes of the boards
+        '''
+        cell_size = self.BOX_SIZE + self.SPACE_BETWEEN_BOXES
+        height = self.map_size[0] * cell_size
+        width = self.map_size[1] * cell_size
+        inside = boards[:, self.BOUNDARY:self.BOUNDARY + height,
+                        self.BOUNDARY:self.BOUNDARY + width]
+        cells = inside.reshape((boards.shape[0], self.map_size[0], cell_size,
+                                self.map_size[1], cell_size, 3))
+        return cells[:, :, :self.BOX_SIZE, :, :self.BOX_SIZE]
+
+    def get_sprites(self, snake_colours):
+        '''
+        Get the boxes drawn for each type of cell. The sprites of the last colours are cached.
+
+        Parameters:
+        ----------
+        snake_colours: np.array(number_of_colour_sets, number_of_snakes, 3) of np.uint8
+
+        Returns:
+        --------
+        sprites: np.array(number_of_colour_sets, 2 + 2 * number_of_snakes,
+                          BOX_SIZE, BOX_SIZE, 3) of np.uint8
+            For each set of colours: EMPTY_SPRITE, FOOD_SPRITE, the bodies of the snakes
+            and the heads of the snakes
+        '''
+        key = (snake_colours.shape, snake_colours.tobytes())
+        if key == self._sprites_key:
+            return self._sprites
+
+        number_of_sets, number_of_snakes, _ = snake_colours.shape
+        head_sprites = BODY_SPRITES + number_of_snakes
+        food_box = slice(self.FOOD_MARGIN, self.BOX_SIZE - self.FOOD_MARGIN)
+        head_box = slice(self.HEAD_MARGIN, self.BOX_SIZE - self.HEAD_MARGIN)
+
+        sprites = np.empty((number_of_sets, 2 + 2 * number_of_snakes,
+                            self.BOX_SIZE, self.BOX_SIZE, 3), dtype=np.uint8)
+        sprites[:, EMPTY_SPRITE] = self.BOX_COLOUR
+        sprites[:, FOOD_SPRITE] = self.BOX_COLOUR
+        sprites[:, FOOD_SPRITE, food_box, food_box] = self.FOOD_COLOUR
+        sprites[:, BODY_SPRITES:head_sprites] = snake_colours[:, :, np.newaxis, np.newaxis]
+        sprites[:, head_sprites:] = snake_colours[:, :, np.newaxis, np.newaxis]
+        sprites[:, head_sprites:, head_box, head_box] = self.HEAD_COLOUR
+
+        self._sprites_key = key
+        self._sprites = sprites
+        return sprites
+
+    def render(self, state, snake_colours):
+        '''
+        Render one state
+
+        Parameters:
+        ----------
+        state: np.array(map_size[0], map_size[1], number_of_snakes + 1)
+            Generated by BattlesnakeGym._get_state
+
+        snake_colours: [[int, int, int]]
+            Colour of each snake, see Snakes.get_snake_colours
+
+        Returns:
+        --------
+        board: np.array(board_size[0], board_size[1], 3) of np.uint8
+        '''
+        return self.render_batch(np.asarray(state)[np.newaxis], snake_colours)[0]
+
+    def render_batch(self, states, snake_colours):
+        '''
+        Render a batch of states at once, e.g., the turns of a game to write a gif
+
+        Parameters:
+        ----------
+        states: np.array(batch, map_size[0], map_size[1], number_of_snakes + 1)
+
+        snake_colours: [[int, int, int]] or [[[int, int, int]]]
+            Colour of each snake shared by all the states, or the colours of each state
+
+        Returns:
+        --------
+        boards: np.array(batch, board_size[0], board_size[1], 3) of np.uint8
+        '''
+        states = np.asarray(states)
+        batch_size = states.shape[0]
+        snake_states = states[..., FOOD_INDEX + 1:]
+        number_of_snakes = snake_states.shape[-1]
+
+        snake_colours = np.asarray(snake_colours).astype(np.uint8)
+        snake_colours = snake_colours.reshape(-1, number_of_snakes, 3)
+        sprites = self.get_sprites(snake_colours)
+        sprites_per_set = sprites.shape[1]
+        sprites = sprites.reshape((-1,) + sprites.shape[2:])
+
+        # Same priorities as the original renderer: heads over bodies over food
+        sprite_indexes = np.where(states[..., FOOD_INDEX] >= 1, FOOD_SPRITE, EMPTY_SPRITE)
+        if number_of_snakes > 0:
+            snake_ids = np.argmax(snake_states, axis=-1)
+            is_body = np.any(snake_states == 1, axis=-1)
+            is_head = np.any(snake_states == 5, axis=-1)
+            sprite_indexes[is_body] = BODY_SPRITES + snake_ids[is_body]
+            sprite_indexes[is_head] = BODY_SPRITES + number_of_snakes + snake_ids[is_head]
+
+        # Only the cells that are not empty are drawn over the background
+        board_ids, rows, columns = np.nonzero(sprite_indexes != EMPTY_SPRITE)
+        cell_sprites = sprite_indexes[board_ids, rows, columns]
+        if len(snake_colours) > 1:
+            cell_sprites += board_ids * sprites_per_set
+
+        boards = np.empty((batch_size,) + self.background.shape, dtype=np.uint8)
+        boards[:] = self.background
+        self._get_boxes(boards)[board_ids, rows, :, columns] = sprites[cell_sprites]
+        return boards
+
+_renderers = {}
+
+def get_renderer(map_size):
+    '''
+    Returns the BoardRenderer of map_size, created on the first call
+    '''
+    map_size = tuple(map_size)
+    if map_size not in _renderers:
+        _renderers[map_size] = BoardRenderer(map_size)
+    return _renderers[map_size]
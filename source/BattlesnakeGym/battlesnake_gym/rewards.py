@@ -13,13 +13,60 @@
 
 import numpy as np
 
+from .collisions import Outcome
+
+# Names of the rewards, in the order of the columns of Rewards.get_reward_table
+REWARD_NAMES = ("another_turn", "ate_food", "won", "died", "ate_another_snake", "hit_wall",
+                "hit_other_snake", "hit_self", "was_eaten", "other_snake_hit_body",
+                "forbidden_move", "starved")
+REWARD_INDEXES = {name: k for k, name in enumerate(REWARD_NAMES)}
+
+# Reward of each Outcome. None if the outcome has no reward
+OUTCOME_REWARDS = {Outcome.DID_NOT_COLLIDE: None,
+                   Outcome.HIT_WALL: "hit_wall",
+                   Outcome.EATEN_SAME_TILE: "was_eaten",
+                   Outcome.EATEN_ADJACENT_TILE: "was_eaten",
+                   Outcome.HIT_SELF: "hit_self",
+                   Outcome.HIT_OTHER: "hit_other_snake",
+                   Outcome.OTHER_SNAKE_HIT_BODY: "other_snake_hit_body",
+                   Outcome.ATE_ANOTHER_SNAKE: "ate_another_snake",
+                   Outcome.STARVED: "starved",
+                   Outcome.FORBIDDEN_MOVE: "forbidden_move",
+                   Outcome.DEAD: None}
+
+# Column of the reward table of each outcome code, 0 for the outcomes without reward
+HAS_OUTCOME_REWARD = np.array([OUTCOME_REWARDS[outcome] is not None for outcome in Outcome])
+OUTCOME_REWARD_COLUMNS = np.array([REWARD_INDEXES.get(OUTCOME_REWARDS[outcome], 0)
+                                   for outcome in Outcome])
+
 class Rewards:
     '''
-    Base class to set up rewards for the battlesnake gym
+    Base class to set up rewards for the battlesnake gym.
+    Subclasses implement get_reward. Implementing get_reward_table as well computes the
+    rewards of all the snakes with table lookups, see compute_rewards.
     '''
     def get_reward(self, name, snake_id, episode):
         raise NotImplemented()
 
+    def get_reward_table(self, number_of_snakes, episodes):
+        '''
+        Get the rewards of every snake for every name in REWARD_NAMES. Called once per turn,
+        so the rewards can follow a schedule of episodes.
+
+        Parameters:
+        ----------
+        number_of_snakes: int
+
+        episodes: object
+            Episodes given to BattlesnakeGym.step
+
+        Returns:
+        --------
+        table: np.array(number_of_snakes, len(REWARD_NAMES)) or None
+            None if the rewards are only given by get_reward
+        '''
+        return None
+
 class SimpleRewards(Rewards):
     '''
     Simple class to handle a fixed reward scheme
@@ -40,3 +87,114 @@ class SimpleRewards(Rewards):
 
     def get_reward(self, name, snake_id, episode):
         return self.reward_dict[name]
+
+    def get_reward_table(self, number_of_snakes, episodes):
+        # The table is built again only when reward_dict changes. The cache of the reward
+        # values and table of each number of snakes is created on the first call, so
+        # subclasses do not need to call SimpleRewards.__init__
+        values = [self.reward_dict[name] for name in REWARD_NAMES]
+        table_cache = getattr(self, "_table_cache", None)
+        if table_cache is None:
+            table_cache = self._table_cache = {}
+        cached_values, table = table_cache.get(number_of_snakes, (None, None))
+        if values != cached_values:
+            table = np.broadcast_to(np.array(values), (number_of_snakes, len(REWARD_NAMES)))
+            table_cache[number_of_snakes] = (values, table)
+        return table
+
+def compute_rewards(rewards, outcomes, ate_food, alive, done, episodes):
+    '''
+    Compute the rewards of all the snakes of a turn. The rewards of each snake are added in
+    the order of the events of the turn: food, outcome, another turn and end of the game.
+    The rewards of several games are computed at once if the arrays have a leading game axis,
+    e.g. outcomes of shape (number_of_games, number_of_snakes) and done of shape
+    (number_of_games).
+
+    Parameters:
+    ----------
+    rewards: Rewards
+        With a reward table, the rewards are looked up for all the snakes at once.
+        Otherwise get_reward is called for each event of each snake
+
+    outcomes: np.array(number_of_snakes)
+        Outcome codes of the snakes, see collisions.Outcome
+
+    ate_food, alive: np.array(number_of_snakes) of bools
+
+    done: Bool or np.array of bools
+        The game is over, the snakes alive won and the others died
+
+    episodes: object
+        Episodes given to BattlesnakeGym.step
+
+    Returns:
+    --------
+    turn_rewards: np.array(number_of_snakes)
+    '''
+    number_of_snakes = np.shape(outcomes)[-1]
+    get_reward_table = getattr(rewards, "get_reward_table", None)
+    table = None if get_reward_table is None else get_reward_table(number_of_snakes, episodes)
+    if table is None and np.ndim(outcomes) > 1:
+        return np.array([compute_rewards(rewards, game_outcomes, game_ate_food, game_alive,
+                                         game_done, episodes)
+                         for game_outcomes, game_ate_food, game_alive, game_done in
+                         zip(outcomes, ate_food, alive, np.broadcast_to(done, len(outcomes)))])
+    if table is None:
+        return np.array([sum_event_rewards(rewards, i, outcomes[i], ate_food[i], alive[i],
+                                           done, episodes)
+                         for i in range(number_of_snakes)])
+
+    # The lookup is reused while the reward table is unchanged. The cache of the last reward
+    # table of each number of snakes and its lookup is created on the rewards on the first
+    # call, so subclasses do not need to call Rewards.__init__
+    lookup_cache = getattr(rewards, "_lookup_cache", None)
+    if lookup_cache is None:
+        lookup_cache = rewards._lookup_cache = {}
+    cached_table, lookup = lookup_cache.get(number_of_snakes, (None, None))
+    if cached_table is not table:
+        lookup = get_event_lookup(table)
+        lookup_cache[number_of_snakes] = (table, lookup)
+    events = np.asarray(outcomes, dtype=np.int64) * 4 + np.asarray(ate_food) * 2 + alive
+    turn_rewards = lookup[np.arange(number_of_snakes), events]
+    if np.ndim(done) > 0 or done:
+        end_rewards = np.where(alive, table[:, REWARD_INDEXES["won"]],
+                               table[:, REWARD_INDEXES["died"]])
+        turn_rewards = turn_rewards + np.where(np.expand_dims(done, -1), end_rewards, 0)
+    return turn_rewards
+
+def get_event_lookup(table):
+    '''
+    Helper function to add up the rewards of every combination of events of a turn before the
+    end of the game: lookup[i, 4 * outcome + 2 * ate_food + alive] is the reward of snake i.
+
+    Parameters:
+    ----------
+    table: np.array(number_of_snakes, len(REWARD_NAMES))
+
+    Returns:
+    --------
+    lookup: np.array(number_of_snakes, 4 * len(Outcome))
+    '''
+    zeros = np.zeros(len(table), dtype=table.dtype)
+    outcome_rewards = np.where(HAS_OUTCOME_REWARD, table[:, OUTCOME_REWARD_COLUMNS], zeros[:, None])
+    ate_food_rewards = np.stack([zeros, table[:, REWARD_INDEXES["ate_food"]]], axis=1)
+    turn_rewards = np.stack([zeros, table[:, REWARD_INDEXES["another_turn"]]], axis=1)
+    lookup = (ate_food_rewards[:, None, :, None] + outcome_rewards[:, :, None, None]) + \
+        turn_rewards[:, None, None, :]
+    return lookup.reshape(len(table), -1)
+
+def sum_event_rewards(rewards, snake_id, outcome, ate_food, alive, done, episodes):
+    '''
+    Helper function to add the rewards of the events of a snake with get_reward
+    '''
+    reward = 0
+    if ate_food:
+        reward += rewards.get_reward("ate_food", snake_id, episodes)
+    name = OUTCOME_REWARDS[Outcome(outcome)]
+    if name is not None:
+        reward += rewards.get_reward(name, snake_id, episodes)
+    if alive:
+        reward += rewards.get_reward("another_turn", snake_id, episodes)
+    if done:
+        reward += rewards.get_reward("won" if alive else "died", snake_id, episodes)
+    return reward
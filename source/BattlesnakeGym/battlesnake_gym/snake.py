@@ -13,20 +13,23 @@
 
 import numpy as np
 
-from .utils import get_random_coordinates
+from .utils import FreeCellIndex, random_integers
 
 class Snake:
     '''
-    The Snake class mimics the behaviour of snakes in Battlesnake.io based on 
+    The Snake class mimics the behaviour of snakes in Battlesnake.io based on
     https://docs.battlesnake.com/references/rules
-    
+
+    A Snake does not hold any state itself. It is a view on the row snake_id
+    of the arrays stored in Snakes.
+
     Parameters:
     -----------
-    starting_position: (int, int)
-        The initial position of the snake
+    snakes: Snakes
+        The Snakes object holding the state of this snake
 
-    map_size: (int, int)
-        The size of the map
+    snake_id: int
+        The index of this snake in snakes
     '''
 
     UP = 0
@@ -35,66 +38,56 @@ class Snake:
     RIGHT = 3
 
     FULL_HEALTH = 100
-    
-    def __init__(self, starting_position, map_size):
-        self.health = self.FULL_HEALTH
-        self.locations = [] # Head of the snake is element n and the end is element 0
-        self.locations.append(starting_position)
-        self.facing_direction = None
-        self._is_alive = True
-        self.ate_food = False
-        self.map_size = map_size
-        self.colour = list(np.random.choice(range(256), size=3))
-        self._number_of_initial_body_stacking = 2 # At the start of the game, snakes of size 3 are stacked.
-        # self._number_of_initial_body_stacking == 2 to account for the initial body
 
-    @classmethod
-    def make_from_list(cls, locations, health, map_size):
+    def __init__(self, snakes, snake_id):
+        self._snakes = snakes
+        self.snake_id = snake_id
+
+    @property
+    def map_size(self):
+        return self._snakes.map_size
+
+    @property
+    def health(self):
+        return int(self._snakes.health[self.snake_id])
+
+    @health.setter
+    def health(self, value):
+        self._snakes.health[self.snake_id] = value
+
+    @property
+    def facing_direction(self):
+        facing_direction = self._snakes.facing[self.snake_id]
+        if facing_direction == Snakes.NO_DIRECTION:
+            return None
+        return int(facing_direction)
+
+    @property
+    def ate_food(self):
+        return bool(self._snakes.ate_food[self.snake_id])
+
+    @property
+    def colour(self):
+        return self._snakes.colours[self.snake_id]
+
+    @colour.setter
+    def colour(self, value):
+        self._snakes.colours[self.snake_id] = value
+
+    @property
+    def locations(self):
         '''
-        Class method to make a snake from a list of coordinates.
-        Parameters:
-        ----------
-        locations: [(int, int)]
-            An ordered list of coordinates of the body (y, x)
-        health: int
-            The health of the snake
-        map_size: (int, int)
+        List of the coordinates of the snake.
+        Head of the snake is element n and the end is element 0
         '''
-        tmp_locations = []
-        for i, j in locations[::-1]: # head is element n
-            tmp_locations.append(np.array([i, j])) 
+        return list(self._snakes.get_body_coordinates(self.snake_id))
 
-        if len(tmp_locations) == 0:
-            head = None
-        else:
-            head = tmp_locations[-1]
-        cls = Snake(head, map_size)
-        cls.locations = tmp_locations
-        cls.health = health
-        if len(tmp_locations) == 0:
-            cls.kill_snake()
-
-        if len(cls.locations) > 1:
-            # Calculate the facing direction with the head and the next location
-            snake_head = cls.locations[-1]
-            snake_2nd_body = cls.locations[-2]
-            difference = (snake_head[0] - snake_2nd_body[0], snake_head[1] - snake_2nd_body[1])
-            if difference[0] == -1 and difference[1] == 0:
-                cls.facing_direction = Snake.UP
-            elif difference[0] == 1 and difference[1] == 0:
-                cls.facing_direction = Snake.DOWN
-            elif difference[0] == 0 and difference[1] == -1:
-                cls.facing_direction = Snake.LEFT
-            elif difference[0] == 0 and difference[1] == 1:
-                cls.facing_direction = Snake.RIGHT
-        return cls
-        
     def move(self, direction):
         '''
         Moves the snakes in the direction stated
 
-        If the direction 
-        
+        If the direction
+
         Parameters:
         -----------
         direction: int, options: [Snake.UP, Snake.DOWN, Snake.LEFT or Snake.RIGHT]
@@ -105,35 +98,11 @@ class Snake:
         is_forbidden: Boolean
             Whether the move was a forbidden one: moving backward in its own body
         '''
-        is_forbidden = False
-        if not self._is_alive:
-            return is_forbidden
-        
-        if self.facing_direction == None:
-            self.facing_direction == direction
-
-        if self.is_facing_opposite_of_direction(direction) and len(self.locations) > 0:
-            direction = self.facing_direction
-            is_forbidden = True
-
-        head = self.get_head()
-        new_head = self._translate_coordinate_in_direction(head, direction)
+        return self._snakes.move_snake(self.snake_id, direction)
 
-        # If the snake is within the first 3 turns of being alive, do no remove the end
-        if self._number_of_initial_body_stacking > 0:
-            self._number_of_initial_body_stacking -= 1
-        # If the snake ate food, do not remove the end
-        elif self.ate_food:
-            self.ate_food = False
-        else:
-            self.locations = self.locations[1:] # remove the end
-        self.locations.append(new_head)
-        self.facing_direction = direction
-        return is_forbidden
-        
     def is_facing_opposite_of_direction(self, direction):
         '''
-        Function to indicate if the indended direction is in the opposite of 
+        Function to indicate if the indended direction is in the opposite of
         the direction in which is snake is travelling
 
         Parameters:
@@ -141,40 +110,28 @@ class Snake:
         direction: int, options: [Snake.UP, Snake.DOWN, Snake.LEFT or Snake.RIGHT]
             Direction intended for the snake to travel
         '''
-        if self.facing_direction == self.UP and direction == self.DOWN:
-            return True
-        if self.facing_direction == self.DOWN and direction == self.UP:
-            return True
-        if self.facing_direction == self.RIGHT and direction == self.LEFT:
-            return True
-        if self.facing_direction == self.LEFT and direction == self.RIGHT:
-            return True
-        return False
+        facing_direction = self._snakes.facing[self.snake_id]
+        if facing_direction == Snakes.NO_DIRECTION:
+            return False
+        return Snakes.OPPOSITE_DIRECTIONS[facing_direction] == direction
 
     def get_previous_snake_head(self):
         '''
         Returns the location of head in the previous time step
-        
+
         Move 1 space in the opposite direction of self.facing direction
         '''
-        head = self.get_head()
-        previous_head = np.copy(head)
-        
-        if self.facing_direction == Snake.UP:
-            previous_head[0] += 1
-        elif self.facing_direction == Snake.DOWN:
-            previous_head[0] -= 1
-        elif self.facing_direction == Snake.RIGHT:
-            previous_head[1] -= 1
-        elif self.facing_direction == Snake.LEFT:
-            previous_head[1] += 1
+        previous_head = np.copy(self.get_head())
+        facing_direction = self._snakes.facing[self.snake_id]
+        if facing_direction != Snakes.NO_DIRECTION:
+            previous_head -= Snakes.DIRECTIONS[facing_direction]
         return previous_head
 
     def get_head(self):
-        return self.locations[-1]
+        return self._snakes.get_head(self.snake_id)
 
     def get_tail(self):
-        return self.locations[0]
+        return self._snakes.get_tail(self.snake_id)
 
     def get_body(self):
         return self.locations[:-1]
@@ -182,7 +139,7 @@ class Snake:
     def _translate_coordinate_in_direction(self, origin, direction):
         '''
         Helper function to translate a coordinate to a direction
-        
+
         Parameters:
         -----------
         origin: (int, int)
@@ -196,17 +153,7 @@ class Snake:
         coordinate: (int, int)
             Translated coordinate
         '''
-        new_coordinate = np.copy(origin)
-        if direction == self.UP:
-            new_coordinate[0] = new_coordinate[0] - 1
-        elif direction == self.DOWN:
-            new_coordinate[0] = new_coordinate[0] + 1
-        elif direction == self.LEFT:
-            new_coordinate[1] = new_coordinate[1] - 1
-        elif direction == self.RIGHT:
-            new_coordinate[1] = new_coordinate[1] + 1
-        
-        return new_coordinate
+        return np.array(origin) + Snakes.DIRECTIONS[direction]
 
     def can_snake_move_in_direction(self, direction):
         '''
@@ -214,21 +161,17 @@ class Snake:
         Checks for:
         - If the snake is moving in the opposite direction as the way it's travelling
         (could be expanded if necessary)
-        
+
         Parameters:
         -----------
-        origin: (int, int)
-            Coordinate to be moved
-
         Direction: int, options: [Snake.UP, Snake.DOWN, Snake.LEFT or Snake.RIGHT
             Direction to be moved
 
         Returns:
         -------
-        coordinate: (int, int)
-            Translated coordinate
+        can_move: Bool
         '''
-        if self._is_facing_opposite_of_direction(direction):
+        if self.is_facing_opposite_of_direction(direction):
             return False
         return True
 
@@ -258,29 +201,31 @@ class Snake:
         --------
         map_image, np.array(self.map_size)
             image of the position of this snake
-        '''        
+        '''
         if return_type == "Colour":
             map_image = np.zeros((self.map_size[0], self.map_size[1], 3))
         else:
             map_image = np.zeros((self.map_size[0], self.map_size[1]))
 
-        if not self._is_alive or self.is_head_outside_map():
+        if not self.is_alive() or self.is_head_outside_map():
             # To check if the snake is dead or not
             return map_image
 
-        for i, location in enumerate(self.locations):
-            if return_type == "Colour":
-                map_image[location[0], location[1], :] = self.colour
-            elif return_type == "Binary":
-                map_image[location[0], location[1]] = 1
-            elif return_type == "Numbered":
-                map_image[location[0], location[1]] = i+1
+        locations = self._snakes.get_body_coordinates(self.snake_id)
+        i, j = locations[:, 0], locations[:, 1]
+        if return_type == "Colour":
+            map_image[i, j, :] = self.colour
+        elif return_type == "Binary":
+            map_image[i, j] = 1
+        elif return_type == "Numbered":
+            map_image[i, j] = np.arange(1, len(locations) + 1)
 
         # Color the head differently
+        head = locations[-1]
         if return_type == "Colour":
-            map_image[self.get_head()[0], self.get_head()[1], :] *= 0.5
+            map_image[head[0], head[1], :] *= 0.5
         elif return_type == "Binary":
-            map_image[self.get_head()[0], self.get_head()[1]] = 5
+            map_image[head[0], head[1]] = 5
 
         return map_image
 
@@ -288,62 +233,260 @@ class Snake:
         '''
         Set snake to be dead
         '''
-        self._is_alive = False
-        self.locations = []
+        self._snakes.kill_snake(self.snake_id)
 
     def is_alive(self):
         '''
         Get if the snake is alive
         '''
-        return self._is_alive
+        return bool(self._snakes.alive[self.snake_id])
 
     def get_size(self):
         '''
         Get the snake size
         '''
-        return len(self.locations)
+        return int(self._snakes.length[self.snake_id])
 
     def set_ate_food(self):
         '''
         Actions taken when the snake eaten food
         '''
-        self.ate_food = True
-        self.health = self.FULL_HEALTH
+        self._snakes.set_ate_food(self.snake_id)
 
 class Snakes:
     '''
     The Snakes class managers n number of snakes
-    
+
+    The state of every snake is stored in preallocated arrays (struct of arrays)
+    so that all the snakes can be moved together without allocating new objects
+    every turn. The body of each snake is a ring buffer of coordinates indexed by
+    absolute positions: the head of snake i is at head_position[i] and the tail
+    at head_position[i] - length[i] + 1 (modulo the capacity of the buffer).
+
+    The Snakes class also maintains an occupancy grid of the map. For each cell,
+    grid_owner is the id of the snake on the cell (Snakes.EMPTY if there is none),
+    grid_position is the absolute position of the segment on the cell and
+    grid_count the number of segments stacked on the cell. The grid is only
+    updated when a head is added or a tail is removed. free_cells indexes the
+    cells that are not occupied, read from grid_count.
+
+    The cells of the maps that changed since the last call to clear_changes are
+    flagged in changed: cells added or removed from the grid and the previous heads
+    of the snakes (their value goes from 5 to 1 in the 51 maps). renumbered flags the
+    snakes whose tail moved: all their values change in the numbered maps.
+
+    The snakes of several games can be stored together, see make_batch. The arrays of the
+    snakes of all the games are stacked and the grids have a leading game axis, so that
+    move_snakes, place_heads and kill_snake play the turn of all the games at once.
+    The grid methods index the grids with flat cell indexes (see get_grid_cells).
+
     Parameters
     ----------
     map_size: (int, int)
     number_of_snakes: int
-    
+
     snake_spawn_locations: [(int, int)] optional
         Parameter to force snakes to spawn in certain positions. Used for testing
+
+    np_random: np.random.Generator or np.random.RandomState, optional
+        Random generator used to spawn the snakes. Defaults to np.random
     '''
-    def __init__(self, map_size, number_of_snakes, snake_spawn_locations=[]):
+    NO_DIRECTION = -1
+    EMPTY = -1
+
+    # Translations of Snake.UP, Snake.DOWN, Snake.LEFT and Snake.RIGHT
+    DIRECTIONS = np.array([[-1, 0], [1, 0], [0, -1], [0, 1]])
+    OPPOSITE_DIRECTIONS = np.array([Snake.DOWN, Snake.UP, Snake.RIGHT, Snake.LEFT])
+
+    # At the start of the game, snakes of size 3 are stacked.
+    # INITIAL_BODY_STACKING == 2 to account for the initial body
+    INITIAL_BODY_STACKING = 2
+
+    def __init__(self, map_size, number_of_snakes, snake_spawn_locations=[], capacity=None,
+                 np_random=None):
         self.map_size = map_size
         self.number_of_snakes = number_of_snakes
+        self.number_of_games = 1
+        self.np_random = np.random if np_random is None else np_random
+        self._batch = None
+        if capacity is None:
+            # A snake cannot be longer than the map plus the head that moved into its own body
+            capacity = map_size[0] * map_size[1] + 2
+        self._allocate(capacity)
         self.snakes = self._initialise_snakes(number_of_snakes, snake_spawn_locations)
 
-    def _initialise_snakes(self, number_of_snakes, snake_spawn_locations):
-        snakes = []
+    @classmethod
+    def make_batch(cls, map_size, number_of_snakes, number_of_games, capacity=None):
+        '''
+        Class method to create the Snakes of number_of_games games played together. Snake i
+        of game g is snake g * number_of_snakes + i of the batch and the grids are of shape
+        (number_of_games, map_size[0], map_size[1]). The games have no snakes until they are
+        set through the Snakes returned by get_game.
+
+        Parameters
+        ----------
+        map_size: (int, int)
+        number_of_snakes: int
+            Number of snakes of each game
+        number_of_games: int
+        capacity: int, optional
+            Size of the ring buffer of the bodies. The bodies of the games cannot be longer
+        '''
+        if capacity is None:
+            capacity = 2 * map_size[0] * map_size[1] + 2
+        batch = cls.__new__(cls)
+        batch.map_size = map_size
+        batch.number_of_snakes = number_of_snakes * number_of_games
+        batch.number_of_games = number_of_games
+        batch.np_random = np.random
+        batch._batch = None
+        batch._allocate(capacity)
+        batch.alive[:] = False
+        batch.head_on_grid[:] = True
+        batch.snakes = []
+        return batch
+
+    def get_game(self, game):
+        '''
+        Returns the Snakes of one game of a batch. Its arrays are views of the arrays of the
+        batch, so the game can be reset, set or drawn on its own like any other Snakes.
+
+        Parameters
+        ----------
+        game: int
+        '''
+        number_of_snakes = self.number_of_snakes // self.number_of_games
+        rows = slice(game * number_of_snakes, (game + 1) * number_of_snakes)
+        snakes = Snakes.__new__(Snakes)
+        snakes.map_size = self.map_size
+        snakes.number_of_snakes = number_of_snakes
+        snakes.number_of_games = 1
+        snakes.np_random = np.random
+        snakes._batch = self
+        snakes.capacity = self.capacity
+        for name in ["body", "head_position", "length", "health", "alive", "facing", "stacking",
+                     "ate_food", "head_on_grid", "renumbered", "heads", "previous_heads"]:
+            setattr(snakes, name, getattr(self, name)[rows])
+        for name in ["grid_owner", "grid_position", "grid_count", "changed"]:
+            setattr(snakes, name, getattr(self, name)[game])
+        snakes.colours = [None] * number_of_snakes
+        snakes.free_cells = FreeCellIndex(snakes.grid_count)
+        snakes._allocate_buffers()
+        snakes.snakes = [Snake(snakes, i) for i in range(number_of_snakes)]
+        return snakes
+
+    def _allocate(self, capacity):
+        '''
+        Helper function to allocate the arrays containing the state of the snakes
+        '''
+        n = self.number_of_snakes
+        self.capacity = capacity
+        self.body = np.zeros((n, capacity, 2), dtype=np.int64)
+        self.head_position = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.health = np.full(n, Snake.FULL_HEALTH, dtype=np.int64)
+        self.alive = np.zeros(n, dtype=bool)
+        self.facing = np.full(n, self.NO_DIRECTION, dtype=np.int64)
+        self.stacking = np.full(n, self.INITIAL_BODY_STACKING, dtype=np.int64)
+        self.ate_food = np.zeros(n, dtype=bool)
+        self.colours = [None] * n
+
+        # Occupancy grid, with a leading game axis for batches
+        grid_shape = tuple(self.map_size)
+        if self.number_of_games > 1:
+            grid_shape = (self.number_of_games,) + grid_shape
+        self.grid_owner = np.full(grid_shape, self.EMPTY, dtype=np.int64)
+        self.grid_position = np.zeros(grid_shape, dtype=np.int64)
+        self.grid_count = np.zeros(grid_shape, dtype=np.int64)
+        self.head_on_grid = np.zeros(n, dtype=bool)
+        self.free_cells = FreeCellIndex(self.grid_count) if self.number_of_games == 1 else None
+        self.changed = np.zeros(grid_shape, dtype=bool)
+        self.renumbered = np.zeros(n, dtype=bool)
+        self.heads = np.zeros((n, 2), dtype=np.int64)
+        self.previous_heads = np.zeros((n, 2), dtype=np.int64)
+        self._allocate_buffers()
+
+    def _allocate_buffers(self):
+        '''
+        Helper function to allocate the buffers reused every turn
+        '''
+        n = self.number_of_snakes
+        capacity = self.capacity
+
+        # Offset of the grid of the game of each snake in the flat grids and id of each snake
+        # in its game, written in grid_owner
+        snakes_per_game = n // self.number_of_games
+        self._grid_offsets = np.arange(n) // snakes_per_game * (self.map_size[0] * self.map_size[1])
+        self._grid_ids = np.arange(n) % snakes_per_game
+
+        # Buffers reused every turn by move_snakes
+        self._actions = np.zeros(n, dtype=np.int64)
+        self._moving = np.zeros(n, dtype=bool)
+        self._starved = np.zeros(n, dtype=bool)
+        self._forbidden = np.zeros(n, dtype=bool)
+        self._keep_tail = np.zeros(n, dtype=bool)
+        self._removing = np.zeros(n, dtype=bool)
+        self._rows = np.zeros(n, dtype=np.int64)
+        self._row_offsets = np.arange(n) * capacity
+        self._cells = np.zeros((n, 2), dtype=np.int64)
+
+        # Buffers reused every turn by kernels.step_snakes, with _actions, _starved,
+        # _forbidden and _moving
+        self._outcomes = np.zeros(n, dtype=np.int64)
+        self._eaten = np.zeros(n, dtype=bool)
+        self._segments = np.zeros((capacity, 2), dtype=np.int64)
+        self._owner = np.zeros(n, dtype=np.int64)
+        self._ate = np.zeros((n, n), dtype=bool)
 
+    def _initialise_snakes(self, number_of_snakes, snake_spawn_locations):
         if len(snake_spawn_locations) == 0:
-            starting_positions = get_random_coordinates(self.map_size, number_of_snakes)
+            starting_positions = self.free_cells.sample(number_of_snakes, self.np_random)
         else:
             error_message = "the number of coordinates in snake_spawn_locations must match the number of snakes"
             assert len(snake_spawn_locations) == self.number_of_snakes, error_message
             starting_positions = snake_spawn_locations
 
+        colours = random_integers(self.np_random, 256, size=(number_of_snakes, 3))
+        snakes = []
         for i in range(number_of_snakes):
-            snakes.append(Snake(starting_position=starting_positions[i], map_size=self.map_size))
-
+            self.body[i, 0] = starting_positions[i]
+            self.heads[i] = starting_positions[i]
+            self.length[i] = 1
+            self.alive[i] = True
+            self.colours[i] = list(colours[i])
+            snakes.append(Snake(self, i))
+        self.place_heads()
         return snakes
 
+    def reset(self, snake_spawn_locations=[]):
+        '''
+        Respawn the snakes as if the class was created again, reusing the arrays
+
+        Parameters:
+        ----------
+        snake_spawn_locations: [(int, int)] optional
+            See Snakes
+        '''
+        self.head_position[:] = 0
+        self.length[:] = 0
+        self.health[:] = Snake.FULL_HEALTH
+        self.alive[:] = False
+        self.facing[:] = self.NO_DIRECTION
+        self.stacking[:] = self.INITIAL_BODY_STACKING
+        self.ate_food[:] = False
+        self.colours = [None] * self.number_of_snakes
+        self.grid_owner.fill(self.EMPTY)
+        self.grid_position.fill(0)
+        self.grid_count.fill(0)
+        self.head_on_grid[:] = False
+        self.changed.fill(False)
+        self.renumbered[:] = False
+        self.heads[:] = 0
+        self.previous_heads[:] = 0
+        self.snakes = self._initialise_snakes(self.number_of_snakes, snake_spawn_locations)
+
     @classmethod
-    def make_from_dict(cls, map_size, snake_dicts):
+    def make_from_dict(cls, map_size, snake_dicts, np_random=None):
         '''
         Class method to create the Snakes class from a dictionary of snakes
 
@@ -353,22 +496,236 @@ class Snakes:
         snake_dicts: [{}]
             A list of snake_dict.
             dictionary are in the form of the battlesnake engine
+        np_random: np.random.Generator or np.random.RandomState, optional
         '''
         number_of_snakes = len(snake_dicts)
-        cls = Snakes(map_size, number_of_snakes)
-        cls.snakes = []
-        
-        for snake_dict in snake_dicts:
-            locations = []
+        longest_body = max([len(snake_dict["body"]) for snake_dict in snake_dicts] + [0])
+        capacity = map_size[0] * map_size[1] + longest_body + 2
+        placeholder_locations = [(0, 0)] * number_of_snakes
+        cls = Snakes(map_size, number_of_snakes, placeholder_locations, capacity=capacity,
+                     np_random=np_random)
+        for i in range(number_of_snakes):
+            cls.kill_snake(i)
 
+        for i, snake_dict in enumerate(snake_dicts):
+            locations = []
             for loc in snake_dict["body"]:
                 locations.append((loc["y"], loc["x"]))
-            
-            health = snake_dict["health"]
-            snake = Snake.make_from_list(locations, health, map_size)
-            cls.snakes.append(snake)
+            cls._set_snake_from_list(i, locations, snake_dict["health"])
         return cls
 
+    def _set_snake_from_list(self, snake_id, locations, health):
+        '''
+        Helper function to set the state of a snake from a list of coordinates.
+
+        Parameters:
+        ----------
+        snake_id: int
+        locations: [(int, int)]
+            An ordered list of coordinates of the body (y, x). The head is element 0
+        health: int
+            The health of the snake
+        '''
+        self.health[snake_id] = health
+        self.stacking[snake_id] = self.INITIAL_BODY_STACKING
+        self.ate_food[snake_id] = False
+        self.facing[snake_id] = self.NO_DIRECTION
+        if len(locations) == 0:
+            self.kill_snake(snake_id)
+            return
+
+        length = len(locations)
+        self.body[snake_id, :length] = locations[::-1] # head is element n
+        self.head_position[snake_id] = length - 1
+        self.length[snake_id] = length
+        self.alive[snake_id] = True
+        self.heads[snake_id] = locations[0]
+        self._add_to_grid(snake_id, np.arange(length))
+        self.head_on_grid[snake_id] = True
+
+        if length > 1:
+            # Calculate the facing direction with the head and the next location
+            difference = np.subtract(locations[0], locations[1])
+            for direction, translation in enumerate(self.DIRECTIONS):
+                if np.array_equal(difference, translation):
+                    self.facing[snake_id] = direction
+
+    def set_state(self, bodies, health, facing, stacking, ate_food, alive, colours):
+        '''
+        Set the state of all the snakes. Used to restore snapshots of the game.
+
+        Parameters:
+        ----------
+        bodies: [np.array(length, 2)]
+            Coordinates of the body of each snake (y, x). The head is element 0
+        health, facing, stacking, ate_food, alive: np.array(number_of_snakes)
+        colours: np.array(number_of_snakes, 3)
+        '''
+        longest_body = max([len(body) for body in bodies] + [0])
+        if longest_body + 2 > self.capacity:
+            assert self._batch is None, "The bodies are too long for the batch of games"
+            self._allocate(self.map_size[0] * self.map_size[1] + longest_body + 2)
+
+        # The occupancy grid is rebuilt at once, free_cells is read from it
+        self.grid_owner.fill(self.EMPTY)
+        self.grid_position.fill(0)
+        self.grid_count.fill(0)
+        self.changed.fill(True)
+        self.renumbered[:] = False
+        for i, body in enumerate(bodies):
+            length = len(body)
+            self.health[i] = health[i]
+            self.facing[i] = facing[i]
+            self.stacking[i] = stacking[i]
+            self.ate_food[i] = ate_food[i]
+            self.alive[i] = alive[i] and length > 0
+            self.colours[i] = list(colours[i])
+            self.head_on_grid[i] = True
+            self.head_position[i] = max(length - 1, 0)
+            self.length[i] = length
+            if length == 0:
+                continue
+            self.body[i, :length] = body[::-1] # head is element n
+            self.heads[i] = body[0]
+            cells = self.body[i, :length]
+            self.grid_owner[cells[:, 0], cells[:, 1]] = i
+            self.grid_position[cells[:, 0], cells[:, 1]] = np.arange(length)
+            np.add.at(self.grid_count, (cells[:, 0], cells[:, 1]), 1)
+
+    def get_head(self, snake_id):
+        '''
+        Returns the coordinate (y, x) of the head of the snake
+        '''
+        return self.body[snake_id, self.head_position[snake_id] % self.capacity]
+
+    def get_tail(self, snake_id):
+        '''
+        Returns the coordinate (y, x) of the end of the snake
+        '''
+        tail_position = self.head_position[snake_id] - self.length[snake_id] + 1
+        return self.body[snake_id, tail_position % self.capacity]
+
+    def get_body_coordinates(self, snake_id):
+        '''
+        Returns the coordinates of the snake ordered from the end to the head
+
+        Returns:
+        --------
+        coordinates: np.array(length, 2)
+        '''
+        length = self.length[snake_id]
+        positions = np.arange(self.head_position[snake_id] - length + 1,
+                              self.head_position[snake_id] + 1)
+        return self.body[snake_id, positions % self.capacity]
+
+    def _add_to_grid(self, snake_id, positions):
+        '''
+        Helper function to add segments of a snake to the occupancy grid
+
+        Parameters:
+        ----------
+        snake_id: int
+        positions: np.array of ints
+            Absolute positions of the segments in the body of the snake
+        '''
+        cells = self.get_grid_cells(snake_id, self.body[snake_id, positions % self.capacity])
+        self.grid_owner.ravel()[cells] = self._grid_ids[snake_id]
+        self.grid_position.ravel()[cells] = positions
+        self.changed.ravel()[cells] = True
+        np.add.at(self.grid_count.ravel(), cells, 1)
+
+    def _remove_from_grid(self, cells):
+        '''
+        Helper function to remove segments from the occupancy grid
+
+        Parameters:
+        ----------
+        cells: np.array(n)
+            Flat indexes of the cells of the segments to remove, see get_grid_cells
+        '''
+        grid_count, grid_owner = self.grid_count.ravel(), self.grid_owner.ravel()
+        np.subtract.at(grid_count, cells, 1)
+        grid_owner[cells] = np.where(grid_count[cells] == 0, self.EMPTY, grid_owner[cells])
+        self.changed.ravel()[cells] = True
+
+    def get_grid_cells(self, snake_ids, coordinates):
+        '''
+        Returns the flat indexes in the grids of coordinates of the games of the snakes
+
+        Parameters:
+        ----------
+        snake_ids: int or np.array(n)
+        coordinates: np.array(n, 2)
+            Coordinates (y, x) inside the map
+        '''
+        cells = coordinates[:, 0] * self.map_size[1] + coordinates[:, 1]
+        if self.number_of_games > 1:
+            cells += self._grid_offsets[snake_ids]
+        return cells
+
+    def place_heads(self):
+        '''
+        Add the heads of the snakes that moved and are still alive to the occupancy grid.
+        Heads are kept out of the grid until the collisions of the turn are resolved.
+        '''
+        placing = np.logical_and(self.alive, np.logical_not(self.head_on_grid))
+        ids = np.flatnonzero(placing)
+        cells = self.get_grid_cells(ids, self.heads[ids])
+        self.grid_owner.ravel()[cells] = self._grid_ids[ids]
+        self.grid_position.ravel()[cells] = self.head_position[ids]
+        self.changed.ravel()[cells] = True
+        np.add.at(self.grid_count.ravel(), cells, 1)
+        self.head_on_grid[ids] = True
+
+    def is_inside_map(self, coordinates):
+        '''
+        Returns booleans indicating if the coordinates are inside the map
+
+        Parameters:
+        ----------
+        coordinates: np.array(n, 2)
+        '''
+        return np.logical_and(np.all(coordinates >= 0, axis=-1),
+                              np.all(coordinates < self.map_size, axis=-1))
+
+    def get_changed_cells(self):
+        '''
+        Returns the coordinates (y, x) of the cells flagged in self.changed
+        and the ids of the snakes flagged in self.renumbered
+        '''
+        return np.argwhere(self.changed), np.flatnonzero(self.renumbered)
+
+    def clear_changes(self, cells=None):
+        '''
+        Reset the flags of the changed cells and of the renumbered snakes
+
+        Parameters:
+        ----------
+        cells: np.array(n, 2), optional
+            Coordinates of the flagged cells. All the cells are reset if not provided
+        '''
+        if cells is None:
+            self.changed[:] = False
+        else:
+            self.changed[cells[:, 0], cells[:, 1]] = False
+        self.renumbered[:] = False
+
+    def get_occupancy_map(self):
+        '''
+        Returns a binary map of the cells occupied by any snake
+        '''
+        return self.grid_count > 0
+
+    def _get_visible_snakes(self, excluded_snakes):
+        '''
+        Helper function to get the ids of the snakes that should be drawn in the maps:
+        snakes that are alive, with their head inside the map and that are not excluded
+        '''
+        visible = np.logical_and(self.alive, self.is_inside_map(self.heads))
+        for snake in excluded_snakes:
+            visible[snake.snake_id] = False
+        return np.flatnonzero(visible)
+
     def get_snake_51_map(self, excluded_snakes=[]):
         '''
         Function to generate a 51 map of the locations of any snake
@@ -376,17 +733,17 @@ class Snakes:
         Parameters:
         ----------
         excluded_snakes: [Snake]
-            Snakes to not be included in the binary map. 
+            Snakes to not be included in the binary map.
             Used to check if there are collisions between snakes
-        
+
         Returns:
         --------
         map_image: np.array(map_sizep[0], map_size[1], 1)
             If any snake is on coordinate i, j, map_image[i, j] will be 1
         '''
-        sum_map = np.sum(self.get_snake_depth_51_map(excluded_snakes=excluded_snakes), 2)   
+        sum_map = np.sum(self.get_snake_depth_51_map(excluded_snakes=excluded_snakes), 2)
         return sum_map
-            
+
     def get_snake_numbered_map(self, excluded_snakes=[]):
         '''
         Function to generate a numbered map of the locations of any snake
@@ -395,9 +752,9 @@ class Snakes:
         Parameters:
         ----------
         excluded_snakes: [Snake]
-            Snakes to not be included in the binary map. 
+            Snakes to not be included in the binary map.
             Used to check if there are collisions between snakes
-        
+
         Returns:
         --------
         map_image: np.array(map_sizep[0], map_size[1], 1)
@@ -414,7 +771,7 @@ class Snakes:
         Parameters:
         ----------
         excluded_snakes: [Snake]
-            Snakes to not be included in the binary map. 
+            Snakes to not be included in the binary map.
             Used to check if there are collisions between snakes
 
         Returns:
@@ -428,9 +785,12 @@ class Snakes:
         map_image = np.zeros((self.map_size[0], self.map_size[1],
                               len(self.snakes)),
                              dtype=np.uint8)
-        for i, snake in enumerate(self.snakes):
-            if snake not in excluded_snakes:
-                map_image[:, :, i] = snake.get_snake_map(return_type="Numbered")
+        ids = self._get_visible_snakes(excluded_snakes)
+        tail_position = self.head_position - self.length + 1
+        numbered_map = self.grid_position - tail_position[self.grid_owner] + 1
+        is_owner = self.grid_owner[:, :, None] == ids
+        map_image[:, :, ids] = np.where(is_owner, numbered_map[:, :, None], 0).astype(np.uint8)
+        map_image[self.heads[ids, 0], self.heads[ids, 1], ids] = self.length[ids]
         return map_image
 
 
@@ -441,7 +801,7 @@ class Snakes:
         Parameters:
         ----------
         excluded_snakes: [Snake]
-            Snakes to not be included in the binary map. 
+            Snakes to not be included in the binary map.
             Used to check if there are collisions between snakes
 
         Returns:
@@ -455,10 +815,9 @@ class Snakes:
         map_image = np.zeros((self.map_size[0], self.map_size[1],
                               len(self.snakes)),
                              dtype=np.uint8)
-        for i, snake in enumerate(self.snakes):
-            if snake not in excluded_snakes:
-                map_image[:, :, i] = snake.get_snake_map(return_type="Binary")
-
+        ids = self._get_visible_snakes(excluded_snakes)
+        map_image[:, :, ids] = self.grid_owner[:, :, None] == ids
+        map_image[self.heads[ids, 0], self.heads[ids, 1], ids] = 5
         return map_image
 
     def get_snake_colour_map(self):
@@ -479,25 +838,151 @@ class Snakes:
         '''
         The colours of each snake are provided
         '''
-        snake_colours = []
-        for snake in self.snakes:
-            snake_colours.append(snake.colour)
-        return snake_colours
+        return list(self.colours)
+
+    def move_snake(self, snake_id, direction):
+        '''
+        Moves one snake in the direction stated. See Snake.move
+        The new head is added to the occupancy grid by place_heads.
+        '''
+        is_forbidden = False
+        if not self.alive[snake_id]:
+            return is_forbidden
+
+        facing_direction = self.facing[snake_id]
+        if facing_direction != self.NO_DIRECTION and \
+           self.OPPOSITE_DIRECTIONS[facing_direction] == direction:
+            direction = facing_direction
+            is_forbidden = True
+
+        self.previous_heads[snake_id] = self.get_head(snake_id)
+        self.heads[snake_id] = self.previous_heads[snake_id] + self.DIRECTIONS[direction]
+        self.changed.ravel()[self.get_grid_cells(snake_id, self.previous_heads[snake_id][None])] = True
+
+        # If the snake is within the first 3 turns of being alive, do no remove the end
+        if self.stacking[snake_id] > 0:
+            self.stacking[snake_id] -= 1
+        # If the snake ate food, do not remove the end
+        elif self.ate_food[snake_id]:
+            self.ate_food[snake_id] = False
+        else:
+            self._remove_from_grid(self.get_grid_cells(snake_id, self.get_tail(snake_id)[None]))
+            self.length[snake_id] -= 1 # remove the end
+            self.renumbered[snake_id] = True
+
+        self.head_position[snake_id] += 1
+        self.length[snake_id] += 1
+        self.body[snake_id, self.head_position[snake_id] % self.capacity] = self.heads[snake_id]
+        self.head_on_grid[snake_id] = False
+        self.facing[snake_id] = direction
+        return is_forbidden
 
     def move_snakes(self, action):
         '''
-        Move the snakes based on action
+        Reduce the health of the snakes and move them based on action.
+        Snakes that starved or that attempted a forbidden move (moving backward
+        into their own body) are killed.
+
+        The ends of the snakes are removed from the occupancy grid but the new heads
+        are only added by place_heads, once the collisions are resolved.
 
         Parameters:
         ----------
         action: np.array(number_of_snakes)
-            Array of integers containing an action for each number of snake. 
-            The integers range from 0 to 3 corresponding to up, down, left, and right 
+            Array of integers containing an action for each number of snake.
+            The integers range from 0 to 3 corresponding to up, down, left, and right
             respectively
+
+        Returns:
+        --------
+        starved: np.array(number_of_snakes) of bools
+            Snakes that were killed because their health reached 0
+
+        forbidden: np.array(number_of_snakes) of bools
+            Snakes that were killed because of a forbidden move
+        '''
+        actions = self._actions
+        actions[:] = np.ravel(action)
+
+        # Reduce health by one
+        np.subtract(self.health, self.alive, out=self.health)
+        starved = np.logical_and(self.alive, self.health == 0, out=self._starved)
+        moving = np.logical_xor(self.alive, starved, out=self._moving)
+
+        forbidden = np.equal(self.OPPOSITE_DIRECTIONS[actions], self.facing, out=self._forbidden)
+        np.logical_and(forbidden, moving, out=forbidden)
+        np.logical_xor(moving, forbidden, out=moving)
+
+        # The arrays of all the snakes are computed in the preallocated buffers and only
+        # copied where the snakes are moving. body_rows[rows] is the head of each snake
+        body_rows = self.body.reshape(-1, 2)
+        rows, cells = self._rows, self._cells
+        moving_cells = moving[:, None]
+        moving_ids = np.flatnonzero(moving)
+
+        # Move the heads
+        np.remainder(self.head_position, self.capacity, out=rows)
+        np.add(rows, self._row_offsets, out=rows)
+        np.take(body_rows, rows, axis=0, out=cells)
+        np.copyto(self.previous_heads, cells, where=moving_cells)
+        np.take(self.DIRECTIONS, actions, axis=0, out=cells)
+        np.add(cells, self.previous_heads, out=cells)
+        np.copyto(self.heads, cells, where=moving_cells)
+        self.changed.ravel()[self.get_grid_cells(moving_ids, self.previous_heads[moving_ids])] = True
+
+        # If the snake is within the first 3 turns of being alive or ate food, do no remove the end
+        stacking = np.greater(self.stacking, 0, out=self._keep_tail)
+        np.logical_and(stacking, moving, out=stacking)
+        np.subtract(self.stacking, stacking, out=self.stacking)
+        digesting = np.logical_and(moving, self.ate_food, out=self._removing)
+        np.logical_and(digesting, np.logical_not(stacking), out=digesting)
+        np.logical_xor(self.ate_food, digesting, out=self.ate_food)
+        keep_tail = np.logical_or(stacking, digesting, out=self._keep_tail)
+
+        # Remove the ends of the snakes from the grid
+        removing = np.logical_xor(moving, keep_tail, out=self._removing)
+        np.subtract(self.head_position, self.length, out=rows)
+        np.add(rows, 1, out=rows)
+        np.remainder(rows, self.capacity, out=rows)
+        np.add(rows, self._row_offsets, out=rows)
+        removing_ids = np.flatnonzero(removing)
+        self._remove_from_grid(self.get_grid_cells(removing_ids, body_rows[rows[removing_ids]]))
+        np.logical_or(self.renumbered, removing, out=self.renumbered)
+        np.add(self.length, keep_tail, out=self.length)
+
+        # Add the new heads to the bodies
+        np.add(self.head_position, moving, out=self.head_position)
+        np.remainder(self.head_position, self.capacity, out=rows)
+        np.add(rows, self._row_offsets, out=rows)
+        body_rows[rows[moving_ids]] = self.heads[moving_ids]
+        np.logical_and(self.head_on_grid, np.logical_not(moving), out=self.head_on_grid)
+        np.copyto(self.facing, actions, where=moving)
+
+        for snake_id in np.flatnonzero(starved | forbidden):
+            self.kill_snake(snake_id)
+        return starved, forbidden
+
+    def kill_snake(self, snake_id):
+        '''
+        Set snake to be dead and remove it from the map
+        '''
+        end_position = self.head_position[snake_id] + 1
+        if not self.head_on_grid[snake_id]:
+            end_position -= 1
+        positions = np.arange(self.head_position[snake_id] - self.length[snake_id] + 1, end_position)
+        self._remove_from_grid(self.get_grid_cells(snake_id,
+                                                   self.body[snake_id, positions % self.capacity]))
+
+        self.alive[snake_id] = False
+        self.length[snake_id] = 0
+        self.head_on_grid[snake_id] = True
+
+    def set_ate_food(self, snake_id):
+        '''
+        Actions taken when the snake eaten food
         '''
-        for i in range(len(action)):
-            direction = action[i]
-            self.snakes[i].move(direction)
+        self.ate_food[snake_id] = True
+        self.health[snake_id] = Snake.FULL_HEALTH
 
     def get_snakes(self):
         '''
@@ -12,29 +12,134 @@
 # permissions and limitations under the License.
 
 import numpy as np
-import gym
-from gym import spaces
-from gym.utils import seeding
 import json
+import os
 import string
+from collections import deque
 
 from .snake import Snakes
 from .food import Food
-from .game_state_parser import Game_state_parser
-from .rewards import SimpleRewards
-from .utils import get_random_coordinates, MultiAgentActionSpace, get_distance
+from .game_state_parser import Game_state_parser, encode_game_states
+from .rewards import SimpleRewards, compute_rewards
+from .collisions import (resolve_collisions, is_deadly, SnakeInfo, OUTCOME_LABELS,
+                         DID_NOT_COLLIDE, STARVED, FORBIDDEN_MOVE, DEAD)
+from .bitboard import BitboardBoard
+from .kernels import step_snakes, KERNEL_BACKEND
+from .snapshot import encode_snapshot, decode_snapshot, decode_snapshot_header
+from .profiling import PhaseProfiler, is_profiling_enabled
+from .renderer import get_renderer
+from .api_encoder import MoveRequestEncoder
+from .spawns import sample_spawn_layout
+from .territory import compute_territory
+from .utils import MultiAgentActionSpace, random_integers, get_egocentric_states
 
-class BattlesnakeGym(gym.Env):
+# Setting this environment variable selects the engine of every BattlesnakeGym created without engine
+ENGINE_ENV_VARIABLE = "BATTLESNAKE_GYM_ENGINE"
+
+# Arrays of the info of info_mode="array", indexed by snake
+INFO_ARRAYS = ("snake_health", "snake_info", "snake_alive", "snake_length", "snake_max_len")
+
+def info_to_dict(info):
+    '''
+    Convert an info of info_mode="array" into the info of info_mode="dict".
+    The other entries of info (e.g. "current_turn", "game_over") are kept.
+
+    Parameters:
+    ----------
+    info: {}
+        Info returned by reset or step, see BattlesnakeGym
+
+    Returns:
+    --------
+    info: {}
+        Copy of the info with "snake_health", "snake_info" and "snake_max_len" dictionaries
+    '''
+    converted = {key: value for key, value in info.items() if key not in INFO_ARRAYS}
+    converted['snake_health'] = dict(enumerate(np.asarray(info['snake_health']).tolist()))
+    converted['snake_info'] = SnakeInfo(np.array(info['snake_info'], dtype=np.int8))
+    converted['snake_max_len'] = dict(enumerate(np.asarray(info['snake_max_len']).tolist()))
+    return converted
+
+def draw_changed_cells(states, snakes, food_map, food_changed, numbered):
+    '''
+    Rewrite the cells of the observation states flagged by Snakes.changed and food_changed
+    and clear the flags. In the numbered observations, values are relative to the tail so
+    the snakes whose tail moved (Snakes.renumbered) are rewritten entirely.
+    The games of a batch of Snakes (see Snakes.make_batch) are drawn at once.
+
+    Parameters:
+    ----------
+    states: np.array(number_of_games, m, n, number_of_snakes + 1)
+        Observation states without their borders
+    snakes: Snakes
+    food_map, food_changed: np.array(map_size) or np.array(number_of_games, map_size)
+    numbered: Bool
+        Draw the numbered observations instead of the 51s observations
+
+    Returns:
+    --------
+    cells: np.array
+        Flat indexes of the rewritten cells in the grids of snakes
+    '''
+    changed = np.logical_or(snakes.changed, food_changed, out=snakes.changed)
+    snakes_per_game = states.shape[-1] - 1
+    if numbered:
+        renumbered = np.logical_and(snakes.renumbered, snakes.alive, out=snakes.renumbered)
+        if renumbered.any():
+            owner = snakes.grid_owner.reshape(len(states), -1)
+            ids = owner
+            if len(states) > 1:
+                ids = owner + (np.arange(len(states)) * snakes_per_game)[:, None]
+            np.logical_or(changed.reshape(owner.shape),
+                          np.logical_and(owner != snakes.EMPTY, renumbered[ids]),
+                          out=changed.reshape(owner.shape))
+    cells = np.flatnonzero(changed)
+    snakes.clear_changes()
+    food_changed.fill(False)
+
+    # The cells of a single game do not need to be split by game
+    height, width = snakes.map_size
+    games, i = (0, cells) if len(states) == 1 else np.divmod(cells, height * width)
+    i, j = np.divmod(i, width)
+    states[games, i, j, 0] = food_map.ravel()[cells]
+    states[games, i, j, 1:] = 0
+
+    # The grid only contains the snakes that are alive, their heads are inside the map
+    owner = snakes.grid_owner.ravel()[cells]
+    visible = owner != snakes.EMPTY
+    i, j, owner = i[visible], j[visible], owner[visible]
+    if len(states) > 1:
+        games = games[visible]
+    ids = games * snakes_per_game + owner
+    if numbered:
+        tail_position = snakes.head_position[ids] - snakes.length[ids] + 1
+        values = (snakes.grid_position.ravel()[cells[visible]] - tail_position + 1).astype(np.uint8)
+    else:
+        heads = snakes.heads[ids]
+        is_head = np.logical_and(heads[:, 0] == i, heads[:, 1] == j)
+        values = np.where(is_head, 5, 1)
+    states[games, i, j, 1 + owner] = values
+    return cells
+
+class BattlesnakeGym:
     metadata = {
         "render.modes": ["human", "rgb_array", "ascii"],
         "observation.types": ["flat-num", "bordered-num",
                               "max-bordered-num",
                               "flat-51s", "bordered-51s", 
-                              "max-bordered-51s"]
+                              "max-bordered-51s"],
+        "engines": ["numpy", "numba", "bitboard"],
+        "spawn.layouts": ["random", "pool", "official"],
+        "game_states.orders": ["sequential", "random"],
+        "info.modes": ["dict", "array"]
     }
+    reward_range = (-float("inf"), float("inf"))
+    spec = None
     '''
     OpenAI Gym for BattlesnakeIO 
     Behaviour of snakes in Battlesnake.io based on https://docs.battlesnake.com/references/rules
+    The gym has the interface of gym.Env without inheriting from it, so that importing this
+    module does not import gym. gym is imported when the spaces are built and when seeding.
 
     Parameters:
     ----------
@@ -58,8 +163,8 @@ class BattlesnakeGym(gym.Env):
     
     food_spawn_location: [(int, int)] optional, default=[]
         Parameter to force food to spawn in certain positions. Used for testing
-        Food will spawn in the coordinates provided in the list until the list is exhausted.
-        After the list is exhausted, food will be randomly spawned
+        Food will spawn in the coordinates provided in the list every turn until the list is
+        exhausted. After the list is exhausted, food will be randomly spawned
 
     verbose: Bool, optional, default=False
 
@@ -67,13 +172,93 @@ class BattlesnakeGym(gym.Env):
         Dictionary to indicate the initial game state
         Dict is in the same form as in the battlesnake engine
         https://docs.battlesnake.com/references/api
+        The dict is parsed once, see set_game_states
+
+    rewards: Rewards, optional, default=None
+        Rewards of the snakes, see rewards.py. A new SimpleRewards if None
+
+    validate: Bool, optional, default=False
+        Check the invariants of the game state after every step. Compact snapshots of the
+        last VALIDATION_HISTORY turns are kept and printed as json if an invariant fails.
+
+    observation_dtype: np.dtype, optional, default=None
+        dtype of the observations, e.g. np.uint8, np.int8 or np.float32.
+        Bordered observations contain -1 so they require a signed dtype.
+        By default, flat observations are np.uint8 and bordered observations are np.float64
+
+    copy_observation: Bool, optional, default=True
+        If False, reset and step return the observation buffer owned by the gym. The buffer
+        is overwritten by the next step so it must be copied to be kept.
+
+    profile: Bool, optional, default=None
+        Time the phases of step (move, collision or kernel, food, reward, info, validate and
+        observation), reset and render. See get_profile.
+        By default, profiling is enabled by setting the environment variable
+        BATTLESNAKE_GYM_PROFILE=1
+
+    profile_callback: function(call, timings), optional, default=None
+        Function called after each step, reset and render with the timings of the call.
+        Enables profiling. See profiling.PhaseProfiler
+
+    engine: str, optional, options=["numpy", "numba", "bitboard"], default=None
+        Engine resolving the rules of the game
+        1- "numpy" resolves the collisions of all the snakes with array operations
+           on the occupancy grid of Snakes (see collisions.resolve_collisions)
+        2- "numba" moves the snakes, resolves the collisions and eats the food in one
+           compiled kernel (see kernels.py). Requires Numba
+        3- "bitboard" plays the turn on the bitboards of a BitboardBoard built from the game
+           (see BitboardBoard.step) and sets the snakes and the food from the board
+        By default, the engine is set by the environment variable BATTLESNAKE_GYM_ENGINE.
+        Otherwise it is "numba" if Numba is installed and "numpy" if not.
+        self.engine is the engine in use
+
+    spawn_layout: str, optional, options=["random", "pool", "official"], default="random"
+        Sets where the snakes spawn when snake_spawn_locations is empty
+        1- "random" draws distinct free cells
+        2- "pool" draws a layout from a pool of random layouts precomputed for each
+           map size and number of snakes (see spawns.get_spawn_pool)
+        3- "official" uses the fixed spawn points of the official rules: corners first, then
+           the middle of the sides (see spawns.get_official_spawn_points). Up to 8 snakes
+
+    egocentric: Bool, optional, default=False
+        If True, reset and step return the views of all the snakes as one
+        np.array(number_of_snakes, m, n, 3), see get_egocentric_observation
+
+    info_mode: str, optional, options=["dict", "array"], default="dict"
+        Sets the info returned by reset and step
+        1- "dict" gives dictionaries keyed by snake: "snake_health", "snake_info"
+           (see collisions.SnakeInfo) and "snake_max_len"
+        2- "array" gives np.array(number_of_snakes): "snake_health", "snake_info" (outcome
+           codes, see collisions.Outcome), "snake_alive", "snake_length" and "snake_max_len".
+           Except for "snake_info", they are read-only views of the arrays of the game, updated
+           in place by the next step or reset, so they must be copied to be kept.
+           See info_to_dict
+        Both modes give "current_turn"
+
+    The Snakes and Food objects are reused by reset when the map size does not change.
     '''
     MAX_BORDER = (21, 21) # Largest map size (19, 19) + 2 for -1 borders
+    VALIDATION_HISTORY = 4 # Number of turns kept in the snapshots when validate=True
     def __init__(self, observation_type="flat-51s", map_size=(15, 15),
                  number_of_snakes=4, 
                  snake_spawn_locations=[], food_spawn_locations=[],
-                 verbose=False, initial_game_state=None, rewards=SimpleRewards()):
+                 verbose=False, initial_game_state=None, rewards=None,
+                 validate=False, observation_dtype=None, copy_observation=True,
+                 profile=None, profile_callback=None, engine=None, spawn_layout="random",
+                 egocentric=False, info_mode="dict"):
         
+        # Arguments used to rebuild the gym when it is unpickled
+        self._config = dict(observation_type=observation_type, map_size=map_size,
+                            number_of_snakes=number_of_snakes,
+                            snake_spawn_locations=snake_spawn_locations,
+                            food_spawn_locations=food_spawn_locations, verbose=verbose,
+                            initial_game_state=initial_game_state, rewards=rewards,
+                            validate=validate, observation_dtype=observation_dtype,
+                            copy_observation=copy_observation, profile=profile,
+                            profile_callback=profile_callback, engine=engine,
+                            spawn_layout=spawn_layout, egocentric=egocentric,
+                            info_mode=info_mode)
+
         self.map_size = map_size
         self.number_of_snakes = number_of_snakes
         self.initial_game_state = initial_game_state
@@ -83,40 +268,174 @@ class BattlesnakeGym(gym.Env):
         self.number_of_snakes = number_of_snakes
         self.map_size = map_size
 
+        # gym is only imported when the spaces are built
+        from gym import spaces
         self.action_space = MultiAgentActionSpace(
             [spaces.Discrete(4) for _ in range(number_of_snakes)])
 
         self.observation_type = observation_type
+        self.observation_dtype = observation_dtype
+        self.copy_observation = copy_observation
+        self.egocentric = egocentric
         self.observation_space = self.get_observation_space()
+        self._allocate_observation()
         
         self.viewer = None
         self.state = None
         self.verbose = verbose
-        self.rewards = rewards
+        self.rewards = SimpleRewards() if rewards is None else rewards
+        self.validate = validate
+        if profile is None:
+            profile = is_profiling_enabled() or profile_callback is not None
+        self.profiler = PhaseProfiler(profile_callback) if profile else None
+        self.snapshots = deque(maxlen=2 * self.VALIDATION_HISTORY)
+        if engine is None:
+            engine = os.environ.get(ENGINE_ENV_VARIABLE, KERNEL_BACKEND)
+        assert engine in self.metadata["engines"], "Unknown engine {}".format(engine)
+        assert engine != "numba" or KERNEL_BACKEND == "numba", "The numba engine requires Numba"
+        self.engine = engine
+        self._move_request_encoder = None
+        assert spawn_layout in self.metadata["spawn.layouts"], "Unknown spawn layout {}".format(spawn_layout)
+        self.spawn_layout = spawn_layout
+        assert info_mode in self.metadata["info.modes"], "Unknown info mode {}".format(info_mode)
+        self.info_mode = info_mode
+        self.snake_max_len = np.zeros(number_of_snakes, dtype=np.int64)
+        self._info_views = None
+        self._territory = None
+        self._board = None
+        self.snakes = None
+        self.food = None
+        self.game_state_snapshots = None
+        if initial_game_state is not None:
+            self.set_game_states([initial_game_state])
+        self.seed()
+        self.reset()
+
+    @classmethod
+    def from_game_states(cls, game_states, order="sequential", **kwargs):
+        '''
+        Create a gym that resets to the game states instead of spawning new games.
+        The game states are parsed once, see set_game_states.
+
+        Parameters:
+        ----------
+        game_states: iterable of dict or bytes
+            See set_game_states. The map size and number of snakes of the gym are the ones
+            of the game states
+
+        order: str, optional, options=["sequential", "random"], default="sequential"
+
+        kwargs are passed to BattlesnakeGym
+        '''
+        snapshots = encode_game_states(game_states, kwargs.get("map_size"),
+                                       kwargs.get("number_of_snakes"))
+        assert len(snapshots) > 0, "At least one game state is required"
+        header = decode_snapshot_header(snapshots[0])
+        kwargs.update(map_size=header["map_size"], number_of_snakes=header["number_of_snakes"])
+        env = cls(**kwargs)
+        env.set_game_states(snapshots, order=order)
+        env.reset()
+        return env
+
+    def set_game_states(self, game_states, order="sequential", start=0, stride=1):
+        '''
+        Make reset start the games from the game states instead of spawning new games.
+        The game states are parsed once into compact snapshots so that reset only restores
+        a snapshot. The colours of the snakes are drawn at every reset.
+
+        Parameters:
+        ----------
+        game_states: iterable of dict or bytes, or None
+            Game states in the form of the battlesnake engine, e.g. logged move requests
+            (https://docs.battlesnake.com/references/api), or snapshots returned by
+            encode_game_states or get_state_snapshot. None spawns new games again
+
+        order: str, optional, options=["sequential", "random"], default="sequential"
+            1- "sequential" resets to game states start, start + stride, start + 2 * stride...
+               and wraps around at the end of the game states
+            2- "random" resets to a game state drawn with the random generator of the gym
+
+        start: int, optional, default=0
+
+        stride: int, optional, default=1
+            Used by VectorBattlesnakeGym to share the game states between its games
+        '''
+        if game_states is None:
+            self.game_state_snapshots = None
+            return
+        assert order in self.metadata["game_states.orders"], "Unknown order {}".format(order)
+        self.game_state_snapshots = encode_game_states(game_states, self.map_size,
+                                                       self.number_of_snakes)
+        assert len(self.game_state_snapshots) > 0, "At least one game state is required"
+        self.game_state_order = order
+        self.game_state_stride = stride
+        self._next_game_state = start
+
+    def _get_next_game_state(self):
+        '''
+        Helper function to pick the snapshot of the next reset
+        '''
+        snapshots = self.game_state_snapshots
+        if self.game_state_order == "random":
+            return snapshots[random_integers(self.np_random, len(snapshots))]
+        snapshot = snapshots[self._next_game_state % len(snapshots)]
+        self._next_game_state = (self._next_game_state + self.game_state_stride) % len(snapshots)
+        return snapshot
 
     def get_observation_space(self):
         '''
         Helper function to define the observation space given self.map_size, self.number_of_snakes
         and self.observation_type
         '''
-        if "flat" in self.observation_type:
-            observation_space = spaces.Box(low=-1, high=5,
-                                           shape=(self.map_size[0],
-                                                  self.map_size[1],
-                                                  self.number_of_snakes+1),
-                                           dtype=np.uint8)
-        elif "bordered" in self.observation_type:
-            if "max-bordered" in self.observation_type:
-                border_size = self.MAX_BORDER[0] - self.map_size[0]
-            else:
-                border_size = 2
-            observation_space = spaces.Box(low=-1, high=5,
-                                           shape=(self.map_size[0]+border_size,
-                                                  self.map_size[1]+border_size,
-                                                  self.number_of_snakes+1),
-                                           dtype=np.uint8)
+        dtype = np.uint8 if self.observation_dtype is None else self.observation_dtype
+        border_size = self._get_border_size()
+        shape = (self.map_size[0]+border_size, self.map_size[1]+border_size,
+                 self.number_of_snakes+1)
+        if self.egocentric:
+            shape = (self.number_of_snakes,) + shape[:2] + (3,)
+        from gym import spaces
+        observation_space = spaces.Box(low=-1, high=5, shape=shape, dtype=dtype)
         return observation_space
 
+    def _get_border_size(self):
+        '''
+        Helper function to get the total size of the -1 borders given self.observation_type
+        '''
+        if "flat" in self.observation_type:
+            return 0
+        elif "max-bordered" in self.observation_type:
+            return self.MAX_BORDER[0] - self.map_size[0]
+        else:
+            return 2
+
+    def _allocate_observation(self):
+        '''
+        Helper function to allocate the observation buffer. The borders are written once here,
+        only the inside of the map (self._state_buffer) is updated at every turn.
+        '''
+        if self.observation_dtype is not None:
+            dtype = np.dtype(self.observation_dtype)
+        elif "flat" in self.observation_type:
+            dtype = np.dtype(np.uint8)
+        else:
+            dtype = np.dtype(np.float64)
+
+        border_size = self._get_border_size()
+        shape = (self.map_size[0]+border_size, self.map_size[1]+border_size,
+                 self.number_of_snakes+1)
+        if border_size == 0:
+            self._observation = np.zeros(shape, dtype=dtype)
+            self._state_buffer = self._observation
+        else:
+            assert dtype.kind != "u", "Bordered observations require a signed observation_dtype"
+            self._observation = np.full(shape, -1, dtype=dtype)
+            b = int(border_size/2)
+            self._state_buffer = self._observation[b:-b, b:-b, :]
+        self._egocentric_observation = None
+        if self.egocentric:
+            self._egocentric_observation = np.zeros((self.number_of_snakes,) + shape[:2] + (3,),
+                                                    dtype=dtype)
+
     def initialise_game_state(self, game_state_dict):
         '''
         Function to initialise the gym with outputs of env.render(mode="ascii")
@@ -128,16 +447,18 @@ class BattlesnakeGym(gym.Env):
         assert np.array_equal(gsp.map_size, self.map_size), "Map size of the game state is incorrect"
         assert gsp.number_of_snakes == self.number_of_snakes, "Number of names of the game state is incorrect"
 
-        return gsp.parse()
+        return gsp.parse(self.np_random)
         
-    def seed(self, seed):
+    def seed(self, seed=None):
         '''
         Inherited function of the openAI gym to set the randomisation seed.
+        The seeded generator is used to spawn the snakes and the food.
         '''
+        from gym.utils import seeding
         self.np_random, seed = seeding.np_random(seed)
         return [seed]
 
-    def reset(self, map_size=None):
+    def reset(self, map_size=None, out=None):
         '''
         Inherited function of the openAI gym to reset the environment.
 
@@ -145,150 +466,67 @@ class BattlesnakeGym(gym.Env):
         -----------
         map_size: (int, int), default None
             Optional paramter to reset the map size
+
+        out: np.array, default None
+            Optional array of the shape of the observation where the observation is written
         '''
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+
         if map_size is not None:
-            self.observation_space = self.get_observation_space()
             self.map_size = map_size
+            self.observation_space = self.get_observation_space()
+            self._allocate_observation()
         
-        if self.initial_game_state is not None:
-            self.snakes, self.food, self.turn_count = self.initialise_game_state(self.initial_game_state)
+        if self.game_state_snapshots is not None:
+            self._set_game_objects(decode_snapshot(self._get_next_game_state()))
+            colours = random_integers(self.np_random, 256, size=(self.number_of_snakes, 3))
+            self.snakes.colours = [list(colour) for colour in colours]
         else:
             self.turn_count = 0
 
-            self.snakes = Snakes(self.map_size, self.number_of_snakes, self.snake_spawn_locations)
-            self.food = Food(self.map_size, self.food_spawn_locations)
-            self.food.spawn_food(self.snakes.get_snake_51_map())
+            snake_spawn_locations = self.snake_spawn_locations
+            if len(snake_spawn_locations) == 0 and self.spawn_layout != "random":
+                snake_spawn_locations = sample_spawn_layout(self.spawn_layout, self.map_size,
+                                                            self.number_of_snakes, self.np_random)
+            if self._can_reuse_game_objects():
+                self.snakes.np_random = self.food.np_random = self.np_random
+                self.snakes.reset(snake_spawn_locations)
+                self.food.reset(self.food_spawn_locations)
+            else:
+                self.snakes = Snakes(self.map_size, self.number_of_snakes, snake_spawn_locations,
+                                     np_random=self.np_random)
+                self.food = Food(self.map_size, self.food_spawn_locations, np_random=self.np_random)
+            self.food.spawn_food(self.snakes.free_cells)
 
         dones = {i:False for i in range(self.number_of_snakes)}
+        self.snapshots.clear()
         
-        snakes_health = {}
-        snake_info = {}
-        self.snake_max_len = {}
-        for i, snake in enumerate(self.snakes.get_snakes()):
-            snakes_health[i] = snake.health
-            snake_info[i] = "Did not collide" 
-            self.snake_max_len[i] = 0
-        info = {'current_turn': self.turn_count,
-                'snake_health': snakes_health,
-                'snake_info': snake_info, 
-                'snake_max_len': self.snake_max_len}
-        return self._get_observation(), {}, dones, info
-
-    def _did_snake_collide(self, snake, snakes_to_be_killed):
-        '''
-        Helper function to check if a snake has collided into something else. Checks the following:
-        1) If the snake's head hit a wall (i.e., if the head is outside of the map)
-        2) Check if the snake collided with another snake's head (entering the same tile and adjacent)
-        3) Check if the snake ran into another snake's body (itself and other snakes)
-        4) Check if the snake's body hit another snake's head
-        
-        Parameter:
-        ----------
-        snake: Snake
-        
-        snakes_to_be_killed: a list of snakes that will be killed in the end of the turn.
-
-        Returns:
-        ----------
-        should_kill_snake: Bool
-            Boolean to indicate if the snake is dead or not
-
-        collision_outcome: options = ["Snake hit wall", 
-                                      "Snake was eaten - same tile", 
-                                      "Snake was eaten - adjacent tile", 
-                                      "Snake hit body - hit itself", 
-                                      "Snake hit body - hit other", 
-                                      "Did not collide",
-                                      "Ate another snake",
-                                      "Other snake hit body"]
-        '''       
-        snake_head_location = snake.get_head()
-        ate_another_snake = False
-        snakes_eaten_this_turn = []
-        
-        # 1) Check if the snake ran into a wall
-        outcome = "Snake hit wall"
-        if snake.is_head_outside_map():
-            if self.verbose: print(outcome)
-            should_kill_snake = True
-            return should_kill_snake, outcome
-
-        # 2.1) Check if snake's head collided with another snake's head when they both entered the same tile
-        # e.g.,:
-        # 
-        #  | |< S1   
-        #   ^ 
-        #   S2
-        for other_snake in self.snakes.get_snakes():
-            if other_snake == snake:
-                continue
-            if other_snake.is_alive():
-                other_snake_head = other_snake.get_head()
-                if np.array_equal(snake_head_location, other_snake_head):
-                    if other_snake.get_size() >= snake.get_size():
-                        outcome = "Snake was eaten - same tile"
-                        if self.verbose: print(outcome)
-                        return True, outcome
-                    else:
-                        ate_another_snake = True
-                        snakes_eaten_this_turn.append(other_snake)
-                
-        # 2.2) Check if snake's head collided with another snakes head when they were adjacent to one another
-        # (i.e., that the heads swapped positions)
-        #
-        #    S1     S1
-        #   |  |> <|  |
-        #
-        for other_snake in self.snakes.get_snakes():
-            if other_snake == snake:
-                continue
-            # Check if snake swapped places with the other_snake.
-            # 1) check if heads are adjacent
-            # 2) check if heads swapped places
-            if other_snake.is_alive():
-                other_snake_head = other_snake.get_head()
-                if get_distance(snake_head_location, other_snake_head) == 1:
-                    if np.array_equal(snake_head_location, other_snake.get_previous_snake_head())\
-                       and np.array_equal(other_snake_head, snake.get_previous_snake_head()):
-                        if other_snake.get_size() >= snake.get_size():
-                            outcome = "Snake was eaten - adjacent tile"
-                            if self.verbose: print(outcome)
-                            return True, outcome
-                        else:
-                            ate_another_snake = True
-                            snakes_eaten_this_turn.append(other_snake)
-
-        # 3.1) Check if snake ran into it's own body
-        outcome = "Snake hit body - hit itself"
-        for self_body_locations in snake.get_body():
-            if np.array_equal(snake_head_location, self_body_locations):
-                if self.verbose: print("Snake hit itself")
-                return True, outcome
-            
-        # 3.2) Check if snake ran into another snake's body
-        outcome = "Snake hit body - hit other"
-        snake_binary_map = self.snakes.get_snake_51_map(excluded_snakes=[snake]+snakes_eaten_this_turn)
-        if snake_binary_map[snake_head_location[0], snake_head_location[1]] == 1:
-            if self.verbose: print("Snake hit another snake")
-            return True, outcome
-
-        # 4) Check if another snake ran into this snake
-        for other_snake in self.snakes.get_snakes():
-            if other_snake == snake:
-                continue
-            if other_snake.is_alive():
-                if other_snake not in snakes_to_be_killed:
-                    other_snake_head = other_snake.get_head()
-                    for location in snake.get_body():
-                        if np.array_equal(location, other_snake_head):
-                            return False, "Other snake hit body"
-        
-        if ate_another_snake:                            
-            return False, "Ate another snake"
+        self.snake_max_len[:] = 0
+        self._territory = None
+        self._board = None
+        info = self._get_info(np.full(self.number_of_snakes, DID_NOT_COLLIDE, dtype=np.int8))
+        if self.game_state_snapshots is None:
+            self._render_spawn_state()
+        else:
+            self._render_state()
+        observation = self._get_observation(out)
+        if profiler is not None:
+            profiler.stop("reset")
+        return observation, {}, dones, info
 
-        return False, "Did not collide"
+    def _can_reuse_game_objects(self):
+        '''
+        Helper function to check if the Snakes and Food of the previous game can be reset
+        instead of being created again
+        '''
+        return self.snakes is not None and self.food is not None and \
+            tuple(self.snakes.map_size) == tuple(self.map_size) and \
+            tuple(self.food.map_size) == tuple(self.map_size) and \
+            self.snakes.number_of_snakes == self.number_of_snakes
 
-    def step(self, actions, episodes=None):
+    def step(self, actions, episodes=None, out=None):
         '''
         Inherited function of the openAI gym. The steps taken mimic the steps provided in 
         https://docs.battlesnake.com/references/rules -> Programming Your Snake -> 3) Turn resolution.
@@ -300,6 +538,9 @@ class BattlesnakeGym(gym.Env):
             The integers range from 0 to 3 corresponding to Snake.UP, Snake.DOWN, Snake.LEFT, Snake.RIGHT 
             respectively
 
+        out: np.array, default None
+            Optional array of the shape of the observation where the observation is written
+
         Returns:
         -------
 
@@ -315,162 +556,459 @@ class BattlesnakeGym(gym.Env):
             Gym is complete when there is only 1 snake remaining
         '''
 
-        # setup reward dict
-        reward = {}
-        snake_info = {}
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
 
-        # DEBUGING
-        json_before_moving = self.get_json()
-        
-        # Reduce health and move
-        for i, snake in enumerate(self.snakes.get_snakes()):
-            reward[i] = 0
-            if not snake.is_alive():
-                continue
-
-            # Reduce health by one
-            snake.health -= 1
-            if snake.health == 0:
-                snake.kill_snake()
-                reward[i] += self.rewards.get_reward("starved", i, episodes)
-                snake_info[i] = "Starved"
-                continue
-
-            action = actions[i] 
-            is_forbidden = snake.move(action)
-            if is_forbidden:
-                snake.kill_snake()
-                reward[i] += self.rewards.get_reward("forbidden_move", i, episodes)
-                snake_info[i] = "Forbidden move"
-            
-        # check for food and collision
-        number_of_food_eaten = 0
-        number_of_snakes_alive = 0
+        if self.validate:
+            self.snapshots.append(("before moving", self._get_snapshot()))
 
-        
-        # DEBUGING
-        json_after_moving = self.get_json()
-        
-        snakes_to_be_killed = []
-        for i, snake in enumerate(self.snakes.get_snakes()):
-            if not snake.is_alive():
-                continue
-
-            snake_head_location = snake.get_head()
-
-            # Check for collisions with the snake
-            should_kill_snake, outcome = self._did_snake_collide(snake, snakes_to_be_killed)
-            if should_kill_snake:
-                snakes_to_be_killed.append(snake)
-            snake_info[i] = outcome
-
-            # Check if snakes ate any food
-            if not should_kill_snake and self.food.does_coord_have_food(snake_head_location):
-                number_of_food_eaten += 1
-                snake.set_ate_food()
-                self.food.remove_food_from_coord(snake_head_location)
-                reward[i] += self.rewards.get_reward("ate_food", i, episodes)
-
-            # Calculate rewards for collision
-            if outcome == "Snake hit wall":
-                reward[i] += self.rewards.get_reward("hit_wall", i, episodes)
-                
-            elif outcome == "Snake was eaten - same tile":
-                reward[i] += self.rewards.get_reward("was_eaten", i, episodes)
-                
-            elif outcome == "Snake was eaten - adjacent tile":
-                reward[i] += self.rewards.get_reward("was_eaten", i, episodes)
-                
-            elif outcome == "Snake hit body - hit itself":
-                reward[i] += self.rewards.get_reward("hit_self", i, episodes)
-                
-            elif outcome == "Snake hit body - hit other":
-                reward[i] += self.rewards.get_reward("hit_other_snake", i,
-                                                    episodes)
+        # Move, resolve the collisions and eat the food
+        snakes = self.snakes
+        if self.engine == "numba":
+            starved, forbidden, moved, outcomes, ate_food = step_snakes(snakes, self.food, actions)
+            moved_snakes = np.flatnonzero(moved).tolist()
+            should_kill_snakes = is_deadly(outcomes)
+            if profiler is not None:
+                profiler.lap("kernel")
+        elif self.engine == "bitboard":
+            starved, forbidden, moved_snakes, outcomes, should_kill_snakes, ate_food = \
+                self._resolve_turn_on_bitboards(actions)
+        else:
+            starved, forbidden, moved_snakes, outcomes, should_kill_snakes, ate_food = \
+                self._resolve_turn(actions)
+        snakes_alive = snakes.alive
+        number_of_food_eaten = int(np.sum(ate_food))
+        self.food.end_of_turn(snakes.free_cells)
+        if profiler is not None:
+            profiler.lap("food")
 
-            elif outcome == "Other snake hit body":
-                reward[i] += self.rewards.get_reward("other_snake_hit_body", i,
-                                                    episodes)
-                
-            elif outcome == "Did not collide":
-                pass
-                
-            elif outcome == "Ate another snake":
-                reward[i] += self.rewards.get_reward("ate_another_snake", i,
-                                                    episodes)
-        for snake_to_be_killed in snakes_to_be_killed:
-            snake_to_be_killed.kill_snake()
-        
-        snakes_alive = []
-        for i, snake in enumerate(self.snakes.get_snakes()):
-            snakes_alive.append(snake.is_alive())
-            if snake.is_alive():
-                number_of_snakes_alive += 1
-                reward[i] += self.rewards.get_reward("another_turn", i, episodes)
-        
-        self.food.end_of_turn(self.snakes.get_snake_51_map())
+        # Outcome of each snake, the snakes that did not move died in a previous turn
+        # if they did not starve or make a forbidden move
+        codes = np.full(self.number_of_snakes, DEAD, dtype=np.int8)
+        codes[moved_snakes] = np.asarray(outcomes)[moved_snakes]
+        codes[np.asarray(forbidden, dtype=bool)] = FORBIDDEN_MOVE
+        codes[np.asarray(starved, dtype=bool)] = STARVED
+        if self.verbose:
+            for i in np.flatnonzero(should_kill_snakes).tolist():
+                print(OUTCOME_LABELS[codes[i]])
 
-        if self.number_of_snakes > 1 and np.sum(snakes_alive) <= 1:
-            done = True
-            for i, is_snake_alive in enumerate(snakes_alive):
-                if is_snake_alive:
-                    reward[i] += self.rewards.get_reward("won", i, episodes)
-                else:
-                    reward[i] += self.rewards.get_reward("died", i, episodes)
-        else:
-            done = False
+        # Calculate the rewards of all the snakes at once
+        done = self.number_of_snakes > 1 and np.count_nonzero(snakes_alive) <= 1
+        rewards = compute_rewards(self.rewards, codes, ate_food, snakes_alive, done, episodes)
+        reward = {i: r for i, r in enumerate(rewards.tolist())}
+        if profiler is not None:
+            profiler.lap("reward")
             
         snake_alive_dict = {i: a for i, a in enumerate(np.logical_not(snakes_alive).tolist())}
         self.turn_count += 1
+        self.snake_max_len += snakes_alive
+        self._territory = None
+        self._board = None
+        info = self._get_info(codes)
+        if profiler is not None:
+            profiler.lap("info")
 
-        snakes_health = {}
-        for i, snake in enumerate(self.snakes.get_snakes()):
-            snakes_health[i] = snake.health
-            if snake.is_alive():
-                self.snake_max_len[i] += 1
-            if i not in snake_info:
-                snake_info[i] = "Dead"
-                
-        sum_map = self.snakes.get_snake_51_map()
-        if np.max(sum_map) > 5 or 2 in sum_map:
-            print("snake info {}".format(snake_info))
-            print("actions {}".format(actions))
-            print("before moving json {}".format(json_before_moving))
-            print("after moving json {}".format(json_after_moving))
-            print("final json {}".format(self.get_json()))
-            raise
-            
-        return self._get_observation(), reward, snake_alive_dict, {'current_turn': self.turn_count,
-                                                                   'snake_health': snakes_health,
-                                                                   'snake_info': snake_info,
-                                                                   'snake_max_len': self.snake_max_len}
+        if self.validate:
+            self._validate_state(actions, SnakeInfo(codes))
+            if profiler is not None:
+                profiler.lap("validate")
+
+        self._update_state()
+        observation = self._get_observation(out)
+        if profiler is not None:
+            profiler.lap("observation")
+            profiler.stop("step")
+        return observation, reward, snake_alive_dict, info
                 
-    def _get_observation(self):
+    def _get_info(self, codes):
         '''
-        Helper function to generate the output observation.
+        Helper function to build the info of reset and step, see info_mode
+
+        Parameters:
+        ----------
+        codes: np.array(number_of_snakes)
+            Outcome code of each snake, see collisions.Outcome
         '''
-        if "flat" in self.observation_type:
-            return self._get_state()
-        elif "bordered" in self.observation_type:
-            state = self._get_state()
-
-            if "max-bordered" in self.observation_type:
-                border_size = self.MAX_BORDER[0] - self.map_size[0]
-            else: 
-                border_size = 2
-                
-            bordered_state_shape = (state.shape[0]+border_size, state.shape[1]+border_size,
-                                    state.shape[2])
-            bordered_state = np.ones(shape=bordered_state_shape)*-1
-            
-            b = int(border_size/2)
-            bordered_state[b:-b, b:-b,:] = state
-            return bordered_state
+        snakes = self.snakes
+        if self.info_mode == "dict":
+            return {'current_turn': self.turn_count,
+                    'snake_health': dict(enumerate(snakes.health.tolist())),
+                    'snake_info': SnakeInfo(codes),
+                    'snake_max_len': dict(enumerate(self.snake_max_len.tolist()))}
+
+        # Read-only views of the arrays of the game, they are rebuilt when Snakes is replaced
+        if self._info_views is None or self._info_views[0] is not snakes:
+            views = {}
+            for key, array in [("snake_health", snakes.health), ("snake_alive", snakes.alive),
+                               ("snake_length", snakes.length),
+                               ("snake_max_len", self.snake_max_len)]:
+                views[key] = array.view()
+                views[key].flags.writeable = False
+            self._info_views = (snakes, views)
+        return dict(self._info_views[1], snake_info=codes, current_turn=self.turn_count)
+
+    def _resolve_turn(self, actions):
+        '''
+        Helper function to move the snakes, resolve the collisions and eat the food with the
+        "numpy" engine. The "numba" engine does the same in kernels.step_snakes
 
-    def _get_state(self):
+        Returns:
+        --------
+        starved, forbidden: np.array(number_of_snakes) of bools
+        moved_snakes: [int]
+            Snakes that moved this turn
+        outcomes: np.array(number_of_snakes)
+            Outcome codes of the collisions, see collisions.py
+        should_kill_snakes: np.array(number_of_snakes) of bools
+        ate_food: np.array(number_of_snakes) of bools
+        '''
+        profiler = self.profiler
+
+        # Reduce health and move
+        snakes = self.snakes
+        starved, forbidden = snakes.move_snakes(actions)
+
+        if self.validate:
+            self.snapshots.append(("after moving", self._get_snapshot()))
+        if profiler is not None:
+            profiler.lap("move")
+
+        # Resolve the collisions of all the snakes at once
+        moved_snakes = np.flatnonzero(snakes.alive).tolist()
+        outcomes = resolve_collisions(snakes.heads, snakes.previous_heads, snakes.length,
+                                      snakes.alive, snakes.grid_owner)
+        should_kill_snakes = is_deadly(outcomes)
+        for i in np.flatnonzero(should_kill_snakes):
+            snakes.kill_snake(i)
+        snakes.place_heads()
+        if profiler is not None:
+            profiler.lap("collision")
+
+        # Check if snakes ate any food
+        ate_food = np.zeros(self.number_of_snakes, dtype=bool)
+        for i in np.flatnonzero(snakes.alive).tolist():
+            ate_food[i] = self.food.does_coord_have_food(snakes.heads[i])
+        for i in np.flatnonzero(ate_food).tolist():
+            snakes.set_ate_food(i)
+            self.food.remove_food_from_coord(snakes.heads[i])
+        return starved, forbidden, moved_snakes, outcomes, should_kill_snakes, ate_food
+
+    def _resolve_turn_on_bitboards(self, actions):
+        '''
+        Helper function to move the snakes, resolve the collisions and eat the food with the
+        "bitboard" engine. Returns the same as _resolve_turn
+        '''
+        profiler = self.profiler
+        snakes = self.snakes
+        board = BitboardBoard.from_game(snakes, self.food)
+        alive = snakes.alive.copy()
+        starved, forbidden, outcomes, ate_food = board.step(actions)
+        if profiler is not None:
+            profiler.lap("bitboard")
+
+        # Set the snakes and the food from the board, the bodies are set from the head.
+        # set_state rebuilds the grid, the changed cells are found by comparing the grids
+        previous_owner = snakes.grid_owner.copy()
+        previous_count = snakes.grid_count.copy()
+        previous_length = snakes.length.copy()
+        width = self.map_size[1]
+        bodies = [np.array([divmod(cell, width) for cell in reversed(body)],
+                           dtype=np.int64).reshape(-1, 2) for body in board.bodies]
+        snakes.set_state(bodies, board.health, board.facing, board.stacking,
+                         board.ate_food, board.alive, snakes.colours)
+        changed = np.not_equal(snakes.grid_owner, previous_owner, out=snakes.changed)
+        changed |= snakes.grid_count != previous_count
+        # The heads can move into the cell of their own tail
+        for i in np.flatnonzero(alive).tolist():
+            snakes.previous_heads[i] = divmod(board.previous_head_bits[i].bit_length() - 1, width)
+            changed[snakes.previous_heads[i, 0], snakes.previous_heads[i, 1]] = True
+            if snakes.alive[i]:
+                changed[snakes.heads[i, 0], snakes.heads[i, 1]] = True
+        # Snakes whose tail moved did not grow
+        np.logical_and(snakes.alive, snakes.length == previous_length, out=snakes.renumbered)
+        ate_food = np.array(ate_food, dtype=bool)
+        for i in np.flatnonzero(ate_food).tolist():
+            self.food.remove_food_from_coord(snakes.heads[i])
+        if self.validate:
+            self.snapshots.append(("after moving", self._get_snapshot()))
+        if profiler is not None:
+            profiler.lap("move")
+
+        starved = np.array(starved, dtype=bool)
+        forbidden = np.array(forbidden, dtype=bool)
+        moved_snakes = np.flatnonzero(alive & ~starved & ~forbidden).tolist()
+        outcomes = np.array(outcomes, dtype=np.int64)
+        return starved, forbidden, moved_snakes, outcomes, is_deadly(outcomes), ate_food
+
+    def _validate_state(self, actions, snake_info):
+        '''
+        Helper function to check the invariants of the game state at the end of a step.
+        If an invariant fails, the snapshots of the previous turns are printed as json.
+        '''
+        snakes = self.snakes
+        sum_map = snakes.get_snake_51_map()
+        # Number of snakes with a segment on each cell, the grid only keeps one owner
+        occupants = np.zeros(self.map_size, dtype=np.int64)
+        for i in np.flatnonzero(snakes.alive).tolist():
+            body = snakes.get_body_coordinates(i)
+            occupants[body[:, 0], body[:, 1]] += 1
+        errors = []
+        if np.max(sum_map) > 5 or 2 in sum_map or np.max(occupants) > 1:
+            errors.append("snakes overlap")
+        if np.sum(snakes.grid_count) != np.sum(snakes.length):
+            errors.append("occupancy grid does not match the length of the snakes")
+        if not np.array_equal(snakes.free_cells.get_free_map(), snakes.grid_count == 0):
+            errors.append("free cells do not match the occupancy grid")
+        if len(errors) == 0:
+            return
+
+        print("snake info {}".format(snake_info))
+        print("actions {}".format(actions))
+        for label, snapshot in self.snapshots:
+            print("{} json {}".format(label, self._snapshot_to_json(snapshot)))
+        print("final json {}".format(self.get_json()))
+        raise RuntimeError("Invalid game state at turn {}: {}".format(self.turn_count,
+                                                                      ", ".join(errors)))
+
+    def _get_observation(self, out=None):
+        '''
+        Helper function to generate the output observation from the preallocated buffer.
+        The observation is copied into out if provided.
+        '''
+        if self.egocentric:
+            if out is None and not self.copy_observation:
+                out = self._egocentric_observation
+            return self.get_egocentric_observation(out)
+        if out is not None:
+            np.copyto(out, self._observation)
+            return out
+        if self.copy_observation:
+            return self._observation.copy()
+        return self._observation
+
+    def get_egocentric_observation(self, out=None):
+        '''
+        Get the views of all the snakes of the current observation. View i contains the
+        food, snake i and the sum of the other snakes. The -1 borders of bordered
+        observations are kept in the three layers. Replaces calling
+        sort_states_for_snake_id of the training code for every snake.
+
+        Parameters:
+        ----------
+        out: np.array(number_of_snakes, m, n, 3), optional
+            Array where the views are written
+
+        Returns:
+        --------
+        views: np.array(number_of_snakes, m, n, 3)
+            views[i] is the observation of snake i (snake_id i + 1 of sort_states_for_snake_id)
+        '''
+        return get_egocentric_states(self._observation, out)
+
+    def get_territory(self):
+        '''
+        Get the cells reached by the snakes from the current state: the Voronoi territory of
+        each snake and the area each snake can reach alone, accounting for the tails that
+        free up over time. The territory is computed once per turn and shared by the callers
+        until the next step, reset or restore_state_snapshot.
+
+        Returns:
+        --------
+        territory: territory.Territory
+            See territory.compute_territory
+        '''
+        if self._territory is None:
+            self._territory = compute_territory(self.snakes)
+        return self._territory
+
+    def get_board(self):
+        '''
+        Get the bitboards of the current state, a forward model for search heuristics.
+        The board is built once per turn and shared by the callers until the next step, reset
+        or restore_state_snapshot: copy it before stepping it (see BitboardBoard.copy).
+        The board does not spawn food.
+
+        Returns:
+        --------
+        board: bitboard.BitboardBoard
+        '''
+        if self._board is None:
+            self._board = BitboardBoard.from_game(self.snakes, self.food)
+        return self._board
+
+    def get_profile(self):
+        '''
+        Returns the timings collected when profiling is enabled, see PhaseProfiler.get_stats.
+        The phases of step are "move", "collision" ("kernel" with the numba engine and
+        "bitboard" then "move" with the bitboard engine), "food",
+        "reward", "info", "validate", "observation" and the calls are "step", "reset" and "render".
+
+        Returns:
+        --------
+        stats: {str: {}}
+            Empty if profiling is not enabled
+        '''
+        if self.profiler is None:
+            return {}
+        return self.profiler.get_stats()
+
+    def get_state_snapshot(self):
+        '''
+        Get a compact copy of the state of the game: turn count, bodies, health, facing
+        direction, stacking counters of the snakes, food and state of the random generator.
+
+        Returns:
+        --------
+        snapshot: bytes
+            Can be restored with restore_state_snapshot. See snapshot.py for the format
+        '''
+        return encode_snapshot(self.map_size, self.turn_count, self.snakes, self.food,
+                               self.snake_max_len, self._get_rng_state())
+
+    def restore_state_snapshot(self, snapshot):
+        '''
+        Restore a state generated by get_state_snapshot or encode_game_states. The snapshot
+        must come from a gym with the same map size and number of snakes. The snapshots of
+        encode_game_states do not contain the state of the random generator, the generator
+        of the gym is kept.
+
+        Parameters:
+        ----------
+        snapshot: bytes
+        '''
+        state = decode_snapshot(snapshot)
+        self._check_snapshot_state(state)
+        # The random generator is restored first so that an invalid state leaves the gym unchanged
+        if state["rng_state"] is not None:
+            self._set_rng_state(state["rng_state"])
+        self._set_game_objects(state)
+        self.snapshots.clear()
+        self._render_state()
+
+    def _check_snapshot_state(self, state):
+        '''
+        Helper function to check that a decoded snapshot fits the gym before it is restored
+        '''
+        assert state["map_size"] == tuple(self.map_size), "Map size of the snapshot is incorrect"
+        assert state["number_of_snakes"] == self.number_of_snakes, "Number of snakes of the snapshot is incorrect"
+
+    def _set_game_objects(self, state):
+        '''
+        Helper function to set the turn count, snakes and food from a decoded snapshot
+        '''
+        self._check_snapshot_state(state)
+        if not self._can_reuse_game_objects():
+            # The placeholder snakes do not draw from the random generator of the gym
+            placeholder_locations = [(0, 0)] * self.number_of_snakes
+            self.snakes = Snakes(self.map_size, self.number_of_snakes, placeholder_locations,
+                                 np_random=np.random.RandomState(0))
+            self.food = Food(self.map_size)
+        self.snakes.np_random = self.food.np_random = self.np_random
+
+        self.turn_count = state["turn_count"]
+        self.snakes.set_state(state["bodies"], state["health"], state["facing"],
+                              state["stacking"], state["ate_food"], state["alive"],
+                              state["colours"])
+
+        self.food.locations_map[:] = 0
+        self.food.locations_map.flat[state["food"]] = 1
+        self.food.food_spawn_locations = [tuple(location)
+                                          for location in state["food_spawn_locations"].tolist()]
+        self.snake_max_len[:] = state["max_len"]
+        self._territory = None
+        self._board = None
+
+    def _get_rng_state(self):
+        if hasattr(self.np_random, "bit_generator"):
+            return self.np_random.bit_generator.state
+        return self.np_random.get_state(legacy=False)
+
+    def _set_rng_state(self, rng_state):
+        if hasattr(self.np_random, "bit_generator"):
+            self.np_random.bit_generator.state = rng_state
+        else:
+            self.np_random.set_state(rng_state)
+
+    def __getstate__(self):
+        '''
+        The gym is pickled as its configuration, a snapshot of the game state and the game
+        states set with set_game_states. profile_callback is not pickled (lambdas and bound
+        methods cannot be), the unpickled gym keeps profiling without a callback
+        '''
+        game_states = None
+        if self.game_state_snapshots is not None:
+            game_states = (self.game_state_snapshots, self.game_state_order,
+                           self._next_game_state, self.game_state_stride)
+        config = dict(self._config, map_size=self.map_size, profile_callback=None)
+        if self._config["profile_callback"] is not None and config["profile"] is None:
+            config["profile"] = True
+        return {"config": config,
+                "snapshot": self.get_state_snapshot(), "game_states": game_states}
+
+    def __setstate__(self, state):
+        self.__init__(**state["config"])
+        if state.get("game_states") is not None:
+            self.set_game_states(*state["game_states"])
+        self.restore_state_snapshot(state["snapshot"])
+
+    def _render_state(self):
+        '''
+        Helper function to generate the whole observation buffer from scratch
+        '''
+        self._get_state(out=self._state_buffer)
+        self.snakes.clear_changes()
+        self.food.changed[:] = False
+        self._changed_flat = np.zeros(0, dtype=np.int64)
+
+    def _render_spawn_state(self):
+        '''
+        Helper function to generate the observation buffer at the start of a game,
+        when every snake is a head of size 1. Only the heads and the food are written
+        '''
+        state = self._state_buffer
+        state.fill(0)
+        food_i, food_j = np.nonzero(self.food.get_food_map())
+        state[food_i, food_j, 0] = 1
+        heads = self.snakes.heads
+        head_value = 5 if "51s" in self.observation_type else 1
+        state[heads[:, 0], heads[:, 1], 1 + np.arange(self.number_of_snakes)] = head_value
+        self.snakes.clear_changes()
+        self.food.changed[:] = False
+        self._changed_flat = np.zeros(0, dtype=np.int64)
+
+    def _update_state(self):
+        '''
+        Helper function to update the observation buffer with the changes of the turn.
+        Only the cells flagged by Snakes.changed and Food.changed are rewritten. In the
+        numbered observations, values are relative to the tail so the snakes whose tail
+        moved (Snakes.renumbered) are rewritten entirely.
+        '''
+        self._changed_flat = draw_changed_cells(self._state_buffer[None], self.snakes,
+                                                self.food.get_food_map(), self.food.changed,
+                                                "51s" not in self.observation_type)
+
+    def get_changed_cells(self):
+        '''
+        Returns the coordinates (y, x) of the cells of the map whose observation changed
+        during the last step. The coordinates do not include the borders of the observation.
+        Can be used by consumers that keep their own caches of the observations.
+
+        Returns:
+        --------
+        cells: np.array(n, 2)
+        '''
+        return np.stack(np.divmod(self._changed_flat, self.map_size[1]), axis=1)
+
+    def _get_state(self, out=None):
         ''''
         Helper function to generate the state of the game.
 
+        Parameters:
+        ----------
+        out: np.array(map_size[1], map_size[2], number_of_snakes + 1), default None
+            Optional array where the state is written
+
         Returns:
         --------
         state: np.array(map_size[1], map_size[2], number_of_snakes + 1)
@@ -480,9 +1018,12 @@ class BattlesnakeGym(gym.Env):
         FOOD_INDEX = 0
         SNAKE_INDEXES = FOOD_INDEX + np.array(range(1, self.number_of_snakes + 1))
 
-        depth_of_state = 1 + self.snakes.number_of_snakes
-        state = np.zeros((self.map_size[0], self.map_size[1], depth_of_state),
-                         dtype=np.uint8)
+        if out is None:
+            depth_of_state = 1 + self.snakes.number_of_snakes
+            state = np.zeros((self.map_size[0], self.map_size[1], depth_of_state),
+                             dtype=np.uint8)
+        else:
+            state = out
 
         # Include the postions of the food
         state[:, :, FOOD_INDEX] = self.food.get_food_map()
@@ -497,56 +1038,44 @@ class BattlesnakeGym(gym.Env):
     def _get_board(self, state):
         ''''
         Generate visualisation of the gym. Based on the state (generated by _get_state).
+        See BoardRenderer
         '''
-        
-        FOOD_INDEX = 0
-        SNAKE_INDEXES = FOOD_INDEX + np.array(range(1, self.number_of_snakes + 1))
-
-        BOUNDARY = 20
-        BOX_SIZE = 40
-        SPACE_BETWEEN_BOXES = 10
-        snake_colours = self.snakes.get_snake_colours()
-        
-        # Create board
-        board_size = (self.map_size[0]*(BOX_SIZE + SPACE_BETWEEN_BOXES) + 2*BOUNDARY,
-                      self.map_size[1]*(BOX_SIZE + SPACE_BETWEEN_BOXES) + 2*BOUNDARY)
-        board = np.ones((board_size[0], board_size[1], 3), dtype=np.uint8) * 255
+        return get_renderer(self.map_size).render(state, self.snakes.get_snake_colours())
 
-        # Create boxes
-        for i in range(0, self.map_size[0]):
-            for j in range(0, self.map_size[1]):
-                state_value = state[i][j]
-
-                t_i1 = BOUNDARY + i * (BOX_SIZE + SPACE_BETWEEN_BOXES)
-                t_i2 = t_i1 + BOX_SIZE
+    def get_render_state(self):
+        '''
+        Get a copy of the state used to render the gym. The states of several turns can be
+        rendered at once with render_batch.
+        '''
+        return self._get_state()
 
-                t_j1 = BOUNDARY + j * (BOX_SIZE + SPACE_BETWEEN_BOXES)
-                t_j2 = t_j1 + BOX_SIZE
+    def render_batch(self, states):
+        '''
+        Render the states of several turns of the current game in one call, e.g., to write a gif
+        at the end of a game. The colours of the snakes change when the gym is reset so
+        the states must be rendered before the next reset.
 
+        Parameters:
+        ----------
+        states: [np.array] or np.array(turns, map_size[0], map_size[1], number_of_snakes + 1)
+            Generated by get_render_state
 
-                board[t_i1:t_i2, t_j1:t_j2] = 255 * 0.7
-                
-                # If state contains food
-                if state_value[FOOD_INDEX] >= 1:
-                    box_margin = int(BOX_SIZE/5)
-                    board[t_i1 + box_margin:t_i2 - box_margin,
-                          t_j1 + box_margin:t_j2 - box_margin] = [255, 0, 0]
-
-                # If state contains a snake body
-                if 1 in state_value[SNAKE_INDEXES]:
-                    snake_present_in = np.argmax(state_value[SNAKE_INDEXES])
-                    board[t_i1:t_i2, t_j1:t_j2] = snake_colours[snake_present_in]
-                    
-                # If state contains a snake head
-                if 5 in state_value[SNAKE_INDEXES]:
-                    snake_present_in = np.argmax(state_value[SNAKE_INDEXES])
-                    board[t_i1:t_i2, t_j1:t_j2] = snake_colours[snake_present_in]
-                    t_i_h = 10
-                    t_j_h = 10
-                    board[(t_i1+t_i_h):(t_i2-t_i_h), (t_j1+t_j_h):(t_j2-t_j_h)] = [255, 255, 255]
-
-        return board
+        Returns:
+        --------
+        boards: np.array(turns, height, width, 3) of np.uint8
+        '''
+        return get_renderer(self.map_size).render_batch(np.asarray(states),
+                                                        self.snakes.get_snake_colours())
     
+    def _get_snapshot(self):
+        '''
+        Helper function to take a compact copy of the game state.
+        The snapshot is converted to json with _snapshot_to_json.
+        '''
+        bodies = [self.snakes.get_body_coordinates(i) for i in range(self.number_of_snakes)]
+        return (self.turn_count, bodies, self.snakes.health.copy(),
+                np.argwhere(self.food.locations_map == 1))
+
     def get_json(self):
         '''
         Generate a json representation of the gym following the same input as the battlesnake
@@ -557,24 +1086,51 @@ class BattlesnakeGym(gym.Env):
         json: {}
             Json in the same representation of board.
         '''
+        return self._snapshot_to_json(self._get_snapshot())
+
+    def get_move_requests(self, snake_ids=None):
+        '''
+        Generate the json bytes of the move requests of the Battlesnake API
+        ({"game", "turn", "board", "you"}) for the snakes that are alive. See MoveRequestEncoder
+
+        Parameters:
+        ----------
+        snake_ids: [int], optional, default=None
+            Snakes that receive a move request. Defaults to all the snakes that are alive.
+            Dead snakes are skipped
+
+        Return:
+        -------
+        requests: {int: bytes}
+        '''
+        encoder = self._move_request_encoder
+        if encoder is None or encoder.map_size != tuple(self.map_size):
+            encoder = MoveRequestEncoder(self.map_size, self.number_of_snakes)
+            self._move_request_encoder = encoder
+        return encoder.encode(self.turn_count, self.snakes, self.food, snake_ids)
+
+    def _snapshot_to_json(self, snapshot):
+        '''
+        Helper function to convert a snapshot taken by _get_snapshot into json
+        '''
+        turn_count, bodies, healths, food_locations = snapshot
         json = {}
-        json["turn"] = self.turn_count
+        json["turn"] = turn_count
         
         # Get food
         food_list = []
-        y, x = np.where(self.food.locations_map==1)
-        for x_, y_ in zip(x, y):
+        for y_, x_ in food_locations.tolist():
             food_list.append({"x": x_, "y": y_})
         
         # Get snakes
         snake_dict_list = []
-        for i, snakes in enumerate(self.snakes.snakes):
+        for i, body in enumerate(bodies):
             snake_location = []
-            for coord in snakes.locations[::-1]:
-                snake_location.append({"x": coord[1], "y": coord[0]})
+            for y_, x_ in body[::-1].tolist():
+                snake_location.append({"x": x_, "y": y_})
                 
             snake_dict = {}
-            snake_dict["health"] = snakes.health
+            snake_dict["health"] = int(healths[i])
             snake_dict["body"] = snake_location
             snake_dict["id"] = i
             snake_dict["name"] = "Snake {}".format(i)
@@ -662,6 +1218,15 @@ class BattlesnakeGym(gym.Env):
             mode == human will present the gym in a separate window
             mode == rgb_array will return the gym in np.arrays
         '''
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start()
+        rendered = self._render(mode)
+        if profiler is not None:
+            profiler.stop("render")
+        return rendered
+
+    def _render(self, mode):
         state = self._get_state()
         if mode == "rgb_array":
             return self._get_board(state)
@@ -678,3 +1243,25 @@ class BattlesnakeGym(gym.Env):
                 self.viewer = rendering.SimpleImageViewer()
             self.viewer.imshow(board)
             return self.viewer.isopen
+
+    def close(self):
+        '''
+        Inherited function of the openAI gym to close the window opened by render
+        '''
+        if self.viewer is not None:
+            self.viewer.close()
+            self.viewer = None
+
+    @property
+    def unwrapped(self):
+        return self
+
+    def __str__(self):
+        return "<{} instance>".format(type(self).__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
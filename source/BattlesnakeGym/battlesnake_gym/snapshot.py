@@ -0,0 +1,194 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import numpy as np
+
+# Byte format of the snapshots of BattlesnakeGym.
+# The snapshot is an int32 array followed by the state of the random generator (uint32 words):
+#     header: [SNAPSHOT_VERSION, map_size[0], map_size[1], number_of_snakes, turn_count,
+#              number_of_food, number_of_food_spawn_locations]
+#     for each name in SNAKE_FIELDS: one value per snake
+#     colours: number_of_snakes * 3 values
+#     bodies: (y, x) of the snakes from the head to the tail, sum(length) * 2 values
+#     food: flat indexes of the food, number_of_food values
+#     food spawn locations: (y, x) of the remaining forced food locations
+#     random generator: kind (RNG_NONE or 1 + index in RNG_KINDS) followed by the state:
+#         PCG64, PCG64DXSM: state and inc (4 words each, least significant first),
+#                           has_uint32, uinteger
+#         MT19937: key (624 words), pos
+#         RandomState: key (624 words), pos, has_gauss, gauss (float64 as 2 words)
+# The free cells are not stored, Snakes.free_cells is read from the occupancy grid
+SNAPSHOT_VERSION = 3
+HEADER_SIZE = 7
+SNAKE_FIELDS = ("length", "health", "facing", "stacking", "ate_food", "alive", "max_len")
+RNG_NONE = 0
+RNG_KINDS = ("PCG64", "PCG64DXSM", "MT19937", "RandomState")
+RNG_SIZES = {"PCG64": 10, "PCG64DXSM": 10, "MT19937": 625, "RandomState": 628}
+
+def _int_to_words(value, number_of_words):
+    return np.array([(int(value) >> (32 * k)) & 0xFFFFFFFF for k in range(number_of_words)],
+                    dtype=np.uint32)
+
+def _words_to_int(words):
+    return sum(int(word) << (32 * k) for k, word in enumerate(words.tolist()))
+
+def encode_rng_state(rng_state):
+    '''
+    Encode the state of a random generator as uint32 words. The state is stored as plain
+    integers so decoding a snapshot never runs code coming from the snapshot
+
+    Parameters:
+    ----------
+    rng_state: {} or None
+        np.random.Generator.bit_generator.state or np.random.RandomState.get_state(legacy=False)
+
+    Returns:
+    --------
+    words: np.array of uint32
+    '''
+    if rng_state is None:
+        return np.array([RNG_NONE], dtype=np.uint32)
+    name = rng_state["bit_generator"]
+    state = rng_state["state"]
+    if name in ("PCG64", "PCG64DXSM"):
+        words = [_int_to_words(state["state"], 4), _int_to_words(state["inc"], 4),
+                 [rng_state["has_uint32"], rng_state["uinteger"]]]
+    elif name == "MT19937":
+        words = [state["key"], [state["pos"]]]
+        if "has_gauss" in rng_state:
+            name = "RandomState"
+            gauss = np.array([rng_state["gauss"]], dtype=np.float64).view(np.uint32)
+            words += [[rng_state["has_gauss"]], gauss]
+    else:
+        raise ValueError("Unsupported random generator {}".format(name))
+    words = [[RNG_KINDS.index(name) + 1]] + words
+    return np.concatenate([np.asarray(word, dtype=np.uint32) for word in words])
+
+def decode_rng_state(words):
+    '''
+    Decode the words generated by encode_rng_state. Raises ValueError if the words are not
+    the state of a supported random generator
+    '''
+    kind = int(words[0]) if len(words) > 0 else -1
+    if kind == RNG_NONE and len(words) == 1:
+        return None
+    if not 1 <= kind <= len(RNG_KINDS) or len(words) != 1 + RNG_SIZES[RNG_KINDS[kind - 1]]:
+        raise ValueError("Invalid random generator state in the snapshot")
+    name = RNG_KINDS[kind - 1]
+    words = words[1:]
+    if name in ("PCG64", "PCG64DXSM"):
+        return {"bit_generator": name,
+                "state": {"state": _words_to_int(words[:4]), "inc": _words_to_int(words[4:8])},
+                "has_uint32": int(words[8]), "uinteger": int(words[9])}
+    rng_state = {"bit_generator": "MT19937",
+                 "state": {"key": words[:624].copy(), "pos": int(words[624])}}
+    if name == "RandomState":
+        rng_state["has_gauss"] = int(words[625])
+        rng_state["gauss"] = float(np.frombuffer(words[626:].tobytes(), dtype=np.float64)[0])
+    return rng_state
+
+def encode_snapshot(map_size, turn_count, snakes, food, snake_max_len, rng_state):
+    '''
+    Encode the state of a game into bytes
+
+    Parameters:
+    ----------
+    map_size: (int, int)
+    turn_count: int
+    snakes: Snakes
+    food: Food
+    snake_max_len: {int: int}
+        Number of turns each snake was alive, see BattlesnakeGym.step
+    rng_state: {} or None
+        State of the random generator, see encode_rng_state
+
+    Returns:
+    --------
+    snapshot: bytes
+    '''
+    number_of_snakes = snakes.number_of_snakes
+    food_cells = np.flatnonzero(food.locations_map == 1)
+    food_spawn_locations = np.array(food.food_spawn_locations, dtype=np.int32).reshape(-1, 2)
+    header = [SNAPSHOT_VERSION, map_size[0], map_size[1], number_of_snakes, turn_count,
+              len(food_cells), len(food_spawn_locations)]
+
+    fields = {"length": snakes.length, "health": snakes.health, "facing": snakes.facing,
+              "stacking": snakes.stacking, "ate_food": snakes.ate_food, "alive": snakes.alive,
+              "max_len": [snake_max_len[i] for i in range(number_of_snakes)]}
+    bodies = [snakes.get_body_coordinates(i)[::-1] for i in range(number_of_snakes)]
+    colours = [colour if colour is not None else [0, 0, 0] for colour in snakes.colours]
+
+    array = np.concatenate([np.array(header, dtype=np.int32)] +
+                           [np.asarray(fields[name], dtype=np.int32) for name in SNAKE_FIELDS] +
+                           [np.array(colours, dtype=np.int32).ravel()] +
+                           [body.astype(np.int32).ravel() for body in bodies] +
+                           [food_cells.astype(np.int32), food_spawn_locations.ravel()])
+    return array.tobytes() + encode_rng_state(rng_state).tobytes()
+
+def decode_snapshot_header(snapshot):
+    '''
+    Decode the map size, number of snakes and turn count of a snapshot without decoding
+    the rest of the state
+    '''
+    header = np.frombuffer(snapshot, dtype=np.int32, count=HEADER_SIZE)
+    if header[0] != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version {}".format(header[0]))
+    return {"map_size": (int(header[1]), int(header[2])), "number_of_snakes": int(header[3]),
+            "turn_count": int(header[4])}
+
+def decode_snapshot(snapshot):
+    '''
+    Decode the bytes generated by encode_snapshot
+
+    Returns:
+    --------
+    state: {}
+        Dictionary with the keys "map_size", "number_of_snakes", "turn_count", "colours",
+        "bodies", "food", "food_spawn_locations", "rng_state" and the names
+        in SNAKE_FIELDS
+    '''
+    header = np.frombuffer(snapshot, dtype=np.int32, count=HEADER_SIZE)
+    version, height, width, number_of_snakes, turn_count, number_of_food, number_of_spawns = \
+        header.tolist()
+    if version != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version {}".format(version))
+
+    offset = HEADER_SIZE
+    fields_size = len(SNAKE_FIELDS) * number_of_snakes + 3 * number_of_snakes
+    fields = np.frombuffer(snapshot, dtype=np.int32, count=fields_size, offset=offset * 4)
+    offset += fields_size
+
+    state = {"map_size": (height, width), "number_of_snakes": number_of_snakes,
+             "turn_count": turn_count}
+    for k, name in enumerate(SNAKE_FIELDS):
+        state[name] = fields[k * number_of_snakes:(k + 1) * number_of_snakes]
+    state["colours"] = fields[len(SNAKE_FIELDS) * number_of_snakes:].reshape(number_of_snakes, 3)
+
+    data_size = 2 * int(np.sum(state["length"])) + number_of_food + 2 * number_of_spawns
+    data = np.frombuffer(snapshot, dtype=np.int32, count=data_size, offset=offset * 4)
+    offset += data_size
+
+    bodies = []
+    start = 0
+    for length in state["length"].tolist():
+        bodies.append(data[start:start + 2 * length].reshape(length, 2))
+        start += 2 * length
+    state["bodies"] = bodies
+    state["food"] = data[start:start + number_of_food]
+    start += number_of_food
+    state["food_spawn_locations"] = data[start:start + 2 * number_of_spawns].reshape(number_of_spawns, 2)
+    if (len(snapshot) - offset * 4) % 4 != 0:
+        raise ValueError("Invalid random generator state in the snapshot")
+    state["rng_state"] = decode_rng_state(np.frombuffer(snapshot, dtype=np.uint32,
+                                                        offset=offset * 4))
+    return state
@@ -0,0 +1,90 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import numpy as np
+
+from .utils import random_integers
+
+# Number of layouts in each pool of spawn layouts
+SPAWN_POOL_SIZE = 1024
+
+# Pools of spawn layouts indexed by (map_size, number_of_snakes)
+_spawn_pools = {}
+
+def get_spawn_pool(map_size, number_of_snakes):
+    '''
+    Returns a pool of SPAWN_POOL_SIZE random spawn layouts. The pool is computed once for
+    each map size and number of snakes and is the same in every process.
+
+    Returns:
+    --------
+    layouts: np.array(SPAWN_POOL_SIZE, number_of_snakes, 2)
+        Coordinates (y, x) of the snakes. The snakes of a layout are on distinct cells
+    '''
+    key = (tuple(map_size), number_of_snakes)
+    if key not in _spawn_pools:
+        number_of_cells = map_size[0] * map_size[1]
+        assert number_of_snakes <= number_of_cells, "Not enough cells to spawn {} snakes".format(number_of_snakes)
+        np_random = np.random.RandomState(0)
+        keys = np_random.random_sample((SPAWN_POOL_SIZE, number_of_cells))
+        cells = np.argsort(keys, axis=1)[:, :number_of_snakes]
+        _spawn_pools[key] = np.stack(np.divmod(cells, map_size[1]), axis=-1)
+    return _spawn_pools[key]
+
+def get_official_spawn_points(map_size):
+    '''
+    Returns the fixed spawn points of the official Battlesnake rules: the 4 corners one cell
+    away from the walls, then the middle of the 4 sides.
+    Based on https://github.com/BattlesnakeOfficial/rules/blob/main/board.go (PlaceSnakesFixed)
+
+    Returns:
+    --------
+    corners: [(int, int)]
+    cardinals: [(int, int)]
+    '''
+    (min_y, mid_y, max_y), (min_x, mid_x, max_x) = [(1, (size - 1) // 2, size - 2)
+                                                    for size in map_size]
+    corners = [(min_y, min_x), (min_y, max_x), (max_y, min_x), (max_y, max_x)]
+    cardinals = [(min_y, mid_x), (mid_y, min_x), (mid_y, max_x), (max_y, mid_x)]
+    return corners, cardinals
+
+def sample_spawn_layout(spawn_layout, map_size, number_of_snakes, np_random):
+    '''
+    Draw the spawn locations of the snakes
+
+    Parameters:
+    ----------
+    spawn_layout: str, options=["pool", "official"]
+        1- "pool" draws a layout of get_spawn_pool
+        2- "official" shuffles the corners and the middle of the sides of
+           get_official_spawn_points. Snakes are placed in the corners first
+    map_size: (int, int)
+    number_of_snakes: int
+    np_random: np.random.Generator or np.random.RandomState
+
+    Returns:
+    --------
+    locations: np.array(number_of_snakes, 2)
+    '''
+    if spawn_layout == "pool":
+        pool = get_spawn_pool(map_size, number_of_snakes)
+        return pool[int(random_integers(np_random, len(pool)))]
+
+    corners, cardinals = get_official_spawn_points(map_size)
+    assert number_of_snakes <= len(corners) + len(cardinals), "The official spawn points support up to 8 snakes"
+    assert min(map_size) >= 5, "The official spawn points require a map of at least 5x5"
+    # Shuffle the corners and the cardinal points with one draw
+    keys = np_random.random(len(corners) + len(cardinals))
+    points = [corners[k] for k in np.argsort(keys[:len(corners)])] + \
+             [cardinals[k] for k in np.argsort(keys[len(corners):])]
+    return np.array(points[:number_of_snakes])
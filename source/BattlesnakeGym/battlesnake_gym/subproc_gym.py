@@ -0,0 +1,295 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .snake_gym import BattlesnakeGym, INFO_ARRAYS, info_to_dict
+
+def _get_buffer_specs(num_envs, number_of_snakes, observation_shape, observation_dtype):
+    '''
+    Helper function to get the name, shape and dtype of the shared buffers
+    '''
+    return [("observations", (num_envs,) + observation_shape, observation_dtype),
+            ("final_observations", (num_envs,) + observation_shape, observation_dtype),
+            ("rewards", (num_envs, number_of_snakes), np.float64),
+            ("dones", (num_envs, number_of_snakes), np.bool_),
+            ("snake_health", (num_envs, number_of_snakes), np.int64),
+            ("snake_info", (num_envs, number_of_snakes), np.int8),
+            ("snake_alive", (num_envs, number_of_snakes), np.bool_),
+            ("snake_length", (num_envs, number_of_snakes), np.int64),
+            ("snake_max_len", (num_envs, number_of_snakes), np.int64),
+            ("current_turn", (num_envs,), np.int64),
+            ("game_over", (num_envs,), np.bool_),
+            ("episode_length", (num_envs,), np.int64)]
+
+def _attach_buffers(specs, names):
+    '''
+    Helper function to map the shared memory blocks into numpy arrays
+    '''
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    arrays = {spec[0]: np.ndarray(spec[1], dtype=spec[2], buffer=block.buf)
+              for spec, block in zip(specs, blocks)}
+    return blocks, arrays
+
+def _worker(remote, parent_remote, index, specs, names, env_kwargs, seed):
+    '''
+    Loop of the worker processes. The worker runs one BattlesnakeGym and writes its outputs
+    at index in the shared buffers. Only the commands and the actions are sent through the pipe.
+    '''
+    parent_remote.close()
+    blocks, buffers = _attach_buffers(specs, names)
+    env = BattlesnakeGym(info_mode="array", **env_kwargs)
+    env.seed(seed)
+    minimum_snakes_alive = 1 if env.number_of_snakes > 1 else 0
+    # Only the worker writes the episode length, the parent reads it when the game is over
+    episode_length = 0
+
+    def write_info(info):
+        # The env of the worker uses info_mode="array"
+        for key in INFO_ARRAYS:
+            buffers[key][index] = info[key]
+        buffers["current_turn"][index] = info["current_turn"]
+
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == "step":
+                actions, episodes = data
+                _, reward, dones, info = env.step(actions, episodes,
+                                                  out=buffers["observations"][index])
+                for i in range(env.number_of_snakes):
+                    buffers["rewards"][index, i] = reward[i]
+                    buffers["dones"][index, i] = dones[i]
+                write_info(info)
+                episode_length += 1
+                buffers["episode_length"][index] = episode_length
+                alive = np.logical_not(buffers["dones"][index])
+                game_over = np.sum(alive) <= minimum_snakes_alive
+                buffers["game_over"][index] = game_over
+                if game_over:
+                    buffers["final_observations"][index] = buffers["observations"][index]
+                    env.reset(out=buffers["observations"][index])
+                    episode_length = 0
+                remote.send(None)
+            elif command == "reset":
+                _, _, _, info = env.reset(out=buffers["observations"][index])
+                buffers["rewards"][index] = 0
+                buffers["dones"][index] = False
+                buffers["game_over"][index] = False
+                episode_length = 0
+                buffers["episode_length"][index] = 0
+                write_info(info)
+                remote.send(None)
+            elif command == "close":
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del buffers
+        for block in blocks:
+            block.close()
+        remote.close()
+
+class SubprocBattlesnakeGym:
+    '''
+    Runs num_envs BattlesnakeGym games in worker processes, one process per game.
+    The observations, rewards, dones and info of the games are written by the workers in
+    shared memory buffers. Only the actions are sent through the pipes to the workers.
+    Games that are over are reset automatically, see VectorBattlesnakeGym.
+
+    Parameters:
+    ----------
+    num_envs: int
+        Number of worker processes and games
+
+    map_size: (int, int), optional, default=(15, 15)
+
+    number_of_snakes: int, optional, default=4
+
+    observation_type: str, optional, default="flat-51s"
+        See BattlesnakeGym
+
+    rewards: Rewards, optional, default=None
+        Rewards used by all the games. Must be picklable. Each game uses a new SimpleRewards
+        if None
+
+    observation_dtype: np.dtype, optional, default=None
+        See BattlesnakeGym
+
+    info_mode: str, optional, options=["dict", "array"], default="dict"
+        See BattlesnakeGym. With "array", the arrays of the info are views of the shared
+        buffers and are overwritten by the next step
+
+    seed: int, optional, default=None
+        The game of worker n is seeded with seed + n
+
+    start_method: str, optional, default=None
+        Start method of the processes ("fork", "spawn" or "forkserver").
+        Uses the default start method of multiprocessing if None
+    '''
+    def __init__(self, num_envs, map_size=(15, 15), number_of_snakes=4,
+                 observation_type="flat-51s", rewards=None, observation_dtype=None,
+                 info_mode="dict", seed=None, start_method=None):
+        self.num_envs = num_envs
+        self.map_size = map_size
+        self.number_of_snakes = number_of_snakes
+        self.observation_type = observation_type
+        assert info_mode in BattlesnakeGym.metadata["info.modes"], "Unknown info mode {}".format(info_mode)
+        self.info_mode = info_mode
+
+        env_kwargs = dict(observation_type=observation_type, map_size=map_size,
+                          number_of_snakes=number_of_snakes, rewards=rewards,
+                          observation_dtype=observation_dtype)
+        single_env = BattlesnakeGym(**env_kwargs)
+        self.single_observation_space = single_env.observation_space
+        self.single_action_space = single_env.action_space
+        from gym import spaces
+        self.observation_space = spaces.Box(low=-1, high=5,
+                                            shape=(num_envs,) + self.single_observation_space.shape,
+                                            dtype=self.single_observation_space.dtype)
+        self.action_space = spaces.MultiDiscrete(np.full((num_envs, number_of_snakes), 4))
+        observation = single_env._observation
+
+        self._specs = _get_buffer_specs(num_envs, number_of_snakes, observation.shape,
+                                        observation.dtype)
+        self._blocks = []
+        for _, shape, dtype in self._specs:
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            self._blocks.append(shared_memory.SharedMemory(create=True, size=size))
+        names = [block.name for block in self._blocks]
+        self._buffers = {spec[0]: np.ndarray(spec[1], dtype=spec[2], buffer=block.buf)
+                         for spec, block in zip(self._specs, self._blocks)}
+
+        context = multiprocessing.get_context(start_method)
+        self.remotes, self.processes = [], []
+        for n in range(num_envs):
+            remote, worker_remote = context.Pipe()
+            worker_seed = None if seed is None else seed + n
+            process = context.Process(target=_worker,
+                                      args=(worker_remote, remote, n, self._specs, names,
+                                            env_kwargs, worker_seed),
+                                      daemon=True)
+            process.start()
+            worker_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.closed = False
+        self.waiting = False
+
+    def _get_infos(self):
+        '''
+        Helper function to build the info dictionaries from the shared buffers
+        '''
+        buffers = self._buffers
+        infos = []
+        for n in range(self.num_envs):
+            info = {key: buffers[key][n] for key in INFO_ARRAYS}
+            info['current_turn'] = int(buffers["current_turn"][n])
+            info['game_over'] = bool(buffers["game_over"][n])
+            if self.info_mode == "dict":
+                info = info_to_dict(info)
+            if info['game_over']:
+                info['final_observation'] = buffers["final_observations"][n].copy()
+                info['episode_length'] = int(buffers["episode_length"][n])
+            infos.append(info)
+        return infos
+
+    def reset(self):
+        '''
+        Resets all the games, see VectorBattlesnakeGym.reset
+        '''
+        for remote in self.remotes:
+            remote.send(("reset", None))
+        for remote in self.remotes:
+            remote.recv()
+        buffers = self._buffers
+        return buffers["observations"], buffers["rewards"], buffers["dones"], self._get_infos()
+
+    def step_async(self, actions, episodes=None):
+        '''
+        Send the actions to the workers without waiting for the results
+
+        Parameters:
+        ----------
+        actions: np.array(num_envs, number_of_snakes)
+
+        episodes: int, optional
+            Passed to the rewards, see BattlesnakeGym.step
+        '''
+        actions = np.asarray(actions, dtype=np.int64)
+        assert actions.shape == (self.num_envs, self.number_of_snakes), \
+            "Actions must be of shape (num_envs, number_of_snakes)"
+        for remote, action in zip(self.remotes, actions):
+            remote.send(("step", (action, episodes)))
+        self.waiting = True
+
+    def step_wait(self):
+        '''
+        Wait for the workers to finish their steps, see VectorBattlesnakeGym.step
+
+        Returns:
+        --------
+        observations, rewards, dones, infos
+            observations, rewards and dones are views of the shared buffers and are
+            overwritten by the next step
+        '''
+        for remote in self.remotes:
+            remote.recv()
+        self.waiting = False
+        buffers = self._buffers
+        return buffers["observations"], buffers["rewards"], buffers["dones"], self._get_infos()
+
+    def step(self, actions, episodes=None):
+        '''
+        Moves every game by one turn, see VectorBattlesnakeGym.step
+        '''
+        self.step_async(actions, episodes)
+        return self.step_wait()
+
+    def close(self):
+        '''
+        Stop the workers and free the shared memory
+        '''
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        for remote in self.remotes:
+            remote.close()
+        self._buffers = None
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Arrays returned by step are still referenced, the memory is freed with them
+                pass
+            block.unlink()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
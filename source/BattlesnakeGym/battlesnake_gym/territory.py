@@ -0,0 +1,255 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+
+import numpy as np
+
+from .bitboard import BitboardBoard, count_bits
+from .collisions import EMPTY
+
+# Masks of the packed bitboards of each map size and number of snakes, see _get_packing
+_packings = {}
+
+def _get_packing(map_size, number_of_snakes):
+    '''
+    Helper function to get the masks of the packed bitboards. The bitboards of the snakes
+    (see bitboard.BitboardBoard) are packed in one int, separated by an empty row, so that the
+    cells of all the snakes are moved with the same shifts.
+
+    Returns:
+    --------
+    stride: int
+        Number of bits of the bitboard of a snake, including the empty row
+
+    repeat: int
+        Multiplying a bitboard by repeat copies it into the bitboards of all the snakes
+
+    full_mask, not_first_column, not_last_column: int
+        Masks of BitboardBoard repeated for all the snakes
+    '''
+    key = (tuple(map_size), number_of_snakes)
+    if key not in _packings:
+        board = BitboardBoard(map_size, 0)
+        stride = (map_size[0] + 1) * map_size[1]
+        repeat = 0
+        for k in range(number_of_snakes):
+            repeat |= 1 << (k * stride)
+        _packings[key] = (stride, repeat, board.full_mask * repeat,
+                          board.not_first_column * repeat, board.not_last_column * repeat)
+    return _packings[key]
+
+def _unpack_maps(bits, map_size, number_of_snakes):
+    '''
+    Helper function to convert packed bitboards into np.array(number_of_snakes, m, n) of bools
+    '''
+    height, width = map_size
+    number_of_cells = number_of_snakes * (height + 1) * width
+    data = np.frombuffer(bits.to_bytes((number_of_cells + 7) // 8, "little"), dtype=np.uint8)
+    cells = np.unpackbits(data, count=number_of_cells, bitorder="little").view(bool)
+    return cells.reshape(number_of_snakes, height + 1, width)[:, :height]
+
+class Territory:
+    '''
+    Reachability of the cells of the map for all the snakes at one turn, see compute_territory.
+    The counts are computed by the search, the maps are built from the bitboards of each turn
+    of the search when they are first accessed.
+    The distances are numbers of turns, -1 if the cell cannot be reached.
+
+    Attributes:
+    ----------
+    territory: np.array(number_of_snakes)
+        Number of cells owned by each snake, excluding its head
+
+    reachable: np.array(number_of_snakes)
+        Number of cells each snake can reach alone, excluding its head
+
+    owner: np.array(map_size[0], map_size[1])
+        Id of the snake that reaches each cell first (Voronoi territory). When several snakes
+        reach a cell on the same turn, the longest one owns it. EMPTY if the cell cannot be
+        reached or if it is contested by snakes of the same length
+
+    distance: np.array(map_size[0], map_size[1])
+        Turn at which the first snakes reach each cell, 0 for the heads
+
+    reachable_distance: np.array(number_of_snakes, map_size[0], map_size[1])
+        Distance of the cells for each snake moving alone, ignoring the other heads
+    '''
+    def __init__(self, map_size, number_of_snakes, snake_ids, territory, reachable, turns):
+        self.map_size = tuple(map_size)
+        self.number_of_snakes = number_of_snakes
+        self.snake_ids = np.asarray(snake_ids, dtype=np.int64)
+        self.territory = np.zeros(number_of_snakes, dtype=np.int64)
+        self.reachable = np.zeros(number_of_snakes, dtype=np.int64)
+        self.territory[snake_ids] = territory
+        self.reachable[snake_ids] = reachable
+        # (turn, packed bitboards of the cells reached, claimed and contested on the turn)
+        self.turns = turns
+        self._owner = None
+        self._distance = None
+        self._reachable_distance = None
+
+    def _build_first_arrivals(self):
+        owner = np.full(self.map_size, EMPTY, dtype=np.int64)
+        distance = np.full(self.map_size, -1, dtype=np.int64)
+        number_of_searches = len(self.snake_ids)
+        for turn, _, claimed, contested in self.turns:
+            claimed_maps = _unpack_maps(claimed, self.map_size, number_of_searches)
+            for snake_id, cells in zip(self.snake_ids, claimed_maps):
+                owner[cells] = snake_id
+                distance[cells] = turn
+            if contested:
+                distance[_unpack_maps(contested, self.map_size, 1)[0]] = turn
+        self._owner, self._distance = owner, distance
+
+    @property
+    def owner(self):
+        if self._owner is None:
+            self._build_first_arrivals()
+        return self._owner
+
+    @property
+    def distance(self):
+        if self._distance is None:
+            self._build_first_arrivals()
+        return self._distance
+
+    @property
+    def reachable_distance(self):
+        if self._reachable_distance is None:
+            distance = np.full((len(self.snake_ids),) + self.map_size, -1, dtype=np.int64)
+            for turn, reached, _, _ in self.turns:
+                distance[_unpack_maps(reached, self.map_size, len(self.snake_ids))] = turn
+            reachable_distance = np.full((self.number_of_snakes,) + self.map_size, -1,
+                                         dtype=np.int64)
+            reachable_distance[self.snake_ids] = distance
+            self._reachable_distance = reachable_distance
+        return self._reachable_distance
+
+def get_free_turns(snakes):
+    '''
+    Returns the number of turns before each cell of the map is free.
+    A body segment is freed when the tail moves out of it, after the turns still needed by the
+    snake to digest its food or to stack its initial body. Food eaten later is not anticipated.
+
+    Parameters:
+    ----------
+    snakes: Snakes
+
+    Returns:
+    --------
+    free_turns: np.array(map_size[0], map_size[1])
+        0 for the free cells
+    '''
+    tail_positions = snakes.head_position - snakes.length + 1
+    delays = snakes.stacking + snakes.ate_food
+    occupied = snakes.grid_count > 0
+    owners = snakes.grid_owner[occupied]
+    free_turns = np.zeros(snakes.map_size, dtype=np.int64)
+    free_turns[occupied] = (snakes.grid_position[occupied] - tail_positions[owners] + 1 +
+                            delays[owners])
+    return free_turns
+
+def compute_territory(snakes):
+    '''
+    Function to compute the cells reached by the snakes that are alive with one breadth-first
+    search from all the heads at once. The bitboards of all the snakes are packed in one int
+    (see _get_packing) so every turn of the search is a few shifts and masks. Every turn, the
+    cells reached on the previous turn grow into their neighbours. A body cell can only be
+    entered if it is freed by the time the head gets there (see get_free_turns), the snakes
+    do not wait for the tails to move. Heads moving into each other and food eaten during the
+    search are not simulated.
+
+    Parameters:
+    ----------
+    snakes: Snakes
+
+    Returns:
+    --------
+    territory: Territory
+    '''
+    map_size = tuple(snakes.map_size)
+    width = map_size[1]
+    snake_ids = np.flatnonzero(snakes.alive).tolist()
+    number_of_searches = len(snake_ids)
+    stride, repeat, full_mask, not_first_column, not_last_column = \
+        _get_packing(map_size, number_of_searches)
+    board_mask = (1 << (map_size[0] * width)) - 1
+    offsets = [k * stride for k in range(number_of_searches)]
+
+    def adjacent(bits):
+        # Same as BitboardBoard.neighbours for the packed bitboards, without removing bits
+        return (((bits >> width) | (bits << width)) & full_mask |
+                ((bits >> 1) & not_last_column) | ((bits << 1) & not_first_column))
+
+    # Bitboards of the body cells freed at each turn
+    free_turns = get_free_turns(snakes).ravel()
+    releases = {}
+    for cell in np.flatnonzero(free_turns).tolist():
+        turn = int(free_turns[cell])
+        releases[turn] = releases.get(turn, 0) | (1 << cell)
+    available = board_mask
+    for bits in releases.values():
+        available &= ~bits
+
+    heads = 0
+    claimed = 0
+    for offset, i in zip(offsets, snake_ids):
+        head = 1 << int(snakes.heads[i, 0] * width + snakes.heads[i, 1])
+        heads |= head << offset
+        claimed |= head
+
+    # Positions in snake_ids of the snakes grouped by length, longest first
+    lengths = snakes.length[snake_ids].tolist()
+    groups = [[k for k in range(number_of_searches) if lengths[k] == length]
+              for length in sorted(set(lengths), reverse=True)]
+
+    # Packed bitboards of the cells reached and claimed so far and on the last turn
+    reached = owned = new_reached = new_owned = heads
+    turns = [(0, heads, heads, 0)]
+    turn = 0
+    while True:
+        turn += 1
+        if turn in releases:
+            available |= releases[turn]
+        available_packed = available * repeat
+
+        # Cells reached by each snake alone
+        new_reached = adjacent(new_reached) & available_packed & ~reached
+        reached |= new_reached
+
+        # Cells reached first, the longest snakes claim the cells before the shorter ones and
+        # the cells reached by several snakes of the same length are contested
+        candidates = adjacent(new_owned) & (available & ~claimed) * repeat
+        new_owned = contested = 0
+        if candidates:
+            for group in groups:
+                seen = duplicated = 0
+                group_candidates = []
+                for k in group:
+                    bits = (candidates >> offsets[k]) & board_mask & ~claimed
+                    group_candidates.append(bits)
+                    duplicated |= seen & bits
+                    seen |= bits
+                for k, bits in zip(group, group_candidates):
+                    new_owned |= (bits & ~duplicated) << offsets[k]
+                contested |= duplicated
+                claimed |= seen
+            owned |= new_owned
+
+        if not (new_reached or new_owned or contested):
+            break
+        turns.append((turn, new_reached, new_owned, contested))
+
+    territory = [count_bits((owned >> offset) & board_mask) - 1 for offset in offsets]
+    reachable = [count_bits((reached >> offset) & board_mask) - 1 for offset in offsets]
+    return Territory(map_size, snakes.number_of_snakes, snake_ids, territory, reachable, turns)
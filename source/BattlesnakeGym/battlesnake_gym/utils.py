@@ -12,7 +12,6 @@
 # permissions and limitations under the License.
 
 import numpy as np
-import gym
 import math
 
 def is_coord_in(coord, array):
@@ -50,6 +49,19 @@ def get_random_coordinates(map_size, n, excluding=[]):
     random_coordinates = np.array(coordinates)[indexes]
     return random_coordinates
 
+def random_integers(np_random, high, size=None):
+    '''
+    Helper function to draw integers in [0, high). Draws the same numbers as
+    np_random.choice(high, size) but is faster
+
+    Parameters:
+    ----------
+    np_random: np.random.Generator or np.random.RandomState
+    '''
+    if hasattr(np_random, "integers"):
+        return np_random.integers(high, size=size)
+    return np_random.randint(high, size=size)
+
 def generate_coordinate_list_from_binary_map(map_image):
     '''
     Helper function to convert binary maps into a list of coordinates
@@ -61,11 +73,99 @@ def generate_coordinate_list_from_binary_map(map_image):
                 coordinate_list.append((i, j))
     return coordinate_list
 
+def get_egocentric_states(state, out=None):
+    '''
+    Helper function to build the egocentric views of all the snakes from an observation
+    in one vectorised operation. View i has 3 layers: the food, snake i and the sum of the
+    other snakes, as sort_states_for_snake_id of the training code. Cells of the -1 borders
+    are -1 in the three layers. The observations of several games are converted at once if
+    state has leading game axes.
+
+    Parameters:
+    ----------
+    state: np.array(m, n, s+1)
+        Observation of BattlesnakeGym with the food at index 0
+    out: np.array(s, m, n, 3), optional
+        Array where the views are written
+
+    Returns:
+    --------
+    views: np.array(s, m, n, 3)
+    '''
+    number_of_snakes = state.shape[-1] - 1
+    if out is None:
+        out = np.empty(state.shape[:-3] + (number_of_snakes,) + state.shape[-3:-1] + (3,),
+                       dtype=state.dtype)
+    snake_states = np.moveaxis(state[..., 1:], -1, -3)
+    food = state[..., None, :, :, 0]
+    out[..., 0] = food
+    out[..., 1] = snake_states
+    np.subtract(state[..., None, :, :, 1:].sum(axis=-1, dtype=out.dtype), snake_states,
+                out=out[..., 2])
+    if out.dtype.kind != "u":
+        np.copyto(out[..., 2], -1, where=food < 0)
+    return out
+
+class FreeCellIndex:
+    '''
+    Index of the cells of the map that are not occupied by a snake, read from the occupancy
+    grid of Snakes. The grid is already updated when a head is added or a tail is removed,
+    so the index costs nothing during the turns: the free cells are only gathered from the
+    grid when cells are drawn. The free cells are drawn in the order of their flat indexes,
+    so the draws only depend on which cells are free.
+
+    Parameters:
+    ----------
+    grid_count: np.array(map_size[0], map_size[1])
+        Number of snake segments on each cell, see Snakes.grid_count
+    '''
+    def __init__(self, grid_count):
+        self.map_size = grid_count.shape
+        self.grid_count = grid_count
+        self._free = np.zeros(grid_count.size, dtype=bool)
+
+    @property
+    def count(self):
+        return self.grid_count.size - int(np.count_nonzero(self.grid_count))
+
+    def is_free(self, cell):
+        return self.grid_count.flat[cell] == 0
+
+    def sample(self, n, np_random):
+        '''
+        Draw n distinct free cells. Uses a partial Fisher-Yates shuffle of the free cells.
+
+        Parameters:
+        ----------
+        n: int
+        np_random: np.random.Generator or np.random.RandomState
+
+        Returns:
+        --------
+        coordinates: np.array(n, 2)
+            Coordinates (y, x) of the cells
+        '''
+        cells = np.flatnonzero(self.get_free_map())
+        assert n <= len(cells), "Not enough free cells to draw {} cells".format(n)
+        for k in range(n):
+            other = k + int(random_integers(np_random, len(cells) - k))
+            cells[k], cells[other] = cells[other], cells[k]
+        return np.stack(np.divmod(cells[:n], self.map_size[1]), axis=1)
+
+    def get_free_map(self):
+        '''
+        Returns a binary map of the free cells. The map is a buffer of the index that is
+        overwritten by the next call
+        '''
+        free = self._free.reshape(self.map_size)
+        return np.equal(self.grid_count, 0, out=free)
+
 class MultiAgentActionSpace(list):
     '''
     Code taken from https://github.com/koulanurag/ma-gym/blob/master/ma_gym/envs/utils/action_space.py
     '''
     def __init__(self, agents_action_space):
+        import gym
         for x in agents_action_space:
             assert isinstance(x, gym.spaces.space.Space)
 
@@ -0,0 +1,341 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import numpy as np
+
+from .snake import Snake, Snakes
+from .food import Food
+from .snake_gym import BattlesnakeGym, INFO_ARRAYS, draw_changed_cells
+from .collisions import (resolve_collisions, is_deadly, SnakeInfo, OUTCOME_LABELS,
+                         DID_NOT_COLLIDE, STARVED, FORBIDDEN_MOVE, DEAD)
+from .rewards import SimpleRewards, compute_rewards
+from .game_state_parser import encode_game_states
+from .utils import get_egocentric_states
+
+class VectorBattlesnakeGym:
+    '''
+    Synchronous batch of num_envs independent games played with the rules of
+    BattlesnakeGym.step. The state of the games is stored with a leading game axis: the
+    snakes of all the games are one batch of Snakes (see Snakes.make_batch) and the food
+    maps and observations are stacked. Each step moves the snakes, resolves the collisions,
+    eats the food, computes the rewards and draws the observations of all the games at once.
+    The food is spawned and the info dictionaries are built game by game, as the games
+    keep their own random generators.
+    Each game is a BattlesnakeGym whose Snakes, Food and observation are views of the
+    batch, so the games are reset, seeded and rendered on their own. Their engine,
+    validate and profiling options are not used by the batched step.
+    A game is over when at most one snake is alive (no snake alive if number_of_snakes == 1).
+    Games that are over are reset automatically at the end of the step.
+
+    Parameters:
+    ----------
+    num_envs: int
+        Number of games played at once
+
+    map_size: (int, int), optional, default=(15, 15)
+
+    number_of_snakes: int, optional, default=4
+
+    observation_type: str, optional, default="flat-51s"
+        See BattlesnakeGym
+
+    rewards: Rewards, optional, default=None
+        Rewards shared by all the games. Defaults to SimpleRewards
+
+    observation_dtype: np.dtype, optional, default=None
+        See BattlesnakeGym
+
+    egocentric: Bool, optional, default=False
+        If True, the observations are the views of all the snakes,
+        np.array(num_envs, number_of_snakes, m, n, 3). See BattlesnakeGym
+
+    info_mode: str, optional, options=["dict", "array"], default="dict"
+        See BattlesnakeGym. With "array", the arrays of the info of each game are views of
+        the batch overwritten by the next step, except for the games that are over
+    '''
+    def __init__(self, num_envs, map_size=(15, 15), number_of_snakes=4,
+                 observation_type="flat-51s", rewards=None, observation_dtype=None,
+                 egocentric=False, info_mode="dict"):
+        self.num_envs = num_envs
+        self.map_size = map_size
+        self.number_of_snakes = number_of_snakes
+        self.observation_type = observation_type
+        self.egocentric = egocentric
+        self.info_mode = info_mode
+        rewards = SimpleRewards() if rewards is None else rewards
+
+        self.envs = [BattlesnakeGym(observation_type=observation_type, map_size=map_size,
+                                    number_of_snakes=number_of_snakes,
+                                    rewards=rewards,
+                                    observation_dtype=observation_dtype,
+                                    egocentric=egocentric, info_mode=info_mode)
+                     for _ in range(num_envs)]
+
+        single_observation_space = self.envs[0].observation_space
+        self.single_observation_space = single_observation_space
+        self.single_action_space = self.envs[0].action_space
+        from gym import spaces
+        self.observation_space = spaces.Box(low=-1, high=5,
+                                            shape=(num_envs,) + single_observation_space.shape,
+                                            dtype=single_observation_space.dtype)
+        self.action_space = spaces.MultiDiscrete(np.full((num_envs, number_of_snakes), 4))
+
+        # State of the games with a leading game axis. The observation buffers of the games
+        # are bound to the stacked states, the borders are copied once here
+        self._snakes = Snakes.make_batch(map_size, number_of_snakes, num_envs)
+        self._game_snakes = [self._snakes.get_game(n) for n in range(num_envs)]
+        self._food_map = np.zeros((num_envs,) + tuple(map_size))
+        self._food_changed = np.zeros((num_envs,) + tuple(map_size), dtype=bool)
+        self._game_food = []
+        for n in range(num_envs):
+            food = Food(map_size)
+            food.locations_map = self._food_map[n]
+            food.changed = self._food_changed[n]
+            self._game_food.append(food)
+        self._snake_max_len = np.zeros((num_envs, number_of_snakes), dtype=np.int64)
+        self._states = np.stack([env._observation for env in self.envs])
+        border = self.envs[0]._get_border_size() // 2
+        self._state_buffers = self._states
+        if border > 0:
+            self._state_buffers = self._states[:, border:-border, border:-border]
+        for n, env in enumerate(self.envs):
+            env._observation = self._states[n]
+            env._state_buffer = self._state_buffers[n]
+            self._snake_max_len[n] = env.snake_max_len
+            env.snake_max_len = self._snake_max_len[n]
+            env._info_views = None
+            self._attach(n)
+
+        # The observations keep the dtype returned by BattlesnakeGym
+        if egocentric:
+            self.observations = np.zeros((num_envs,) + self.envs[0]._egocentric_observation.shape,
+                                         dtype=self._states.dtype)
+        else:
+            self.observations = self._states
+        self.rewards = np.zeros((num_envs, number_of_snakes))
+        self.dones = np.zeros((num_envs, number_of_snakes), dtype=bool)
+        self.game_over = np.zeros(num_envs, dtype=bool)
+        self.episode_lengths = np.zeros(num_envs, dtype=np.int64)
+
+    def _attach(self, n):
+        '''
+        Helper function to make the Snakes and Food of game n the views of the batch.
+        The game creates its own objects when it is reset with another map size or to a game
+        state for the first time, their state is copied into the views.
+        '''
+        env = self.envs[n]
+        snakes, food = self._game_snakes[n], self._game_food[n]
+        if env.snakes is not snakes:
+            source = env.snakes
+            bodies = [source.get_body_coordinates(i)[::-1] for i in range(self.number_of_snakes)]
+            snakes.set_state(bodies, source.health, source.facing, source.stacking,
+                             source.ate_food, source.alive, source.colours)
+            snakes.previous_heads[:] = source.previous_heads
+            snakes.np_random = source.np_random
+            snakes.clear_changes()
+            env.snakes = snakes
+        if env.food is not food:
+            food.locations_map[:] = env.food.locations_map
+            food.changed[:] = False
+            food.food_spawn_locations = env.food.food_spawn_locations
+            food.np_random = env.food.np_random
+            env.food = food
+
+    def seed(self, seed=None):
+        '''
+        Sets the seeds of the games. Game n is seeded with seed + n.
+        '''
+        seeds = []
+        for n, env in enumerate(self.envs):
+            seeds += env.seed(None if seed is None else seed + n)
+        return seeds
+
+    def set_game_states(self, game_states, order="sequential"):
+        '''
+        Make the games start from the game states instead of spawning new games.
+        The game states are parsed once and shared by the games. With the "sequential"
+        order, game n resets to game states n, n + num_envs, n + 2 * num_envs...
+        See BattlesnakeGym.set_game_states. Call reset to start from the game states.
+        '''
+        snapshots = None
+        if game_states is not None:
+            snapshots = encode_game_states(game_states, self.map_size, self.number_of_snakes)
+        for n, env in enumerate(self.envs):
+            env.set_game_states(snapshots, order=order, start=n, stride=self.num_envs)
+
+    def reset(self):
+        '''
+        Resets all the games.
+
+        Returns:
+        --------
+        observations: np.array(num_envs, ...)
+            Stacked observations of the games
+
+        rewards: np.array(num_envs, number_of_snakes)
+
+        dones: np.array(num_envs, number_of_snakes) of bools
+
+        infos: [{}]
+            Info dictionary of each game, see BattlesnakeGym.reset
+        '''
+        infos = [self._reset_game(n) for n in range(self.num_envs)]
+        self.rewards[:] = 0
+        self.dones[:] = False
+        self.game_over[:] = False
+        self.episode_lengths[:] = 0
+        return self.observations, self.rewards, self.dones, infos
+
+    def _reset_game(self, n):
+        '''
+        Helper function to reset game n and write its first observation
+
+        Returns:
+        --------
+        info: {}
+            Info dictionary of the game, see BattlesnakeGym.reset
+        '''
+        env = self.envs[n]
+        env.reset(out=self.observations[n])
+        self._attach(n)
+        return env._get_info(np.full(self.number_of_snakes, DID_NOT_COLLIDE, dtype=np.int8))
+
+    def step(self, actions, episodes=None):
+        '''
+        Moves every game by one turn. The turns of all the games are resolved at once.
+
+        Parameters:
+        ----------
+        actions: np.array(num_envs, number_of_snakes)
+            Action of each snake in each game, see BattlesnakeGym.step
+
+        episodes: int, optional
+            Passed to the rewards, see BattlesnakeGym.step
+
+        Returns:
+        --------
+        observations: np.array(num_envs, ...)
+            Stacked observations of the games.
+            The observation of a game that is over is the first observation of the next game.
+
+        rewards: np.array(num_envs, number_of_snakes)
+
+        dones: np.array(num_envs, number_of_snakes) of bools
+            Indicates which snakes are dead, same as the dones of BattlesnakeGym.step
+
+        infos: [{}]
+            Info dictionary of each game, see BattlesnakeGym.step.
+            "game_over" indicates if the game ended this turn. For these games,
+            "final_observation" holds the last observation of the game and
+            "episode_length" the number of turns played.
+        '''
+        actions = np.asarray(actions)
+        assert actions.shape == (self.num_envs, self.number_of_snakes), \
+            "Actions must be of shape (num_envs, number_of_snakes)"
+        games_shape = (self.num_envs, self.number_of_snakes)
+
+        # Move, resolve the collisions and eat the food of all the games
+        snakes = self._snakes
+        starved, forbidden = snakes.move_snakes(actions.ravel())
+        moved = snakes.alive.copy()
+        outcomes = resolve_collisions(snakes.heads.reshape(games_shape + (2,)),
+                                      snakes.previous_heads.reshape(games_shape + (2,)),
+                                      snakes.length.reshape(games_shape),
+                                      moved.reshape(games_shape), snakes.grid_owner).ravel()
+        should_kill_snakes = is_deadly(outcomes)
+        for i in np.flatnonzero(should_kill_snakes).tolist():
+            snakes.kill_snake(i)
+        snakes.place_heads()
+        ate_food = self._eat_food()
+        for env in self.envs:
+            env.food.end_of_turn(env.snakes.free_cells)
+
+        # Outcome of each snake, the snakes that did not move died in a previous turn
+        # if they did not starve or make a forbidden move
+        codes = np.full(len(moved), DEAD, dtype=np.int8)
+        codes[moved] = outcomes[moved]
+        codes[forbidden] = FORBIDDEN_MOVE
+        codes[starved] = STARVED
+        codes = codes.reshape(games_shape)
+
+        # Calculate the rewards of all the games at once
+        alive = snakes.alive.reshape(games_shape)
+        alive_count = np.count_nonzero(alive, axis=1)
+        done = np.logical_and(self.number_of_snakes > 1, alive_count <= 1)
+        self.rewards[:] = compute_rewards(self.envs[0].rewards, codes, ate_food.reshape(games_shape),
+                                          alive, done, episodes)
+        np.logical_not(alive, out=self.dones)
+        self._snake_max_len += alive
+
+        # Draw the changes of all the games, the changed cells are split by game
+        cells = draw_changed_cells(self._state_buffers, snakes, self._food_map,
+                                   self._food_changed, "51s" not in self.observation_type)
+        grid_size = self.map_size[0] * self.map_size[1]
+        bounds = np.searchsorted(cells, np.arange(self.num_envs + 1) * grid_size).tolist()
+        if self.egocentric:
+            get_egocentric_states(self._states, out=self.observations)
+
+        infos = []
+        killed = should_kill_snakes.reshape(games_shape)
+        for n, env in enumerate(self.envs):
+            if env.verbose:
+                for i in np.flatnonzero(killed[n]).tolist():
+                    print(OUTCOME_LABELS[codes[n, i]])
+            env.turn_count += 1
+            env._territory = None
+            env._board = None
+            env._changed_flat = cells[bounds[n]:bounds[n + 1]] - n * grid_size
+            infos.append(env._get_info(codes[n]))
+        self.episode_lengths += 1
+
+        minimum_snakes_alive = 1 if self.number_of_snakes > 1 else 0
+        np.less_equal(alive_count, minimum_snakes_alive, out=self.game_over)
+        for n in np.flatnonzero(self.game_over).tolist():
+            infos[n]["final_observation"] = self.observations[n].copy()
+            infos[n]["episode_length"] = int(self.episode_lengths[n])
+            if self.info_mode == "array":
+                # The reset overwrites the info arrays of the game
+                for key in INFO_ARRAYS:
+                    infos[n][key] = infos[n][key].copy()
+            self._reset_game(n)
+            self.episode_lengths[n] = 0
+        for n, info in enumerate(infos):
+            info["game_over"] = bool(self.game_over[n])
+        return self.observations, self.rewards, self.dones, infos
+
+    def _eat_food(self):
+        '''
+        Helper function to make the snakes of all the games eat the food under their heads
+
+        Returns:
+        --------
+        ate_food: np.array(num_envs * number_of_snakes) of bools
+        '''
+        snakes = self._snakes
+        ids = np.flatnonzero(snakes.alive)
+        cells = snakes.get_grid_cells(ids, snakes.heads[ids])
+        eating = self._food_map.ravel()[cells] == 1
+        ids, cells = ids[eating], cells[eating]
+        ate_food = np.zeros(snakes.number_of_snakes, dtype=bool)
+        ate_food[ids] = True
+        snakes.ate_food[ids] = True
+        snakes.health[ids] = Snake.FULL_HEALTH
+        self._food_map.ravel()[cells] = 0
+        self._food_changed.ravel()[cells] = True
+        return ate_food
+
+    def render(self, mode="rgb_array"):
+        '''
+        Renders every game, see BattlesnakeGym.render
+        '''
+        return [env.render(mode) for env in self.envs]
@@ -0,0 +1,438 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+'''
+Benchmark suite of the BattlesnakeGym.
+
+Usage (from source/BattlesnakeGym):
+    python -m test.benchmarks --output results.json
+    python -m test.benchmarks --output results.json --compare baseline.json --tolerance 0.15
+
+The results are written as json. In compare mode, benchmarks that are slower than the
+baseline by more than the tolerance are reported as regressions and the exit code is 1.
+'''
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from battlesnake_gym.snake_gym import BattlesnakeGym
+from battlesnake_gym.snake import Snake
+from battlesnake_gym.kernels import KERNEL_BACKEND
+from battlesnake_gym.game_state_parser import Game_state_parser
+
+SOURCE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+RLLIB_TRAINING_DIR = os.path.join(SOURCE_DIR, "RLlibEnv", "training", "training_src")
+GATEWAY_DIR = os.path.join(SOURCE_DIR, "..", "deployment", "LambdaGateway", "src")
+
+# Modules whose cold import time is measured, with the directory added to sys.path
+IMPORTED_MODULES = [("battlesnake_gym", os.path.join(SOURCE_DIR, "BattlesnakeGym")),
+                    ("battlesnake_gym.snake_gym", os.path.join(SOURCE_DIR, "BattlesnakeGym")),
+                    ("convert_utils", GATEWAY_DIR),
+                    ("lambda", GATEWAY_DIR),
+                    ("inference", os.path.join(SOURCE_DIR, "RLlibEnv", "inference",
+                                               "inference_src")),
+                    ("predict", os.path.join(SOURCE_DIR, "MXNetEnv", "inference",
+                                             "inference_src"))]
+
+OBSERVATION_TYPES = BattlesnakeGym.metadata["observation.types"]
+MAP_SIZES = [(7, 7), (11, 11), (19, 19)]
+NUMBER_OF_SNAKES = [1, 2, 4, 8]
+QUICK_MAP_SIZES = [(11, 11)]
+QUICK_NUMBER_OF_SNAKES = [4]
+
+BENCHMARKS = {}
+
+def benchmark(name, grid=True):
+    '''
+    Decorator to register a benchmark. Benchmarks with grid=True are run for every
+    map size and number of snakes.
+    The benchmark is called with (params, np_random, min_time) and returns the number
+    of operations and the time they took.
+    '''
+    def register(function):
+        BENCHMARKS[name] = (function, grid)
+        return function
+    return register
+
+def random_policy(env, np_random):
+    '''
+    Random legal-ish actions: snakes do not move backward and avoid walls and bodies
+    if they can.
+    '''
+    snakes = env.snakes
+    occupied = snakes.get_occupancy_map()
+    actions = np.zeros(env.number_of_snakes, dtype=np.int64)
+    for i in range(env.number_of_snakes):
+        if not snakes.alive[i]:
+            continue
+        head = snakes.heads[i]
+        candidates = []
+        fallback = []
+        for direction, translation in enumerate(snakes.DIRECTIONS):
+            if snakes.facing[i] != snakes.NO_DIRECTION and \
+               snakes.OPPOSITE_DIRECTIONS[snakes.facing[i]] == direction:
+                continue
+            fallback.append(direction)
+            y, x = head + translation
+            if 0 <= y < env.map_size[0] and 0 <= x < env.map_size[1] and not occupied[y, x]:
+                candidates.append(direction)
+        choices = candidates if len(candidates) > 0 else fallback
+        actions[i] = choices[np_random.randint(len(choices))]
+    return actions
+
+def play(env, np_random, number_of_turns):
+    '''
+    Play random games and yield after each step. The game is reset when it is over.
+    '''
+    env.reset()
+    minimum_snakes_alive = 1 if env.number_of_snakes > 1 else 0
+    for _ in range(number_of_turns):
+        env.step(random_policy(env, np_random))
+        yield
+        if np.sum(env.snakes.alive) <= minimum_snakes_alive:
+            env.reset()
+
+def make_env(params, observation_type="flat-51s", np_random=None, engine=None,
+             info_mode="dict"):
+    env = BattlesnakeGym(observation_type=observation_type, map_size=params["map_size"],
+                         number_of_snakes=params["number_of_snakes"], engine=engine,
+                         info_mode=info_mode)
+    if np_random is not None:
+        env.seed(int(np_random.randint(2 ** 31)))
+    env.reset()
+    return env
+
+def time_calls(function, min_time, min_calls=10):
+    '''
+    Call function until min_time seconds and min_calls calls are reached
+    '''
+    calls = 0
+    tic = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - tic
+        if elapsed >= min_time and calls >= min_calls:
+            return calls, elapsed
+
+def time_game_states(env, np_random, function, min_time):
+    '''
+    Time function on the states of random games. The game is advanced between calls
+    and only the time spent in function is measured.
+    '''
+    calls = 0
+    elapsed = 0.0
+    for _ in play(env, np_random, 10 ** 9):
+        tic = time.perf_counter()
+        function()
+        elapsed += time.perf_counter() - tic
+        calls += 1
+        if elapsed >= min_time and calls >= 10:
+            return calls, elapsed
+
+@benchmark("reset")
+def benchmark_reset(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    return time_calls(env.reset, min_time)
+
+def make_step_benchmark(observation_type, engine=None, info_mode="dict"):
+    def benchmark_step(params, np_random, min_time):
+        env = make_env(params, observation_type, np_random, engine, info_mode)
+        env.reset()
+        minimum_snakes_alive = 1 if env.number_of_snakes > 1 else 0
+        calls = 0
+        elapsed = 0.0
+        while elapsed < min_time or calls < 10:
+            actions = random_policy(env, np_random)
+            tic = time.perf_counter()
+            env.step(actions)
+            elapsed += time.perf_counter() - tic
+            calls += 1
+            if np.sum(env.snakes.alive) <= minimum_snakes_alive:
+                env.reset()
+        return calls, elapsed
+    return benchmark_step
+
+for _observation_type in OBSERVATION_TYPES:
+    benchmark("step[{}]".format(_observation_type))(make_step_benchmark(_observation_type))
+for _engine in BattlesnakeGym.metadata["engines"]:
+    if _engine != "numba" or KERNEL_BACKEND == "numba":
+        benchmark("step[flat-51s,{}]".format(_engine))(make_step_benchmark("flat-51s", _engine))
+benchmark("step[flat-51s,info=array]")(make_step_benchmark("flat-51s", info_mode="array"))
+
+@benchmark("bitboard_copy_step")
+def benchmark_bitboard_copy_step(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    def copy_step():
+        board = env.get_board().copy()
+        board.step([(board.get_safe_moves(i) or [Snake.UP])[0]
+                    for i in range(env.number_of_snakes)])
+    return time_game_states(env, np_random, copy_step, min_time)
+
+@benchmark("get_observation")
+def benchmark_get_observation(params, np_random, min_time):
+    env = make_env(params, "max-bordered-51s", np_random)
+    return time_game_states(env, np_random, env._get_observation, min_time)
+
+@benchmark("render[rgb_array]")
+def benchmark_render(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    return time_game_states(env, np_random, lambda: env.render(mode="rgb_array"), min_time)
+
+@benchmark("render_batch[20]")
+def benchmark_render_batch(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    states = [env.get_render_state() for _ in play(env, np_random, 20)]
+    return time_calls(lambda: env.render_batch(states), min_time)
+
+@benchmark("get_json")
+def benchmark_get_json(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    return time_game_states(env, np_random, env.get_json, min_time)
+
+@benchmark("get_move_requests")
+def benchmark_get_move_requests(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    return time_game_states(env, np_random, env.get_move_requests, min_time)
+
+@benchmark("game_state_parser")
+def benchmark_game_state_parser(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    for _ in play(env, np_random, 20):
+        pass
+    game_state = env.get_json()
+    return time_calls(lambda: Game_state_parser(game_state).parse(), min_time)
+
+@benchmark("reset[game_states]")
+def benchmark_reset_game_states(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    game_states = [env.get_json() for _ in play(env, np_random, 100)]
+    env = BattlesnakeGym.from_game_states(game_states)
+    return time_calls(env.reset, min_time)
+
+def load_module(name, path):
+    '''
+    Load a module of the training code from its path. Returns None if the module
+    or its dependencies are not available
+    '''
+    if RLLIB_TRAINING_DIR not in sys.path:
+        sys.path.append(RLLIB_TRAINING_DIR)
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        print("Skipping benchmarks of {}: {}".format(name, e))
+        return None
+    return module
+
+@benchmark("rllib_sort_states_for_snake_id")
+def benchmark_sort_states(params, np_random, min_time):
+    module = load_module("rllib_utils", os.path.join(RLLIB_TRAINING_DIR, "utils.py"))
+    if module is None or params["number_of_snakes"] < 2:
+        return None
+    env = make_env(params, "max-bordered-51s", np_random)
+    for _ in play(env, np_random, 20):
+        pass
+    state = np.array(env._get_observation(), dtype=np.float32)
+    snake_ids = list(range(1, params["number_of_snakes"] + 1))
+    def sort_all_states():
+        for snake_id in snake_ids:
+            module.sort_states_for_snake_id(state, snake_id)
+    return time_calls(sort_all_states, min_time)
+
+@benchmark("get_egocentric_observation")
+def benchmark_get_egocentric_observation(params, np_random, min_time):
+    env = make_env(params, "max-bordered-51s", np_random)
+    return time_game_states(env, np_random, env.get_egocentric_observation, min_time)
+
+@benchmark("get_territory")
+def benchmark_get_territory(params, np_random, min_time):
+    env = make_env(params, np_random=np_random)
+    return time_game_states(env, np_random, env.get_territory, min_time)
+
+def measure_import_time(module, path):
+    '''
+    Measure the cold import time of module in a new interpreter with python -X importtime.
+    Returns the time in seconds, the sum of the cumulative times of the top level imports
+    after the startup of the interpreter (site), or None if the module cannot be imported
+    '''
+    code = "import importlib, sys; sys.path.insert(0, {!r}); importlib.import_module({!r})".format(
+        os.path.abspath(path), module)
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    if process.returncode != 0:
+        print("Skipping import benchmark of {}: {}".format(
+            module, process.stderr.strip().splitlines()[-1]))
+        return None
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == "site":
+            total = 0
+        # Nested imports are indented
+        elif cumulative.strip().isdigit() and not name.startswith("  "):
+            total += int(cumulative)
+    return total * 1e-6
+
+def make_import_benchmark(module, path):
+    def benchmark_import(params, np_random, min_time):
+        calls = 0
+        elapsed = 0.0
+        while elapsed < min_time or calls < 3:
+            import_time = measure_import_time(module, path)
+            if import_time is None:
+                return None
+            elapsed += import_time
+            calls += 1
+        return calls, elapsed
+    return benchmark_import
+
+for _module, _path in IMPORTED_MODULES:
+    benchmark("import[{}]".format(_module), grid=False)(make_import_benchmark(_module, _path))
+
+@benchmark("rllib_multi_agent_step")
+def benchmark_multi_agent_step(params, np_random, min_time):
+    module = load_module("ma_battlesnake", os.path.join(RLLIB_TRAINING_DIR, "ma_battlesnake.py"))
+    if module is None or params["number_of_snakes"] < 2:
+        return None
+    env = module.MultiAgentBattlesnake(params["number_of_snakes"], params["map_size"][0],
+                                       heuristics=[])
+    env.reset()
+    calls = 0
+    elapsed = 0.0
+    while elapsed < min_time or calls < 10:
+        actions = random_policy(env.env, np_random)
+        action_dict = {"agent_{}".format(i): a for i, a in enumerate(actions.tolist())}
+        tic = time.perf_counter()
+        _, _, dones, _ = env.step(action_dict)
+        elapsed += time.perf_counter() - tic
+        calls += 1
+        if dones["__all__"]:
+            env.reset()
+    return calls, elapsed
+
+def run_benchmarks(map_sizes, number_of_snakes, min_time, name_filter=None, seed=0):
+    '''
+    Run the registered benchmarks
+
+    Returns:
+    --------
+    results: [{}]
+        For each benchmark and parameters: "name", "params", "calls",
+        "seconds", "calls_per_second" and "mean_us"
+    '''
+    results = []
+    for name, (function, grid) in BENCHMARKS.items():
+        if name_filter is not None and name_filter not in name:
+            continue
+        if grid:
+            grid_params = [{"map_size": map_size, "number_of_snakes": n}
+                           for map_size in map_sizes for n in number_of_snakes
+                           if n <= map_size[0] * map_size[1] // 4]
+        else:
+            grid_params = [{}]
+        for params in grid_params:
+            np_random = np.random.RandomState(seed)
+            measurement = function(params, np_random, min_time)
+            if measurement is None:
+                continue
+            calls, seconds = measurement
+            result = {"name": name,
+                      "params": {k: list(v) if isinstance(v, tuple) else v
+                                 for k, v in params.items()},
+                      "calls": calls,
+                      "seconds": seconds,
+                      "calls_per_second": calls / seconds,
+                      "mean_us": 1e6 * seconds / calls}
+            print("{:<36} {:<40} {:>12.1f} calls/s {:>10.1f} us".format(
+                name, json.dumps(result["params"]), result["calls_per_second"],
+                result["mean_us"]))
+            results.append(result)
+    return results
+
+def get_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+def compare_results(results, baseline_results, tolerance):
+    '''
+    Compare the results with baseline results
+
+    Returns:
+    --------
+    regressions: [{}]
+        Results that are slower than the baseline by more than tolerance.
+        The "ratio" key is the speed relative to the baseline
+    '''
+    baseline = {get_key(result): result for result in baseline_results}
+    regressions = []
+    for result in results:
+        key = get_key(result)
+        if key not in baseline:
+            continue
+        ratio = result["calls_per_second"] / baseline[key]["calls_per_second"]
+        status = "ok"
+        if ratio < 1 - tolerance:
+            status = "REGRESSION"
+            regressions.append(dict(result, ratio=ratio))
+        print("{:<36} {:<40} {:>8.2f}x {}".format(key[0], key[1], ratio, status))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the BattlesnakeGym")
+    parser.add_argument("--output", help="Path of the json file to write the results to")
+    parser.add_argument("--compare", help="Path of baseline results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative slow down reported as a regression")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum time in seconds spent in each benchmark")
+    parser.add_argument("--filter", help="Only run the benchmarks containing this string")
+    parser.add_argument("--quick", action="store_true",
+                        help="Only run one map size and number of snakes")
+    args = parser.parse_args(argv)
+
+    map_sizes = QUICK_MAP_SIZES if args.quick else MAP_SIZES
+    number_of_snakes = QUICK_NUMBER_OF_SNAKES if args.quick else NUMBER_OF_SNAKES
+    results = run_benchmarks(map_sizes, number_of_snakes, args.min_time, args.filter)
+
+    output = {"metadata": {"python": platform.python_version(),
+                           "numpy": np.__version__,
+                           "platform": platform.platform(),
+                           "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline_results = json.load(f)["results"]
+        regressions = compare_results(results, baseline_results, args.tolerance)
+        if len(regressions) > 0:
+            print("{} regressions".format(len(regressions)))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import json
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import BattlesnakeGym
+
+class TestMoveRequestEncoder(unittest.TestCase):
+    '''
+    Test that the move requests contain the same board as get_json
+    '''
+    def test_same_as_get_json(self):
+        np_random = np.random.RandomState(0)
+        env = BattlesnakeGym(map_size=(7, 9), number_of_snakes=3)
+        env.seed(1)
+        env.reset()
+        for _ in range(20):
+            game_json = env.get_json()
+            # get_json only contains python types
+            json.dumps(game_json)
+            alive = [i for i in range(3) if env.snakes.alive[i]]
+            expected_snakes = [snake for snake in game_json["board"]["snakes"]
+                               if snake["id"] in alive]
+
+            requests = env.get_move_requests()
+            self.assertEqual(sorted(requests.keys()), alive)
+            for i, request in requests.items():
+                request = json.loads(request)
+                self.assertEqual(request["turn"], game_json["turn"])
+                self.assertEqual(request["you"]["id"], str(i))
+                self.assertEqual(request["you"]["head"], request["you"]["body"][0])
+                board = request["board"]
+                self.assertEqual((board["height"], board["width"]), (7, 9))
+                self.assertEqual(board["food"], game_json["board"]["food"])
+                self.assertEqual([(snake["body"], snake["health"], snake["length"])
+                                  for snake in board["snakes"]],
+                                 [(snake["body"], snake["health"], len(snake["body"]))
+                                  for snake in expected_snakes])
+            if len(alive) <= 1:
+                break
+            env.step(np_random.randint(4, size=3))
+
+    def test_dead_snake_ids(self):
+        '''
+        Test that the dead snakes are skipped and that unknown ids are rejected
+        '''
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        env.seed(0)
+        env.reset()
+        env.snakes.kill_snake(1)
+        requests = env.get_move_requests(snake_ids=[0, 1, 2])
+        self.assertEqual(sorted(requests.keys()), [0, 2])
+        self.assertEqual(requests, env.get_move_requests())
+        with self.assertRaisesRegex(ValueError, "3"):
+            env.get_move_requests(snake_ids=[0, 3])
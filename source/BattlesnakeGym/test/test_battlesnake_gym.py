@@ -11,7 +11,11 @@
 # express or implied. See the License for the specific language governing 
 # permissions and limitations under the License.
 
+import importlib.util
 import os
+import pickle
+import subprocess
+import sys
 import time
 import unittest
 
@@ -19,6 +23,7 @@ import numpy as np
 
 from battlesnake_gym.snake_gym import BattlesnakeGym
 from battlesnake_gym.snake import Snake
+from battlesnake_gym.snapshot import encode_rng_state
 
 from .test_utils import grow_snake, grow_two_snakes, should_render, simulate_snake
 
@@ -52,17 +57,16 @@ class TestBattlesnakeGym(unittest.TestCase):
     def test_snake_eaten_adjacent_tile_same_size(self):
         '''
         Tests that if two snakes of the same size eat each other, they both die
-        see: outcome option = "Snake was eaten - adjacent tile" in snake_gym._did_snake_collide
+        see: outcome option = "Snake was eaten - adjacent tile" in collisions.resolve_collisions
         '''
         snake_location = [(4, 1), (4, 12)]
-        food_location = [(4, 2), (4, 9), (4, 3), (4, 8), 
-                         (0, 0), (0, 0), (0, 0)]
+        food_location = [(4, 2), (4, 9), (4, 4), (4, 8), 
+                         (0, 0), (0, 0), (0, 0), (0, 0)]
         env = BattlesnakeGym(map_size=(13, 13), number_of_snakes=2,
                              snake_spawn_locations=snake_location,
                              food_spawn_locations=food_location,
                              verbose=True)
-
-        env.food.max_turns_to_next_food_spawn = 2  # Hack to make sure that food is spawned every turn
+        env.seed(0)
         
         actions = [[Snake.RIGHT, Snake.LEFT], [Snake.RIGHT, Snake.LEFT], [Snake.RIGHT, Snake.LEFT],
                    [Snake.RIGHT, Snake.LEFT], [Snake.RIGHT, Snake.LEFT], [Snake.RIGHT, Snake.LEFT],
@@ -78,7 +82,7 @@ class TestBattlesnakeGym(unittest.TestCase):
     def test_snake_eaten_adjacent_tile(self):
         '''
         Tests that the snake dies if it's eaten by a bigger snake
-        see: outcome option = "Snake was eaten - adjacent tile" in snake_gym._did_snake_collide
+        see: outcome option = "Snake was eaten - adjacent tile" in collisions.resolve_collisions
         '''
         env = grow_two_snakes(snake_starting_positions=[(0, 0), (5, 0)])
         actions_snake1 = [[Snake.DOWN], [Snake.LEFT]] + [[Snake.UP]]*4
@@ -104,7 +108,7 @@ class TestBattlesnakeGym(unittest.TestCase):
     def test_snake_eaten_same_tile(self):
         '''
         Tests that the snake dies if it's eaten by a bigger snake
-        see: outcome option = "Snake was eaten - same tile" in snake_gym._did_snake_collide
+        see: outcome option = "Snake was eaten - same tile" in collisions.resolve_collisions
         '''
         env = grow_two_snakes(snake_starting_positions=[(0, 0), (5, 1)])
         actions_snake1 = [[Snake.DOWN], [Snake.LEFT]] + [[Snake.UP]]*3
@@ -131,7 +135,7 @@ class TestBattlesnakeGym(unittest.TestCase):
     def test_snake_hit_other_snake(self):
         '''
         Tests that the snake dies after it hits the body of another snake
-        see: outcome option = "Snake hit body - hit other" in snake_gym._did_snake_collide
+        see: outcome option = "Snake hit body - hit other" in collisions.resolve_collisions
         '''
         env = grow_two_snakes(snake_starting_positions=[(0, 0), (5, 0)])
         actions_snake1 = [[Snake.DOWN], [Snake.LEFT], [Snake.UP], [Snake.UP],
@@ -158,7 +162,7 @@ class TestBattlesnakeGym(unittest.TestCase):
     def test_snake_die_when_hit_self(self):
         '''
         Tests that the snake dies after it hits the body of itself
-        see: outcome option = "Snake hit body - hit itself" in snake_gym._did_snake_collide
+        see: outcome option = "Snake hit body - hit itself" in collisions.resolve_collisions
         '''
 
         env = grow_snake()
@@ -174,7 +178,7 @@ class TestBattlesnakeGym(unittest.TestCase):
     def test_snake_die_when_hit_wall(self):
         '''
         Tests that the snake dies after it hits a wall
-        see: outcome option = "Snake hit wall" in snake_gym._did_snake_collide
+        see: outcome option = "Snake hit wall" in collisions.resolve_collisions
         '''
 
         env = grow_snake()
@@ -308,16 +312,46 @@ class TestBattlesnakeGym(unittest.TestCase):
         self.assertTrue(env.food.locations_map[food_location[0][0], food_location[0][1]] == 1)
         env.close()
 
+    def test_render(self):
+        '''
+        Test the boxes of the rgb_array rendering and that render_batch matches render
+        '''
+        env = BattlesnakeGym(map_size=(5, 7), number_of_snakes=1,
+                             snake_spawn_locations=[(1, 2)],
+                             food_spawn_locations=[(3, 4)])
+        board = env.render(mode="rgb_array")
+        self.assertEqual(board.shape, (5 * 50 + 40, 7 * 50 + 40, 3))
+        colour = env.snakes.get_snake_colours()[0]
+
+        # Snake head in (1, 2): colour of the snake with a white centre
+        self.assertTrue(np.array_equal(board[70, 120], colour))
+        self.assertTrue(np.array_equal(board[90, 140], [255, 255, 255]))
+        # Food in (3, 4): grey box with a red centre
+        self.assertTrue(np.array_equal(board[170, 220], [178, 178, 178]))
+        self.assertTrue(np.array_equal(board[190, 240], [255, 0, 0]))
+        # Space between the boxes
+        self.assertTrue(np.array_equal(board[65, 65], [255, 255, 255]))
+
+        states = [env.get_render_state()]
+        boards = [board]
+        for action in [Snake.RIGHT, Snake.DOWN, Snake.DOWN]:
+            env.step([action])
+            states.append(env.get_render_state())
+            boards.append(env.render(mode="rgb_array"))
+        self.assertTrue(np.array_equal(env.render_batch(states), np.stack(boards)))
+        env.close()
+
     def test_states(self):
         '''
         Test that the state returned is correct
         '''
         snake_location = [(0, 0)]
-        food_location = [(1, 0), (1, 2), (2, 0), (2, 0), (2, 0)]
+        # A food is spawned every turn from the list: the snake eats the first food at (1, 2)
+        # and the food spawned when its head is on (1, 2) stays under its body
+        food_location = [(1, 2)] * 6
         env = BattlesnakeGym(map_size=(3, 3), number_of_snakes=1,
                           snake_spawn_locations=snake_location,
                           food_spawn_locations=food_location)
-        env.food.max_turns_to_next_food_spawn = 2 #Hack to make sure that food is spawned every turn
         
         actions = [[Snake.DOWN], [Snake.RIGHT], [Snake.RIGHT], [Snake.DOWN], [Snake.LEFT]]
         observation, _, _, _ = simulate_snake(env, actions, render=False, break_with_done=False)
@@ -334,6 +368,278 @@ class TestBattlesnakeGym(unittest.TestCase):
         self.assertTrue(np.array_equal(observation[:, :, 0],  food_state))
         self.assertTrue(np.array_equal(observation[:, :, 1],  snake_state))
 
+    def test_seeding(self):
+        '''
+        Test that two gyms with the same seed spawn the same snakes and food
+        '''
+        jsons = []
+        for _ in range(2):
+            env = BattlesnakeGym(map_size=(11, 11), number_of_snakes=4)
+            env.seed(7)
+            env.reset()
+            for _ in range(10):
+                env.step([Snake.UP, Snake.DOWN, Snake.LEFT, Snake.RIGHT])
+            jsons.append(env.get_json())
+        self.assertEqual(jsons[0], jsons[1])
+
+    def test_reset_reuses_objects(self):
+        '''
+        Test that reset reuses Snakes and Food and spawns the same game as new objects
+        '''
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        env.seed(2)
+        env.reset()
+        snakes, food = env.snakes, env.food
+        for _ in range(5):
+            env.step([Snake.UP, Snake.LEFT, Snake.DOWN])
+        rng_state = env._get_rng_state()
+        observation, _, _, _ = env.reset()
+        self.assertIs(env.snakes, snakes)
+        self.assertIs(env.food, food)
+
+        new_env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        new_env.snakes = new_env.food = None
+        new_env._set_rng_state(rng_state)
+        new_observation, _, _, _ = new_env.reset()
+        self.assertIsNot(new_env.snakes, snakes)
+        self.assertEqual(env.get_json(), new_env.get_json())
+        self.assertTrue(np.array_equal(observation, new_observation))
+        self.assertTrue(np.array_equal(env.snakes.free_cells.get_free_map(),
+                                       new_env.snakes.free_cells.get_free_map()))
+
+    def test_spawn_layouts(self):
+        '''
+        Test the snakes spawned with the official spawn points and the pool of layouts
+        '''
+        corners = {(1, 1), (1, 9), (9, 1), (9, 9)}
+        env = BattlesnakeGym(map_size=(11, 11), number_of_snakes=4, spawn_layout="official")
+        for _ in range(3):
+            env.reset()
+            self.assertEqual(set(map(tuple, env.snakes.heads.tolist())), corners)
+        env = BattlesnakeGym(map_size=(11, 11), number_of_snakes=6, spawn_layout="official")
+        heads = set(map(tuple, env.snakes.heads.tolist()))
+        self.assertEqual(len(heads), 6)
+        self.assertTrue(corners.issubset(heads))
+
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=8, spawn_layout="pool")
+        for _ in range(3):
+            env.reset()
+            self.assertEqual(len(set(map(tuple, env.snakes.heads.tolist()))), 8)
+            self.assertEqual(np.sum(env.snakes.get_snake_51_map() == 5), 8)
+
+    def test_validate(self):
+        '''
+        Test that snapshots are only kept with validate=True and that
+        an invalid game state raises an error
+        '''
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=1, snake_spawn_locations=[(2, 2)])
+        env.step([Snake.UP])
+        self.assertEqual(len(env.snapshots), 0)
+
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=1, snake_spawn_locations=[(2, 2)],
+                             validate=True)
+        initial_json = env.get_json()
+        env.step([Snake.UP])
+        self.assertEqual([label for label, _ in env.snapshots], ["before moving", "after moving"])
+        self.assertEqual(env._snapshot_to_json(env.snapshots[0][1]), initial_json)
+
+        env.snakes.grid_count[0, 0] += 1
+        with self.assertRaises(RuntimeError):
+            env.step([Snake.UP])
+
+    def test_observation_buffers(self):
+        '''
+        Test the dtype of the observations, the out parameter and the reuse of the
+        observation buffer
+        '''
+        for observation_type in ["flat-51s", "bordered-num", "max-bordered-51s"]:
+            legacy_env = BattlesnakeGym(observation_type=observation_type, map_size=(7, 7),
+                                        number_of_snakes=2, snake_spawn_locations=[(1, 1), (5, 5)],
+                                        food_spawn_locations=[(3, 3)])
+            legacy_observation, _, _, _ = legacy_env.reset()
+            for dtype in [np.int8, np.float32]:
+                env = BattlesnakeGym(observation_type=observation_type, map_size=(7, 7),
+                                     number_of_snakes=2, snake_spawn_locations=[(1, 1), (5, 5)],
+                                     food_spawn_locations=[(3, 3)], observation_dtype=dtype,
+                                     copy_observation=False)
+                self.assertEqual(env.observation_space.dtype, dtype)
+                observation, _, _, _ = env.reset()
+                self.assertEqual(observation.dtype, dtype)
+                self.assertTrue(np.array_equal(observation, legacy_observation))
+                self.assertEqual(observation.shape, env.observation_space.shape)
+
+                next_observation, _, _, _ = env.step([Snake.UP, Snake.DOWN])
+                self.assertIs(next_observation, observation)
+
+                out = np.zeros(env.observation_space.shape, dtype=dtype)
+                returned, _, _, _ = env.step([Snake.UP, Snake.DOWN], out=out)
+                self.assertIs(returned, out)
+                self.assertTrue(np.array_equal(out, observation))
+
+    def test_egocentric_observation(self):
+        '''
+        Test that the egocentric views are the states sorted by sort_states_for_snake_id
+        of the RLlib training code, including the -1 borders
+        '''
+        path = os.path.join(os.path.dirname(__file__), "..", "..", "RLlibEnv", "training",
+                            "training_src", "utils.py")
+        spec = importlib.util.spec_from_file_location("rllib_utils", path)
+        rllib_utils = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(rllib_utils)
+
+        np_random = np.random.RandomState(0)
+        for observation_type in ["flat-51s", "bordered-num", "max-bordered-51s"]:
+            env = BattlesnakeGym(observation_type=observation_type, map_size=(7, 7),
+                                 number_of_snakes=3, egocentric=True)
+            env.seed(0)
+            views, _, _, _ = env.reset()
+            self.assertEqual(views.shape, env.observation_space.shape)
+            for _ in range(30):
+                observation = np.array(env._observation, dtype=np.float32)
+                for i in range(3):
+                    expected = rllib_utils.sort_states_for_snake_id(observation, i + 1)
+                    self.assertTrue(np.array_equal(views[i], expected))
+                views, _, dones, _ = env.step(np_random.choice(4, size=3))
+                if sum(dones.values()) >= 2:
+                    views, _, _, _ = env.reset()
+
+        # A single snake has no other snakes, only the borders
+        env = BattlesnakeGym(observation_type="bordered-num", map_size=(5, 5), number_of_snakes=1)
+        views = env.get_egocentric_observation()
+        self.assertEqual(views.shape, (1, 7, 7, 3))
+        self.assertTrue(np.array_equal(views[0, :, :, 2], np.minimum(env._observation[:, :, 0], 0)))
+
+    def test_incremental_observation(self):
+        '''
+        Test that the observations updated with the changed cells are identical to
+        observations generated from scratch
+        '''
+        np_random = np.random.RandomState(0)
+        for observation_type in ["flat-51s", "flat-num"]:
+            env = BattlesnakeGym(observation_type=observation_type, map_size=(7, 7),
+                                 number_of_snakes=3)
+            env.seed(0)
+            observation, _, _, _ = env.reset()
+            for _ in range(100):
+                observation, _, dones, _ = env.step(np_random.choice(4, size=3))
+                self.assertTrue(np.array_equal(observation, env._get_state()))
+                if sum(dones.values()) >= 2:
+                    observation, _, _, _ = env.reset()
+
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=1, snake_spawn_locations=[(2, 2)],
+                             food_spawn_locations=[(0, 0)])
+        env.food.FOOD_SPAWN_CHANCE = 0
+        for _ in range(2):
+            env.step([Snake.UP])
+        env.step([Snake.RIGHT])
+        changed_cells = set(tuple(cell) for cell in env.get_changed_cells())
+        # New head, previous head and the tail
+        self.assertEqual(changed_cells, {(0, 3), (0, 2), (2, 2)})
+
+    def test_state_snapshot(self):
+        '''
+        Test that gyms restored from a snapshot or unpickled continue the game identically
+        '''
+        np_random = np.random.RandomState(0)
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        env.seed(0)
+        env.reset()
+        for _ in range(5):
+            env.step(np_random.choice(4, size=3))
+
+        restored_env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        restored_env.restore_state_snapshot(env.get_state_snapshot())
+        unpickled_env = pickle.loads(pickle.dumps(env))
+        for other_env in [restored_env, unpickled_env]:
+            self.assertEqual(other_env.get_json(), env.get_json())
+            self.assertTrue(np.array_equal(other_env.snakes.facing, env.snakes.facing))
+            self.assertTrue(np.array_equal(other_env.snakes.stacking, env.snakes.stacking))
+
+        for _ in range(20):
+            actions = np_random.choice(4, size=3)
+            observation, reward, dones, info = env.step(actions)
+            for other_env in [restored_env, unpickled_env]:
+                other_observation, other_reward, other_dones, other_info = other_env.step(actions)
+                self.assertTrue(np.array_equal(observation, other_observation))
+                self.assertEqual(reward, other_reward)
+                self.assertEqual(info, other_info)
+                self.assertEqual(other_env.get_json(), env.get_json())
+
+    def test_snapshot_random_generator(self):
+        '''
+        Test that the random generator is stored as integers in the snapshots: the legacy
+        RandomState is restored and a pickled state is rejected instead of being loaded
+        '''
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        env.np_random = np.random.RandomState(0)
+        env.reset()
+        env.np_random.standard_normal()
+        snapshot = env.get_state_snapshot()
+
+        restored_env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        restored_env.np_random = np.random.RandomState(1)
+        restored_env.restore_state_snapshot(snapshot)
+        self.assertEqual(restored_env.np_random.standard_normal(), env.np_random.standard_normal())
+        self.assertEqual(restored_env.np_random.randint(1000), env.np_random.randint(1000))
+
+        # The random generator state is the last words of the snapshot
+        rng_size = len(encode_rng_state(env._get_rng_state())) * 4
+        pickled_state = pickle.dumps(env._get_rng_state())
+        with self.assertRaises(ValueError):
+            restored_env.restore_state_snapshot(snapshot[:-rng_size] + pickled_state)
+
+    def test_gym_imported_lazily(self):
+        '''
+        Test that importing the module of the gym does not import gym, the spaces built by
+        the constructor do
+        '''
+        code = "import sys; import battlesnake_gym.snake_gym as snake_gym; " \
+               "assert 'gym' not in sys.modules; snake_gym.BattlesnakeGym(); " \
+               "assert 'gym' in sys.modules"
+        package_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-c", code], cwd=package_directory, check=True,
+                       stderr=subprocess.DEVNULL)
+
+    def test_profiling(self):
+        '''
+        Test that profiling is enabled with the environment variable and with a callback
+        '''
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=2)
+        env.step([Snake.UP, Snake.UP])
+        self.assertEqual(env.get_profile(), {})
+
+        os.environ["BATTLESNAKE_GYM_PROFILE"] = "1"
+        try:
+            env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=2)
+        finally:
+            del os.environ["BATTLESNAKE_GYM_PROFILE"]
+        env.step([Snake.UP, Snake.UP])
+        env.render(mode="rgb_array")
+        profile = env.get_profile()
+        engine_phases = {"numpy": ["move", "collision"], "numba": ["kernel"],
+                         "bitboard": ["bitboard", "move"]}
+        phases = engine_phases[env.engine]
+        for name in phases + ["food", "reward", "info", "observation",
+                              "step", "reset", "render"]:
+            self.assertIn(name, profile)
+        self.assertEqual(profile["step"]["count"], 1)
+        self.assertEqual(sum(profile["step"]["histogram"]), 1)
+
+        calls = []
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=2,
+                             profile_callback=lambda call, timings: calls.append((call, timings)))
+        env.step([Snake.UP, Snake.UP])
+        self.assertEqual([call for call, _ in calls], ["reset", "step"])
+        self.assertIn(engine_phases[env.engine][0], calls[1][1])
+        self.assertIn("total", calls[1][1])
+
+        # The callback is not pickled, the unpickled gym keeps profiling
+        unpickled_env = pickle.loads(pickle.dumps(env))
+        self.assertIsNone(unpickled_env._config["profile_callback"])
+        unpickled_env.step([Snake.UP, Snake.UP])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(unpickled_env.get_profile()["step"]["count"], 1)
+
 if __name__ == '__main__':
     unittest.main()
     
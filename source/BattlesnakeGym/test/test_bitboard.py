@@ -0,0 +1,150 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import os
+import unittest
+
+import numpy as np
+
+from battlesnake_gym.snake_gym import BattlesnakeGym, ENGINE_ENV_VARIABLE
+from battlesnake_gym.snake import Snake
+from battlesnake_gym.bitboard import BitboardBoard, count_bits
+
+from . import test_battlesnake_gym
+
+class TestBattlesnakeGymBitboard(test_battlesnake_gym.TestBattlesnakeGym):
+    '''
+    Run the tests of the BattlesnakeGym with engine="bitboard"
+    '''
+    def setUp(self):
+        self.previous_engine = os.environ.get(ENGINE_ENV_VARIABLE)
+        os.environ[ENGINE_ENV_VARIABLE] = "bitboard"
+
+    def tearDown(self):
+        if self.previous_engine is None:
+            del os.environ[ENGINE_ENV_VARIABLE]
+        else:
+            os.environ[ENGINE_ENV_VARIABLE] = self.previous_engine
+
+    def test_engine(self):
+        self.assertEqual(BattlesnakeGym(map_size=(5, 5), number_of_snakes=2).engine, "bitboard")
+
+    def test_validate(self):
+        '''
+        The bitboard engine rebuilds the occupancy grid from the bodies every turn,
+        so the invalid game state is made of two overlapping bodies
+        '''
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=2, validate=True)
+        initial_json = env.get_json()
+        env.step([Snake.UP, Snake.UP])
+        self.assertEqual([label for label, _ in env.snapshots], ["before moving", "after moving"])
+        self.assertEqual(env._snapshot_to_json(env.snapshots[0][1]), initial_json)
+
+        bodies = [np.array([[3, 3], [3, 4], [3, 5]]), np.array([[1, 1], [1, 2], [3, 5]])]
+        env.snakes.set_state(bodies, [100, 100], [Snake.LEFT, Snake.LEFT], [2, 2],
+                             [False, False], [True, True], env.snakes.colours)
+        with self.assertRaises(RuntimeError):
+            env.step([Snake.UP, Snake.UP])
+
+    def test_same_as_numpy_engine(self):
+        '''
+        Play the same games with the numpy and the bitboard engines. Most moves are safe
+        so that the snakes live long enough to chase their tails
+        '''
+        np_random = np.random.RandomState(0)
+        for observation_type in ["bordered-51s", "flat-num"]:
+            envs = [BattlesnakeGym(observation_type=observation_type, map_size=(7, 7),
+                                   number_of_snakes=3, engine=engine, validate=True)
+                    for engine in ["numpy", "bitboard"]]
+            for env in envs:
+                env.seed(3)
+                env.reset()
+            for _ in range(300):
+                board = envs[1].get_board()
+                actions = np_random.randint(4, size=3)
+                for i in range(3):
+                    safe_moves = board.get_safe_moves(i)
+                    if len(safe_moves) > 0 and np_random.rand() < 0.95:
+                        actions[i] = safe_moves[np_random.randint(len(safe_moves))]
+                numpy_step, bitboard_step = [env.step(actions) for env in envs]
+                self.assertTrue(np.array_equal(numpy_step[0], bitboard_step[0]))
+                self.assertEqual(numpy_step[1:3], bitboard_step[1:3])
+                self.assertEqual(envs[0].get_json(), envs[1].get_json())
+                if sum(numpy_step[2].values()) >= 2:
+                    for env in envs:
+                        env.reset()
+
+class TestBitboardBoard(unittest.TestCase):
+    '''
+    Test the queries and the forward model of the bitboards
+    '''
+    def test_neighbours(self):
+        board = BitboardBoard((3, 4), 1)
+        corner = board.cell_bit((0, 3))
+        self.assertEqual(sorted(board.bits_to_coordinates(board.neighbours(corner))),
+                         [(0, 2), (1, 3)])
+        self.assertEqual(board.shift(corner, Snake.RIGHT), 0)
+        self.assertEqual(board.shift(corner, Snake.UP), 0)
+        self.assertEqual(board.shift(corner, Snake.DOWN), board.cell_bit((1, 3)))
+
+    def test_flood_fill(self):
+        board = BitboardBoard((3, 3), 1)
+        wall = board.cell_bit((0, 1)) | board.cell_bit((1, 1))
+        reachable = board.flood_fill(board.cell_bit((0, 0)), blocked=wall)
+        self.assertEqual(count_bits(reachable), 7)
+        reachable = board.flood_fill(board.cell_bit((0, 0)), blocked=wall, max_steps=2)
+        self.assertEqual(sorted(board.bits_to_coordinates(reachable)),
+                         [(0, 0), (1, 0), (2, 0)])
+
+    def test_copy_and_step(self):
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=1,
+                             snake_spawn_locations=[(2, 2)], food_spawn_locations=[(1, 2)])
+        self.assertIs(env.get_board(), env.get_board())
+        board = env.get_board().copy()
+        self.assertEqual(board.get_safe_moves(0), [Snake.UP, Snake.DOWN, Snake.LEFT, Snake.RIGHT])
+        _, _, _, ate_food = board.step([Snake.UP])
+        self.assertEqual(ate_food, [True])
+        self.assertEqual(board.get_length(0), 2)
+        self.assertEqual(board.get_safe_moves(0), [Snake.UP, Snake.LEFT, Snake.RIGHT])
+        # The board of the gym did not move
+        self.assertEqual(env.get_board().get_length(0), 1)
+        self.assertEqual(env.get_board().food, board.cell_bit((1, 2)))
+
+    def test_same_as_gym(self):
+        '''
+        Step the board of each turn and the gym with the same actions. The board does not
+        spawn food, so only the food that the gym did not spawn is compared.
+        '''
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        env.seed(3)
+        env.reset()
+        np_random = np.random.RandomState(0)
+        for _ in range(100):
+            actions = np_random.randint(4, size=3)
+            board = env.get_board().copy()
+            board.step(actions)
+            _, _, dones, _ = env.step(actions)
+
+            expected_board = env.get_board()
+            self.assertEqual(board.alive, expected_board.alive)
+            for i in np.flatnonzero(env.snakes.alive).tolist():
+                self.assertEqual(board.bodies[i], expected_board.bodies[i])
+                self.assertEqual(board.health[i], expected_board.health[i])
+                self.assertEqual(board.ate_food[i], expected_board.ate_food[i])
+            self.assertEqual(board.get_occupied(), expected_board.get_occupied())
+            self.assertEqual(board.food & ~expected_board.food, 0)
+            if all(dones.values()):
+                env.reset()
+
+if __name__ == '__main__':
+    unittest.main()
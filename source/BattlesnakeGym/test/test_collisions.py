@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import collisions
+from battlesnake_gym.collisions import resolve_collisions
+
+class TestCollisions(unittest.TestCase):
+    '''
+    Test the outcomes of collisions.resolve_collisions on hand made boards
+    '''
+    def make_grid(self, bodies, map_size=(5, 5)):
+        grid_owner = np.full(map_size, collisions.EMPTY)
+        for snake_id, body in enumerate(bodies):
+            for i, j in body:
+                grid_owner[i, j] = snake_id
+        return grid_owner
+
+    def test_swapped_heads(self):
+        '''
+        Test that the smaller snake is eaten when two heads swap positions
+        '''
+        # Snake 0 moved from (2, 1) to (2, 2) and snake 1 moved from (2, 2) to (2, 1)
+        grid_owner = self.make_grid([[(2, 0), (2, 1)], [(2, 3), (2, 2)]])
+        heads = np.array([[2, 2], [2, 1]])
+        previous_heads = np.array([[2, 1], [2, 2]])
+        lengths = np.array([3, 4])
+        alive = np.array([True, True])
+
+        outcomes = resolve_collisions(heads, previous_heads, lengths, alive, grid_owner)
+        self.assertEqual(outcomes.tolist(), [collisions.EATEN_ADJACENT_TILE,
+                                             collisions.ATE_ANOTHER_SNAKE])
+
+    def test_wall_and_body(self):
+        '''
+        Test that a snake hitting a wall is removed from the map for the other snakes
+        and that a snake running into a body is killed
+        '''
+        grid_owner = self.make_grid([[(0, 1), (0, 0)], [(1, 1), (1, 0)], [(3, 1), (3, 2)]])
+        heads = np.array([[-1, 0], [0, 0], [3, 3]])
+        previous_heads = np.array([[0, 0], [1, 0], [3, 2]])
+        lengths = np.array([3, 3, 3])
+        alive = np.array([True, True, True])
+
+        outcomes = resolve_collisions(heads, previous_heads, lengths, alive, grid_owner)
+        self.assertEqual(outcomes.tolist(), [collisions.HIT_WALL,
+                                             collisions.DID_NOT_COLLIDE,
+                                             collisions.DID_NOT_COLLIDE])
+
+        grid_owner = self.make_grid([[(0, 1), (0, 0)], [(1, 0), (1, 1)], [(3, 0), (2, 0)]])
+        heads = np.array([[-1, 0], [1, 2], [1, 0]])
+        previous_heads = np.array([[0, 0], [1, 1], [2, 0]])
+        outcomes = resolve_collisions(heads, previous_heads, lengths, alive, grid_owner)
+        self.assertEqual(outcomes.tolist(), [collisions.HIT_WALL,
+                                             collisions.OTHER_SNAKE_HIT_BODY,
+                                             collisions.HIT_OTHER])
+
+if __name__ == '__main__':
+    unittest.main()
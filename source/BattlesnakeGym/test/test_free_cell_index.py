@@ -0,0 +1,55 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from battlesnake_gym.snake_gym import BattlesnakeGym
+from battlesnake_gym.utils import FreeCellIndex
+
+class TestFreeCellIndex(unittest.TestCase):
+    '''
+    Test the index of free cells used to spawn food and snakes
+    '''
+    def test_count_sample(self):
+        grid_count = np.zeros((3, 4), dtype=np.int32)
+        free_cells = FreeCellIndex(grid_count)
+        grid_count.flat[[0, 5, 11]] = [1, 2, 1]
+        self.assertEqual(free_cells.count, 9)
+        self.assertFalse(free_cells.is_free(5))
+        grid_count.flat[11] = 0
+        self.assertEqual(free_cells.count, 10)
+        self.assertTrue(free_cells.is_free(11))
+
+        np_random = np.random.RandomState(0)
+        for _ in range(20):
+            coordinates = free_cells.sample(10, np_random)
+            cells = set(int(i * 4 + j) for i, j in coordinates)
+            self.assertEqual(cells, set(range(12)) - {0, 5})
+
+    def test_in_sync_with_snakes(self):
+        '''
+        Test that the free cells are the cells without snakes during a game
+        '''
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        env.seed(0)
+        env.reset()
+        np_random = np.random.RandomState(0)
+        for _ in range(30):
+            env.step(np_random.choice(4, size=3))
+            free_map = env.snakes.free_cells.get_free_map()
+            self.assertTrue(np.array_equal(free_map, np.logical_not(env.snakes.get_occupancy_map())))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import BattlesnakeGym
+from battlesnake_gym.game_log import GameLog, GameLogWriter
+
+class TestGameLog(unittest.TestCase):
+    '''
+    Test that the positions rebuilt from a game log are the positions of the original game
+    '''
+    def play_game(self, path, number_of_turns):
+        np_random = np.random.RandomState(0)
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=2)
+        env.seed(3)
+        env.reset()
+        snapshots = [env.get_state_snapshot()]
+        jsons = [env.get_json()]
+        with GameLogWriter(path, env, seed=3, keyframe_interval=8) as writer:
+            for _ in range(number_of_turns):
+                actions = np_random.randint(4, size=2)
+                env.step(actions)
+                writer.record(actions)
+                snapshots.append(env.get_state_snapshot())
+                jsons.append(env.get_json())
+        return snapshots, jsons
+
+    def test_random_access(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.bsgl")
+            snapshots, jsons = self.play_game(path, 30)
+            log = GameLog(path)
+
+        self.assertEqual(len(log), 31)
+        self.assertEqual(log.seed, 3)
+        self.assertEqual(log.keyframe_turns, [0, 8, 16, 24])
+        env = log.make_env()
+        for turn in [30, 0, 7, 8, 13, 24]:
+            log.restore(env, turn)
+            self.assertEqual(env.get_json(), jsons[turn])
+            self.assertEqual(env.get_state_snapshot(), snapshots[turn])
+
+    def test_replay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.bsgl")
+            _, jsons = self.play_game(path, 16)
+            log = GameLog(path)
+
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=2)
+        replayed = [env.get_json() for env in log.replay(env, start=5)]
+        self.assertEqual(replayed, jsons[5:])
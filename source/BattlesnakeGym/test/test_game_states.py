@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import pickle
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import BattlesnakeGym, VectorBattlesnakeGym
+from battlesnake_gym.game_state_parser import encode_game_states
+
+def get_board(game_json):
+    '''
+    The board of a game state without the names and colours of the snakes
+    '''
+    board = game_json["board"]
+    return (game_json["turn"], board["food"],
+            [(snake["body"], snake["health"]) for snake in board["snakes"]])
+
+class TestGameStates(unittest.TestCase):
+    '''
+    Test that the gyms reset to the positions of the game states
+    '''
+    def play_game(self, number_of_turns):
+        np_random = np.random.RandomState(0)
+        env = BattlesnakeGym(map_size=(9, 9), number_of_snakes=3)
+        env.seed(2)
+        env.reset()
+        game_states = []
+        for _ in range(number_of_turns):
+            game_states.append(env.get_json())
+            env.step(np_random.randint(4, size=3))
+            if np.sum(env.snakes.alive) <= 1:
+                env.reset()
+        return game_states
+
+    def test_sequential(self):
+        game_states = self.play_game(12)
+        env = BattlesnakeGym.from_game_states(game_states, observation_type="bordered-num")
+        self.assertEqual((env.map_size, env.number_of_snakes), ((9, 9), 3))
+        for n in range(1, 2 * len(game_states)):
+            self.assertEqual(get_board(env.get_json()), get_board(game_states[(n - 1) % 12]))
+            observation, _, _, info = env.reset()
+            self.assertEqual(info["current_turn"], game_states[n % 12]["turn"])
+
+            expected_env = BattlesnakeGym(observation_type="bordered-num", map_size=(9, 9),
+                                          number_of_snakes=3,
+                                          initial_game_state=game_states[n % 12])
+            np.testing.assert_array_equal(observation, expected_env._get_observation())
+
+    def test_random_and_pickle(self):
+        game_states = self.play_game(8)
+        snapshots = encode_game_states(game_states)
+        env = BattlesnakeGym.from_game_states(snapshots, order="random")
+        boards = [get_board(game_state) for game_state in game_states]
+        for _ in range(10):
+            env.reset()
+            self.assertIn(get_board(env.get_json()), boards)
+
+        env.step([0, 1, 2])
+        copied_env = pickle.loads(pickle.dumps(env))
+        self.assertEqual(copied_env.get_json(), env.get_json())
+        copied_env.reset()
+        env.reset()
+        self.assertEqual(copied_env.get_json(), env.get_json())
+
+    def test_vector_gym(self):
+        game_states = self.play_game(10)
+        vector_env = VectorBattlesnakeGym(4, map_size=(9, 9), number_of_snakes=3)
+        vector_env.set_game_states(game_states)
+        for k in range(3):
+            vector_env.reset()
+            for n, env in enumerate(vector_env.envs):
+                self.assertEqual(get_board(env.get_json()),
+                                 get_board(game_states[(n + 4 * k) % 10]))
+
+    def test_incorrect_game_state(self):
+        game_states = self.play_game(2)
+        with self.assertRaises(AssertionError):
+            BattlesnakeGym(map_size=(11, 11), number_of_snakes=3).set_game_states(game_states)
+
+    def test_restore_encoded_game_state(self):
+        game_states = self.play_game(3)
+        env = BattlesnakeGym(map_size=(9, 9), number_of_snakes=3)
+        env.seed(5)
+        env.reset()
+        rng_state = env._get_rng_state()
+        env.restore_state_snapshot(encode_game_states(game_states)[2])
+        self.assertEqual(get_board(env.get_json()), get_board(game_states[2]))
+        # The snapshot has no random generator state, the generator of the gym is kept
+        self.assertEqual(env._get_rng_state(), rng_state)
+        env.step([0, 1, 2])
+
+        # A snapshot of another map size leaves the gym unchanged
+        board = get_board(env.get_json())
+        other_env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=3)
+        other_env.reset()
+        with self.assertRaises(AssertionError):
+            env.restore_state_snapshot(other_env.get_state_snapshot())
+        self.assertEqual(get_board(env.get_json()), board)
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import unittest
+
+import numpy as np
+import pytest
+
+from battlesnake_gym import kernels
+from battlesnake_gym.snake_gym import BattlesnakeGym
+from battlesnake_gym.kernels import KERNEL_BACKEND
+
+class TestKernels(unittest.TestCase):
+    '''
+    Test that the step kernel plays the same games as the numpy engine.
+    Without Numba, the kernel runs as Python.
+    '''
+    def test_default_engine(self):
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=2)
+        self.assertEqual(env.engine, KERNEL_BACKEND)
+
+    def test_same_as_numpy_engine(self):
+        for observation_type in ["flat-51s", "bordered-num"]:
+            self.check_same_games(observation_type)
+
+    def test_numba_kernel(self):
+        # Run the kernels compiled with numba.njit
+        numba = pytest.importorskip("numba")
+        self.assertEqual(KERNEL_BACKEND, "numba")
+        for function in [kernels._step_kernel, kernels._resolve_collisions,
+                         kernels._kill_snake, kernels._remove_segments]:
+            self.assertTrue(numba.extending.is_jitted(function))
+        self.check_same_games("flat-51s")
+
+    def check_same_games(self, observation_type):
+        envs = [BattlesnakeGym(map_size=(7, 7), number_of_snakes=4, engine="numpy",
+                               observation_type=observation_type, validate=True)
+                for _ in range(2)]
+        # Use the kernel even if Numba is not installed
+        envs[1].engine = "numba"
+        for env in envs:
+            env.seed(5)
+            env.reset()
+        np_random = np.random.RandomState(1)
+        for _ in range(200):
+            actions = np_random.randint(4, size=4)
+            numpy_step, kernel_step = [env.step(actions) for env in envs]
+            self.assertTrue(np.array_equal(numpy_step[0], kernel_step[0]))
+            self.assertEqual(numpy_step[1:], kernel_step[1:])
+            self.assertEqual(envs[0].get_json(), envs[1].get_json())
+            if sum(not dead for dead in numpy_step[2].values()) <= 1:
+                for env in envs:
+                    env.reset()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import BattlesnakeGym
+from battlesnake_gym.recorder import EpisodeRecorder, EpisodeRecording
+
+class TestEpisodeRecorder(unittest.TestCase):
+    '''
+    Test that the frames of a recording are the same as the frames rendered during the game
+    '''
+    def test_recording(self):
+        np_random = np.random.RandomState(0)
+        env = BattlesnakeGym(map_size=(7, 9), number_of_snakes=3,
+                             observation_type="layered-num")
+        env.seed(0)
+        env.reset()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "episode.rec")
+            boards = []
+            with EpisodeRecorder(path, env) as recorder:
+                for _ in range(15):
+                    recorder.record()
+                    boards.append(env.render(mode="rgb_array"))
+                    env.step(np_random.randint(4, size=3))
+            self.assertEqual(recorder.number_of_turns, 15)
+
+            recording = EpisodeRecording(path)
+            self.assertEqual(len(recording), 15)
+            self.assertTrue(np.array_equal(recording[3], boards[3]))
+            self.assertTrue(np.array_equal(recording[-1], boards[-1]))
+            self.assertTrue(np.array_equal(np.stack(list(recording.iter_rgb_arrays(batch_size=4))),
+                                           np.stack(boards)))
+            del recording
+
+    def test_empty_recording(self):
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "episode.rec")
+            EpisodeRecorder(path, env).close()
+            recording = EpisodeRecording(path)
+            self.assertEqual(len(recording), 0)
+            self.assertEqual(list(recording.iter_rgb_arrays()), [])
+
+    def test_delete_recording(self):
+        env = BattlesnakeGym(map_size=(5, 5), number_of_snakes=2)
+        env.reset()
+        recording_file, path = tempfile.mkstemp(suffix=".rec")
+        os.close(recording_file)
+        with EpisodeRecorder(path, env) as recorder:
+            recorder.record()
+        with EpisodeRecording(path, delete=True) as recording:
+            self.assertEqual(len(recording), 1)
+        self.assertEqual(len(recording), 0)
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,113 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import BattlesnakeGym
+from battlesnake_gym.collisions import Outcome, SnakeInfo
+from battlesnake_gym.rewards import Rewards, SimpleRewards, REWARD_NAMES, compute_rewards
+
+class ScheduledRewards(Rewards):
+    '''
+    Rewards given by get_reward only, the reward of a turn changes with the episode
+    '''
+    def get_reward(self, name, snake_id, episode):
+        return (REWARD_NAMES.index(name) + 1) * 10 ** snake_id + episode
+
+class ScheduledTableRewards(ScheduledRewards):
+    def get_reward_table(self, number_of_snakes, episodes):
+        return np.array([[self.get_reward(name, i, episodes) for name in REWARD_NAMES]
+                         for i in range(number_of_snakes)])
+
+class TestRewards(unittest.TestCase):
+    '''
+    Test that the rewards looked up in the reward table are the rewards of the events
+    '''
+    def test_reward_table(self):
+        outcomes = np.array([Outcome.DID_NOT_COLLIDE, Outcome.HIT_WALL, Outcome.STARVED,
+                             Outcome.DEAD])
+        ate_food = np.array([True, False, False, False])
+        alive = np.array([True, False, False, False])
+        for done in [False, True]:
+            for episode in [0, 7]:
+                expected = compute_rewards(ScheduledRewards(), outcomes, ate_food, alive,
+                                           done, episode)
+                rewards = compute_rewards(ScheduledTableRewards(), outcomes, ate_food, alive,
+                                          done, episode)
+                self.assertEqual(rewards.tolist(), expected.tolist())
+
+        reward = ScheduledRewards().get_reward
+        self.assertEqual(expected.tolist(),
+                         [reward("ate_food", 0, 7) + reward("another_turn", 0, 7) + reward("won", 0, 7),
+                          reward("hit_wall", 1, 7) + reward("died", 1, 7),
+                          reward("starved", 2, 7) + reward("died", 2, 7),
+                          reward("died", 3, 7)])
+
+    def test_step_rewards_and_info(self):
+        np_random = np.random.RandomState(0)
+        rewards = SimpleRewards()
+        rewards.reward_dict.update(ate_food=0.5, hit_wall=-3, died=-1, won=2)
+        envs = [BattlesnakeGym(map_size=(7, 7), number_of_snakes=3, rewards=reward_scheme)
+                for reward_scheme in [rewards, ScheduledRewards(), ScheduledTableRewards()]]
+        for env in envs:
+            env.seed(0)
+            env.reset()
+        for _ in range(100):
+            actions = np_random.randint(4, size=3)
+            outputs = [env.step(actions, episodes=3) for env in envs]
+            _, _, dones, info = outputs[0]
+            self.assertIsInstance(info["snake_info"], SnakeInfo)
+            for i in range(3):
+                self.assertEqual(info["snake_info"][i],
+                                 ["Did not collide", "Snake hit wall", "Snake was eaten - same tile",
+                                  "Snake was eaten - adjacent tile", "Snake hit body - hit itself",
+                                  "Snake hit body - hit other", "Other snake hit body",
+                                  "Ate another snake", "Starved", "Forbidden move",
+                                  "Dead"][info["snake_info"].get_outcome(i)])
+            self.assertEqual(outputs[1][1], outputs[2][1])
+            if sum(dones.values()) >= 2:
+                for env in envs:
+                    env.reset()
+
+    def test_shared_rewards(self):
+        # The reward tables of a Rewards shared by games of different numbers of snakes
+        rewards = SimpleRewards()
+        rewards.reward_dict.update(ate_food=0.5)
+        for number_of_snakes in [2, 3, 2]:
+            outcomes = np.full(number_of_snakes, Outcome.DID_NOT_COLLIDE)
+            alive = np.ones(number_of_snakes, dtype=bool)
+            turn_rewards = compute_rewards(rewards, outcomes, alive, alive, False, 0)
+            self.assertEqual(turn_rewards.tolist(), [1.5] * number_of_snakes)
+        self.assertIsNot(BattlesnakeGym().rewards, BattlesnakeGym().rewards)
+
+    def test_rewards_without_super_init(self):
+        # Subclasses that override __init__ without calling it on their base class
+        class FoodRewards(SimpleRewards):
+            def __init__(self, ate_food):
+                self.reward_dict = dict.fromkeys(REWARD_NAMES, 0)
+                self.reward_dict["ate_food"] = ate_food
+
+        class TableRewards(ScheduledTableRewards):
+            def __init__(self):
+                pass
+
+        outcomes = np.full(2, Outcome.DID_NOT_COLLIDE)
+        alive = np.ones(2, dtype=bool)
+        food_rewards = FoodRewards(2)
+        for _ in range(2):
+            turn_rewards = compute_rewards(food_rewards, outcomes, alive, alive, False, 0)
+            self.assertEqual(turn_rewards.tolist(), [2, 2])
+        self.assertEqual(compute_rewards(TableRewards(), outcomes, alive, alive, False, 1).tolist(),
+                         compute_rewards(ScheduledRewards(), outcomes, alive, alive, False, 1).tolist())
@@ -0,0 +1,76 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import SubprocBattlesnakeGym, VectorBattlesnakeGym
+from battlesnake_gym.snake import Snake
+from battlesnake_gym.snake_gym import info_to_dict
+
+class TestSubprocBattlesnakeGym(unittest.TestCase):
+    '''
+    Test the gym running in worker processes:
+    - Test that the workers play the same games as VectorBattlesnakeGym with the same seeds
+    - Test that the games that are over are reset automatically
+    '''
+    def test_same_as_vector_gym(self):
+        np_random = np.random.RandomState(0)
+        vector_env = VectorBattlesnakeGym(num_envs=2, map_size=(7, 7), number_of_snakes=2,
+                                          observation_type="bordered-51s")
+        vector_env.seed(10)
+        with SubprocBattlesnakeGym(num_envs=2, map_size=(7, 7), number_of_snakes=2,
+                                   observation_type="bordered-51s", seed=10) as env, \
+             SubprocBattlesnakeGym(num_envs=2, map_size=(7, 7), number_of_snakes=2,
+                                   observation_type="bordered-51s", seed=10,
+                                   info_mode="array") as array_env:
+            array_env.reset()
+            observations, _, _, _ = env.reset()
+            expected_observations, _, _, _ = vector_env.reset()
+            self.assertTrue(np.array_equal(observations, expected_observations))
+            for _ in range(20):
+                actions = np_random.randint(4, size=(2, 2))
+                observations, rewards, dones, infos = env.step(actions)
+                _, _, _, array_infos = array_env.step(actions)
+                expected = vector_env.step(actions)
+                self.assertTrue(np.array_equal(observations, expected[0]))
+                self.assertTrue(np.array_equal(rewards, expected[1]))
+                self.assertTrue(np.array_equal(dones, expected[2]))
+                for n, (info, array_info) in enumerate(zip(infos, array_infos)):
+                    self.assertEqual(info["snake_info"], info_to_dict(array_info)["snake_info"])
+                    self.assertTrue(np.array_equal(array_info["snake_alive"],
+                                                   np.logical_not(dones[n])))
+                for info, expected_info in zip(infos, expected[3]):
+                    self.assertEqual(info["snake_info"], expected_info["snake_info"])
+                    self.assertEqual(info["snake_health"], expected_info["snake_health"])
+                    self.assertEqual(info["game_over"], expected_info["game_over"])
+
+    def test_auto_reset(self):
+        with SubprocBattlesnakeGym(num_envs=2, map_size=(5, 5), number_of_snakes=1,
+                                   seed=0) as env:
+            env.reset()
+            actions = np.full((2, 1), Snake.UP)
+            game_over = np.zeros(2, dtype=bool)
+            for _ in range(5):
+                observations, rewards, dones, infos = env.step(actions)
+                for n, info in enumerate(infos):
+                    if info["game_over"]:
+                        game_over[n] = True
+                        self.assertEqual(info["snake_info"][0], "Snake hit wall")
+                        self.assertEqual(info["final_observation"].shape,
+                                         env.single_observation_space.shape)
+            self.assertTrue(np.all(game_over))
+
+if __name__ == '__main__':
+    unittest.main()
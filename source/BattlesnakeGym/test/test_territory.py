@@ -0,0 +1,117 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+
+from collections import deque
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import BattlesnakeGym
+from battlesnake_gym.snake import Snakes
+from battlesnake_gym.territory import compute_territory, get_free_turns
+
+def make_snake_dict(cells):
+    '''
+    Snake dictionary of the battlesnake engine from the coordinates (y, x), head first
+    '''
+    return {"body": [{"y": y, "x": x} for y, x in cells], "health": 100}
+
+def get_reachable_distance(snakes, snake_id):
+    '''
+    Breadth-first search from the head of one snake, one cell at a time
+    '''
+    free_turns = get_free_turns(snakes)
+    distance = np.full(snakes.map_size, -1)
+    head = tuple(snakes.heads[snake_id].tolist())
+    distance[head] = 0
+    queue = deque([head])
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in Snakes.DIRECTIONS.tolist():
+            cell = (y + dy, x + dx)
+            if 0 <= cell[0] < snakes.map_size[0] and 0 <= cell[1] < snakes.map_size[1] and \
+               distance[cell] == -1 and free_turns[cell] <= distance[y, x] + 1:
+                distance[cell] = distance[y, x] + 1
+                queue.append(cell)
+    return distance
+
+class TestTerritory(unittest.TestCase):
+    '''
+    Test the territory and the reachable area of the snakes:
+    - Test that a snake can follow its tail
+    - Test that the cells reached at the same time are contested or owned by the longest snake
+    - Test the reachable distances against a breadth-first search of each snake
+    - Test that the gym computes the territory once per turn
+    '''
+    def test_follow_tail(self):
+        # The head is in the middle of the body, the only way out is the tail
+        snakes = Snakes.make_from_dict((3, 3), [make_snake_dict(
+            [(1, 1), (0, 1), (0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2)])])
+        snakes.stacking[:] = 0
+        territory = compute_territory(snakes)
+        self.assertEqual(territory.reachable.tolist(), [8])
+        self.assertEqual(territory.territory.tolist(), [8])
+        self.assertEqual(territory.reachable_distance[0].tolist(),
+                         [[6, 7, 2], [5, 0, 1], [4, 3, 2]])
+
+        # The tail does not move on the next turn after eating
+        snakes.ate_food[0] = True
+        self.assertEqual(compute_territory(snakes).reachable.tolist(), [0])
+
+    def test_contested_cells(self):
+        snakes = Snakes.make_from_dict((5, 5), [make_snake_dict([(0, 0)]),
+                                                make_snake_dict([(4, 4)])])
+        territory = compute_territory(snakes)
+        self.assertEqual(territory.territory.tolist(), [9, 9])
+        self.assertTrue(np.all(np.fliplr(territory.owner).diagonal() == -1))
+        self.assertEqual(territory.distance[0, 4], 4)
+
+        snakes = Snakes.make_from_dict((5, 5), [make_snake_dict([(0, 2), (0, 1)]),
+                                                make_snake_dict([(4, 2)])])
+        snakes.stacking[:] = 0
+        territory = compute_territory(snakes)
+        self.assertEqual(territory.territory.tolist(), [14, 9])
+        self.assertTrue(np.all(territory.owner[2] == 0))
+
+    def test_reachable_distance(self):
+        np_random = np.random.RandomState(0)
+        env = BattlesnakeGym(map_size=(7, 9), number_of_snakes=3)
+        env.seed(1)
+        env.reset()
+        for _ in range(60):
+            territory = compute_territory(env.snakes)
+            for i in range(3):
+                if env.snakes.alive[i]:
+                    expected = get_reachable_distance(env.snakes, i)
+                    np.testing.assert_array_equal(territory.reachable_distance[i], expected)
+                    self.assertEqual(territory.reachable[i], np.count_nonzero(expected > 0))
+                    # Each snake owns cells it can reach
+                    self.assertTrue(np.all(expected[territory.owner == i] >= 0))
+                else:
+                    self.assertEqual(territory.reachable[i], 0)
+            env.step(np_random.randint(4, size=3))
+            if np.sum(env.snakes.alive) <= 1:
+                env.reset()
+
+    def test_cached_per_turn(self):
+        env = BattlesnakeGym(map_size=(7, 7), number_of_snakes=2)
+        env.seed(0)
+        env.reset()
+        territory = env.get_territory()
+        self.assertIs(env.get_territory(), territory)
+        env.step([0, 1])
+        self.assertIsNot(env.get_territory(), territory)
+
+if __name__ == '__main__':
+    unittest.main()
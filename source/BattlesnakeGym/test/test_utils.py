@@ -77,7 +77,9 @@ def grow_snake():
                          food_spawn_locations=food_location,
                          verbose=True)
 
-    env.food.max_turns_to_next_food_spawn = 2  # Hack to make sure that food is spawned every turn
+    # The food is spawned from food_location every turn, the chance spawns after it is
+    # exhausted are seeded
+    env.seed(0)
 
     actions = [[Snake.DOWN], [Snake.DOWN],
                [Snake.RIGHT], [Snake.RIGHT], [Snake.DOWN], [Snake.DOWN],
@@ -99,7 +101,9 @@ def grow_two_snakes(snake_starting_positions):
                          snake_spawn_locations=snake_location,
                          food_spawn_locations=food_location,
                          verbose=True)
-    env.food.max_turns_to_next_food_spawn = 2  # Hack to make sure that food is spawned every turn
+    # The food is spawned from food_location every turn, the chance spawns after it is
+    # exhausted are seeded
+    env.seed(0)
 
     actions_snake1 = [[Snake.DOWN], [Snake.DOWN],
                       [Snake.RIGHT], [Snake.RIGHT], [Snake.DOWN], [Snake.DOWN],
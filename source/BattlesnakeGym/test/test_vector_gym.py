@@ -0,0 +1,141 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# 
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+# 
+#     http://www.apache.org/licenses/LICENSE-2.0
+# 
+# or in the "license" file accompanying this file. This file is distributed 
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+# express or implied. See the License for the specific language governing 
+# permissions and limitations under the License.
+
+import unittest
+
+import numpy as np
+
+from battlesnake_gym import VectorBattlesnakeGym
+from battlesnake_gym.snake import Snake
+from battlesnake_gym.snake_gym import BattlesnakeGym, info_to_dict
+
+class TestVectorBattlesnakeGym(unittest.TestCase):
+    '''
+    Test the batched gym:
+    - Test the shapes of the stacked outputs
+    - Test that the games that are over are reset automatically
+    - Test that the info arrays hold the same values as the info dictionaries
+    - Test that the games are played as the games of BattlesnakeGym
+    '''
+    def test_shapes(self):
+        for observation_type in ["flat-51s", "bordered-num", "max-bordered-51s"]:
+            env = VectorBattlesnakeGym(num_envs=3, map_size=(7, 7), number_of_snakes=2,
+                                       observation_type=observation_type)
+            observations, rewards, dones, infos = env.reset()
+            self.assertEqual(observations.shape, (3,) + env.single_observation_space.shape)
+            self.assertEqual(len(infos), 3)
+
+            actions = np.array([[Snake.UP, Snake.DOWN]] * 3)
+            observations, rewards, dones, infos = env.step(actions)
+            self.assertEqual(observations.shape, (3,) + env.single_observation_space.shape)
+            self.assertEqual(rewards.shape, (3, 2))
+            self.assertEqual(dones.shape, (3, 2))
+            for n in range(3):
+                self.assertTrue(np.array_equal(observations[n], env.envs[n]._get_observation()))
+
+        env = VectorBattlesnakeGym(num_envs=3, map_size=(7, 7), number_of_snakes=2,
+                                   observation_type="bordered-num", egocentric=True)
+        observations, _, _, _ = env.reset()
+        self.assertEqual(observations.shape, (3, 2, 9, 9, 3))
+
+    def test_auto_reset(self):
+        '''
+        Single snakes moving up will all hit the wall within map_size[0] turns
+        '''
+        env = VectorBattlesnakeGym(num_envs=4, map_size=(5, 5), number_of_snakes=1)
+        env.reset()
+        actions = np.full((4, 1), Snake.UP)
+        game_over = np.zeros(4, dtype=bool)
+        for _ in range(5):
+            observations, rewards, dones, infos = env.step(actions)
+            for n, info in enumerate(infos):
+                if info["game_over"]:
+                    game_over[n] = True
+                    self.assertTrue(dones[n, 0])
+                    self.assertEqual(info["snake_info"][0], "Snake hit wall")
+                    self.assertIn("final_observation", info)
+                    # The next game started
+                    self.assertEqual(env.envs[n].turn_count, 0)
+                    self.assertTrue(env.envs[n].snakes.alive[0])
+        self.assertTrue(np.all(game_over))
+
+    def test_info_modes(self):
+        np_random = np.random.RandomState(0)
+        envs = {}
+        for info_mode in ["dict", "array"]:
+            envs[info_mode] = VectorBattlesnakeGym(num_envs=3, map_size=(5, 5),
+                                                   number_of_snakes=3, info_mode=info_mode)
+            envs[info_mode].seed(4)
+        infos = {info_mode: env.reset()[3] for info_mode, env in envs.items()}
+        for _ in range(30):
+            for info, expected in zip(infos["array"], infos["dict"]):
+                info = info_to_dict(info)
+                for key in ["current_turn", "snake_health", "snake_info", "snake_max_len",
+                            "game_over", "episode_length"]:
+                    self.assertEqual(info.get(key), expected.get(key))
+            actions = np_random.randint(4, size=(3, 3))
+            infos = {info_mode: env.step(actions)[3] for info_mode, env in envs.items()}
+            dones = envs["array"].dones
+            for n, info in enumerate(infos["array"]):
+                self.assertTrue(np.array_equal(info["snake_alive"], np.logical_not(dones[n])))
+                if not info["game_over"]:
+                    self.assertTrue(np.array_equal(info["snake_length"],
+                                                   envs["array"].envs[n].snakes.length))
+
+    def test_same_as_gyms(self):
+        '''
+        The batched games are played as games of BattlesnakeGym seeded with seed + n,
+        including the games started by the automatic resets
+        '''
+        for observation_type, egocentric in [("flat-51s", False), ("bordered-num", False),
+                                             ("bordered-51s", True)]:
+            np_random = np.random.RandomState(1)
+            env = VectorBattlesnakeGym(num_envs=3, map_size=(7, 7), number_of_snakes=3,
+                                       observation_type=observation_type, egocentric=egocentric)
+            env.seed(7)
+            observations, _, _, infos = env.reset()
+            gyms = []
+            for n in range(3):
+                gym = BattlesnakeGym(observation_type=observation_type, map_size=(7, 7),
+                                     number_of_snakes=3, egocentric=egocentric)
+                gym.seed(7 + n)
+                gyms.append(gym)
+            expected = [gym.reset() for gym in gyms]
+            for _ in range(200):
+                for n, gym in enumerate(gyms):
+                    self.assertTrue(np.array_equal(observations[n], expected[n][0]))
+
+                # Most moves are safe so that the snakes live long enough to grow
+                actions = np_random.randint(4, size=(3, 3))
+                for n, gym in enumerate(gyms):
+                    board = gym.get_board()
+                    for i in range(3):
+                        safe_moves = board.get_safe_moves(i)
+                        if len(safe_moves) > 0 and np_random.rand() < 0.95:
+                            actions[n, i] = safe_moves[np_random.randint(len(safe_moves))]
+                observations, rewards, dones, infos = env.step(actions)
+                for n, gym in enumerate(gyms):
+                    expected[n] = gym.step(actions[n])
+                    _, reward, done, info = expected[n]
+                    self.assertTrue(np.array_equal(rewards[n], list(reward.values())))
+                    self.assertTrue(np.array_equal(dones[n], list(done.values())))
+                    self.assertEqual(infos[n]["current_turn"], info["current_turn"])
+                    for key in ["snake_health", "snake_info", "snake_max_len"]:
+                        self.assertEqual(info_to_dict(infos[n])[key], info_to_dict(info)[key])
+                    if infos[n]["game_over"]:
+                        self.assertTrue(np.array_equal(infos[n]["final_observation"],
+                                                       expected[n][0]))
+                        expected[n] = gym.reset()
+
+if __name__ == '__main__':
+    unittest.main()
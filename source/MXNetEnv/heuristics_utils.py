@@ -1,7 +1,11 @@
+import os
+import tempfile
 from training.training_src.networks.utils import sort_states_for_snake_id
 import numpy as np
 import mxnet as mx
 from collections import namedtuple
+from battlesnake_gym.recorder import EpisodeRecorder, EpisodeRecording
+from battlesnake_gym.game_log import GameLog, GameLogWriter
 
 ctx = mx.gpu() if mx.context.num_gpus() > 0 else mx.cpu()
 
@@ -156,7 +160,7 @@ def get_action(net, state, snake_id, turn_count, health, memory):
 def is_snake_alive(env, snake_id):
     return env.snakes.get_snakes()[snake_id].is_alive()
 
-def simulate(env, net, heuristics, number_of_snakes):
+def simulate(env, net, heuristics, number_of_snakes, recording_path=None):
     '''
     Helper functions to simulate the snakes moving with BattlesnakeGym.
     Pseudo code is:
@@ -169,10 +173,22 @@ def simulate(env, net, heuristics, number_of_snakes):
     
     state, _, _, infos = env.reset()
     
-    rgb_arrays = [env.render(mode="rgb_array")]
+    # The turns are streamed to a file and rendered when they are accessed.
+    # A temporary file is deleted when the recording is closed or garbage collected
+    delete_recording = recording_path is None
+    if recording_path is None:
+        recording_file, recording_path = tempfile.mkstemp(suffix=".rec")
+        os.close(recording_file)
+    recorder = EpisodeRecorder(recording_path, env)
+    recorder.record()
+
+    # The json of a turn is rebuilt from a game log of the actions when it is needed,
+    # see get_json_of_turn
+    game_log_file, game_log_path = tempfile.mkstemp(suffix=".bsgl")
+    os.close(game_log_file)
+    game_log_writer = GameLogWriter(game_log_path, env)
     infos_array = [infos]
     actions_array = [[4, 4, 4, 4]]
-    json_array = [env.get_json()]
         
     heuristics_log_array = [{k: "" for k in range(number_of_snakes)}]
 
@@ -212,12 +228,11 @@ def simulate(env, net, heuristics, number_of_snakes):
         
         next_state, reward, dones, infos = env.step(np.array(actions))
         
-        rgb_array = env.render(mode="rgb_array")
-        rgb_arrays.append(rgb_array.copy())
+        recorder.record()
+        game_log_writer.record(actions)
         infos_array.append(infos)
         actions_array.append(actions)
         heuristics_log_array.append(heuristics_log)
-        json_array.append(env.get_json())
         
         # Check if only 1 snake remains
         number_of_snakes_alive = sum(list(dones.values()))
@@ -231,4 +246,16 @@ def simulate(env, net, heuristics, number_of_snakes):
             print("Completed")
             break  
 
-    return infos_array, rgb_arrays, actions_array, heuristics_log_array, json_array
\ No newline at end of file
+    recorder.close()
+    rgb_arrays = EpisodeRecording(recording_path, delete=delete_recording)
+    game_log_writer.close()
+    game_log = GameLog(game_log_path)
+    os.remove(game_log_path)
+    return infos_array, rgb_arrays, actions_array, heuristics_log_array, game_log
+
+def get_json_of_turn(game_log, turn):
+    '''
+    Get the json of the gym (see BattlesnakeGym.get_json) after turn turns of the game
+    logged by simulate
+    '''
+    return game_log.make_env(turn).get_json()
\ No newline at end of file
@@ -14,8 +14,6 @@
 import os
 import json
 import numpy as np
-import mxnet as mx
-from mxnet import gluon 
 import glob
 
 from battlesnake_heuristics import MyBattlesnakeHeuristics
@@ -28,6 +26,8 @@ model_names = ["Model-11x11",
                "Model-7x7"]
 
 def model_fn(model_dir):
+    # mxnet is imported when the models are loaded to keep the import of the module light
+    from mxnet import gluon
     print("model_fn model_dir={} glob={}".format(model_dir, glob.glob("{}/*".format(model_dir))))
     
     models = {}
@@ -46,6 +46,7 @@ def transform_fn(models, data, content_type, output_content_type):
     """
     Transform incoming requests.
     """
+    import mxnet as mx
     #check if GPUs area available
     ctx = mx.gpu() if mx.context.num_gpus() > 0 else mx.cpu()
     
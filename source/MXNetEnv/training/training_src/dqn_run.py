@@ -17,7 +17,8 @@ import mxnet as mx
 import numpy as np
 from collections import deque
 import json
-from array2gif import write_gif
+import tempfile
+from battlesnake_gym.recorder import EpisodeRecorder, EpisodeRecording
 
 def trainer(env, agents, number_of_snakes, name,
             n_episodes, max_t, warmup,
@@ -43,7 +44,11 @@ def trainer(env, agents, number_of_snakes, name,
         state, _, dones, info = env.reset()
         info["episodes"] = i_episode
         score = [0 for _ in range(number_of_snakes)]
-        rgb_arrays = []
+        recorder = None
+        if should_render and (i_episode % render_steps == 0):
+            recording_file, recording_path = tempfile.mkstemp(suffix=".rec")
+            os.close(recording_file)
+            recorder = EpisodeRecorder(recording_path, env)
         agents.reset()
         for t in range(max_t):
             
@@ -62,17 +67,19 @@ def trainer(env, agents, number_of_snakes, name,
                 score[i] += reward[i]
                 
             state = next_state
-            if should_render and (i_episode % render_steps == 0):
-                rgb_array = env.render(mode="rgb_array")
-                rgb_arrays.append(rgb_array)
+            if recorder is not None:
+                recorder.record()
 
             number_of_snakes_alive = sum(list(dones.values()))
             if number_of_snakes - number_of_snakes_alive <= 1:
                 break
             
-        if should_render and (i_episode % render_steps == 0):
-            write_gif(rgb_arrays, 'gifs/gif:{}-{}.gif'.format(name, i_episode),
-                      fps=5)
+        if recorder is not None:
+            recorder.close()
+            recording = EpisodeRecording(recording_path)
+            recording.write_gif('gifs/gif:{}-{}.gif'.format(name, i_episode), fps=5)
+            del recording
+            os.remove(recording_path)
 
         timesteps.append(env.turn_count)
         for i in range(number_of_snakes):
@@ -1,16 +1,20 @@
+import os
+import tempfile
 import numpy as np
 import tensorflow as tf
-from training.training_src.utils import sort_states_for_snake_id
+from battlesnake_gym.recorder import EpisodeRecorder, EpisodeRecording
+from battlesnake_gym.game_log import GameLog, GameLogWriter
     
 
-def build_state_for_snake(obs, snake_i, prev_state=None):
+def build_state_for_snake(views, snake_i, prev_state=None):
     '''
     Helper function that'll help the current state and previous state together
     If the previous state doesn't exist, append an empty state
     
     Parameters:
     ----------
-    obs: np.array of size [map_size[0], map_size[1], 3]
+    views: np.array of size [number_of_snakes, map_size[0], map_size[1], 3]
+        Views of all the snakes, see BattlesnakeGym.get_egocentric_observation
     snake_i: int
         snake id
         
@@ -18,18 +22,9 @@ def build_state_for_snake(obs, snake_i, prev_state=None):
     -------
     output: np.array of size [map_size[0], map_size[1], 6]
     '''
+    obs_i = np.array(views[snake_i], dtype=np.float32)
     if prev_state is None:
-        prev_state = np.zeros((obs.shape[0], obs.shape[1], 3))
-        
-    obs = np.array(obs, dtype=np.float32)
-    
-    if obs.shape[2] == 2:
-        empty_state_with_borders = obs[:, :, 0]
-        empty_state_with_borders[empty_state_with_borders==1] = 0
-        empty_state_with_borders = np.expand_dims(empty_state_with_borders, 2)
-        obs_i = np.concatenate((obs, empty_state_with_borders), axis=-1)
-    else:    
-        obs_i = sort_states_for_snake_id(obs, snake_i+1)
+        prev_state = np.zeros((obs_i.shape[0], obs_i.shape[1], 3))
     
     merged_map = np.concatenate((prev_state, obs_i), axis=-1)
 
@@ -60,13 +55,25 @@ def get_action(net, state, prev_action, prev_reward):
     action = predict["behaviour_logits"].numpy()
     return action
 
-def simulate(env, net, heuristics, number_of_snakes, use_random_snake):    
+def simulate(env, net, heuristics, number_of_snakes, use_random_snake, recording_path=None):    
     state, _, _, infos  = env.reset()
 
-    rgb_arrays = [env.render(mode="rgb_array")]
+    # The turns are streamed to a file and rendered when they are accessed.
+    # A temporary file is deleted when the recording is closed or garbage collected
+    delete_recording = recording_path is None
+    if recording_path is None:
+        recording_file, recording_path = tempfile.mkstemp(suffix=".rec")
+        os.close(recording_file)
+    recorder = EpisodeRecorder(recording_path, env)
+    recorder.record()
+
+    # The json of a turn is rebuilt from a game log of the actions when it is needed,
+    # see get_json_of_turn
+    game_log_file, game_log_path = tempfile.mkstemp(suffix=".bsgl")
+    os.close(game_log_file)
+    game_log_writer = GameLogWriter(game_log_path, env)
     infos_array = [infos]
     actions_array = [[4 for _ in range(number_of_snakes)]]
-    json_array = [env.get_json()]
         
     heuristics_log_array = [{k: "" for k in range(number_of_snakes)}]
 
@@ -82,10 +89,11 @@ def simulate(env, net, heuristics, number_of_snakes, use_random_snake):
 
         heuristics_log = {}       
         actions = []
+        views = env.get_egocentric_observation()
         for i in range(number_of_snakes):
             agent_id = "agent_{}".format(i)
             
-            state_i, obs = build_state_for_snake(state, i, previous_move[agent_id]["state"])
+            state_i, obs = build_state_for_snake(views, i, previous_move[agent_id]["state"])
             
             if use_random_snake:
                 action = np.random.uniform(size=(1, 4))
@@ -118,12 +126,11 @@ def simulate(env, net, heuristics, number_of_snakes, use_random_snake):
                                        "reward": reward,
                                        "action": action}
 
-        rgb_array = env.render(mode="rgb_array")
-        rgb_arrays.append(rgb_array.copy())
+        recorder.record()
+        game_log_writer.record(actions)
         infos_array.append(infos)
         actions_array.append(actions)
         heuristics_log_array.append(heuristics_log)
-        json_array.append(env.get_json())
         
         # Check if only 1 snake remains
         number_of_snakes_alive = sum(list(dones.values()))
@@ -147,4 +154,16 @@ def simulate(env, net, heuristics, number_of_snakes, use_random_snake):
             print("Completed")
             break  
 
-    return infos_array, rgb_arrays, actions_array, heuristics_log_array, json_array
+    recorder.close()
+    rgb_arrays = EpisodeRecording(recording_path, delete=delete_recording)
+    game_log_writer.close()
+    game_log = GameLog(game_log_path)
+    os.remove(game_log_path)
+    return infos_array, rgb_arrays, actions_array, heuristics_log_array, game_log
+
+def get_json_of_turn(game_log, turn):
+    '''
+    Get the json of the gym (see BattlesnakeGym.get_json) after turn turns of the game
+    logged by simulate
+    '''
+    return game_log.make_env(turn).get_json()
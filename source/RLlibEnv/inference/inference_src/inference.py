@@ -1,5 +1,4 @@
 import json
-import requests
 import numpy as np
 
 from battlesnake_heuristics import MyBattlesnakeHeuristics
@@ -14,6 +13,8 @@ def handler(data, context):
     Returns:
         (bytes, string): data to return to client, (optional) response content type
     """
+    # requests is only needed by the handler, not by the pre and post processing functions
+    import requests
     processed_input = _process_input(data, context)
     response = requests.post(context.rest_uri, data=processed_input)
     return _process_output(response, processed_input, context)
@@ -15,14 +15,9 @@ from ray.tune.registry import register_env
 from ray.rllib.models.torch.torch_modelv2 import TorchModelV2
 from ray.rllib.models import ModelCatalog
 
-from battlesnake_gym.snake_gym import BattlesnakeGym
+from battlesnake_gym.snake_gym import BattlesnakeGym, INFO_ARRAYS
 from battlesnake_gym.rewards import SimpleRewards
 
-try:
-    from utils import sort_states_for_snake_id
-except ModuleNotFoundError:
-    from training.training_src.utils import sort_states_for_snake_id
-
 try:
     from battlesnake_heuristics import MyBattlesnakeHeuristics
 except ModuleNotFoundError:
@@ -33,13 +28,16 @@ class MultiAgentBattlesnake(MultiAgentEnv):
 
     MAX_MAP_HEIGHT = 21
         
-    def __init__(self, num_agents, map_height, heuristics, rewards=SimpleRewards()):
+    def __init__(self, num_agents, map_height, heuristics, rewards=None):
         observation_type = "max-bordered-51s"
          
+        # The observations are the views of all the agents
         self.env = BattlesnakeGym(
             observation_type=observation_type,
             number_of_snakes=num_agents, 
-            map_size=(map_height, map_height), rewards=rewards)
+            map_size=(map_height, map_height),
+            rewards=SimpleRewards() if rewards is None else rewards,
+            observation_dtype=np.float32, egocentric=True, info_mode="array")
         
         self.observation_height = self.MAX_MAP_HEIGHT
         self.action_space = self.env.action_space[0]
@@ -78,13 +76,11 @@ class MultiAgentBattlesnake(MultiAgentEnv):
 
         # add empty map placeholders for use until we've seen 2 steps
         empty_map = np.zeros((self.observation_height, self.observation_height, 3))
-        
-        new_obs = np.array(new_obs, dtype=np.float32)
 
         for i in range(self.num_agents):
             agent_id = "agent_{}".format(i)
             
-            obs_i = sort_states_for_snake_id(new_obs, i+1)
+            obs_i = new_obs[i]
             
             merged_map = np.concatenate((empty_map, obs_i), axis=-1)
 
@@ -113,15 +109,18 @@ class MultiAgentBattlesnake(MultiAgentEnv):
         obs = {}
         infos = {}
 
+        # The info arrays are views of the gym overwritten by the next step. They are
+        # copied once per step and the copy is shared by all the agents
+        step_info = dict(info, **{name: info[name].copy() for name in INFO_ARRAYS})
+
         for i, key in enumerate(sorted(action_dict.keys())):            
             old_obs1 = self.old_obs1[key]
             
-            obs_i = np.array(o, dtype=np.float32)
-            obs_i = sort_states_for_snake_id(obs_i, i+1)
+            obs_i = o[i]
             
             merged_map = np.concatenate((old_obs1, obs_i), axis=-1)
             
-            infos[key] = info
+            infos[key] = step_info
             rewards[key] = r[i]
             if len(self.heuristics) > 0 and self.env.snakes.get_snakes()[i].is_alive():
                 turn_count = info["current_turn"]+1
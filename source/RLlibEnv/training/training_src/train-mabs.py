@@ -13,6 +13,7 @@ from ma_battlesnake import MultiAgentBattlesnake
 
 from sagemaker_rl.ray_launcher import SageMakerRayLauncher
 from battlesnake_gym.rewards import SimpleRewards
+from battlesnake_gym.collisions import OUTCOME_LABELS
 
 class MyLauncher(SageMakerRayLauncher):
     def __init__(self):
@@ -60,7 +61,7 @@ class MyLauncher(SageMakerRayLauncher):
         agent_info = info['episode'].last_info_for('agent_1')
         if "snake_info" in agent_info:
             for i in range(self.num_agents):
-                snake_info_i = agent_info["snake_info"][i]
+                snake_info_i = OUTCOME_LABELS[agent_info["snake_info"][i]]
                 converted_outcome = self.converter[snake_info_i]
                 if len(converted_outcome) > 0:
                     info['episode'].custom_metrics[converted_outcome] += 1
@@ -68,7 +69,7 @@ class MyLauncher(SageMakerRayLauncher):
     def on_episode_end(self, info):
         agent_info = info['episode'].last_info_for('agent_1')
         for i in range(self.num_agents):
-            snake_info_i = agent_info["snake_info"][i]
+            snake_info_i = OUTCOME_LABELS[agent_info["snake_info"][i]]
             converted_outcome = self.converter[snake_info_i]
             if len(converted_outcome) > 0:
                 info['episode'].custom_metrics[converted_outcome] += 1